@@ -0,0 +1,78 @@
+"""
+Count Firestore RPCs for 200 concurrent single-document gets, fetched one by
+one and through DocumentLoader, against a fake client with a fixed network
+latency and client CPU time per RPC and per document.
+"""
+import argparse
+import threading
+import time
+from fakes import CountingClient
+from document_loader import DocumentLoader
+
+CONCURRENT_REQUESTS = 200
+DISTINCT_RIDES = 50
+
+def run(get, client):
+    """
+    Issue the concurrent gets at once. Returns (rpcs, wall ms, p50 ms, p99 ms).
+    """
+    barrier = threading.Barrier(CONCURRENT_REQUESTS)
+    latencies = []
+
+    def request(index):
+        ref = client.document(f"rides/ride{index % DISTINCT_RIDES:04d}")
+        barrier.wait()
+        started = time.perf_counter()
+        get(ref)
+        latencies.append(time.perf_counter() - started)
+
+    threads = [
+        threading.Thread(target=request, args=(index,))
+        for index in range(CONCURRENT_REQUESTS)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    latencies.sort()
+    return (
+        client.rpcs, wall_ms,
+        latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000
+    )
+
+def main():
+    """
+    Print RPC counts and latencies for direct gets and a few loader settings.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--cpu-ms", type=float, default=0.3)
+    parser.add_argument("--cpu-ms-per-document", type=float, default=0.02)
+    args = parser.parse_args()
+
+    def new_client():
+        return CountingClient(args.latency_ms, args.cpu_ms, args.cpu_ms_per_document)
+
+    print(
+        f"{CONCURRENT_REQUESTS} concurrent gets of {DISTINCT_RIDES} rides, "
+        f"{args.latency_ms:g} ms per RPC, {args.cpu_ms:g} ms CPU per RPC, "
+        f"{args.cpu_ms_per_document:g} ms CPU per document"
+    )
+    print(f"{'mode':<28} {'RPCs':>5} {'wall ms':>8} {'p50 ms':>7} {'p99 ms':>7}")
+
+    client = new_client()
+    rpcs, wall_ms, p50, p99 = run(lambda ref: ref.get(), client)
+    print(f"{'ref.get()':<28} {rpcs:>5} {wall_ms:>8.1f} {p50:>7.1f} {p99:>7.1f}")
+
+    for window_ms, max_batch_size in ((2, 100), (2, 25), (5, 100)):
+        client = new_client()
+        loader = DocumentLoader(client, window_ms=window_ms, max_batch_size=max_batch_size)
+        rpcs, wall_ms, p50, p99 = run(loader.get, client)
+        mode = f"loader {window_ms} ms, batch {max_batch_size}"
+        print(f"{mode:<28} {rpcs:>5} {wall_ms:>8.1f} {p50:>7.1f} {p99:>7.1f}")
+
+if __name__ == "__main__":
+    main()
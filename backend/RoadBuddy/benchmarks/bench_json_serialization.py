@@ -0,0 +1,65 @@
+"""
+Compare the stdlib encoder Flask uses by default with the orjson-backed
+json_provider on typical ride and message payloads.
+"""
+import json
+import timeit
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from fakes import make_ride, make_message
+from json_provider import dumps_bytes
+
+ITERATIONS = 200
+
+def stdlib_default(obj):
+    """
+    Mirror flask.json.provider.DefaultJSONProvider for dates.
+    """
+    if isinstance(obj, datetime):
+        return format_datetime(obj, usegmt=True)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def stdlib_dumps(obj):
+    """
+    Encode like DefaultJSONProvider.dumps (sorted keys, compact, default hook).
+    """
+    return json.dumps(obj, default=stdlib_default, sort_keys=True,
+                      separators=(",", ":")).encode("utf-8")
+
+def build_payloads():
+    """
+    Build the payloads returned by the list endpoints.
+    """
+    created_at = datetime(2026, 11, 2, 16, 30, tzinfo=timezone.utc)
+    rides = [dict(make_ride(index), createdAt=created_at) for index in range(200)]
+    messages = {index: make_message(index) for index in range(1, 501)}
+    chats = [
+        {
+            "id": f"ride{index:08d}",
+            "lastMessage": "See you at 8!",
+            "lastMessageTimestamp": created_at,
+            "from": "Santa Cruz",
+            "to": "San Jose",
+        }
+        for index in range(100)
+    ]
+    return {
+        "available-rides (200 rides)": {"rides": rides},
+        "get-messages (500 messages)": {"messages": messages},
+        "ride-chats (100 chats)": {"ride_chats": chats},
+    }
+
+def main():
+    """
+    Print per-call encode time for both encoders.
+    """
+    print(f"{'payload':<30} {'stdlib ms':>10} {'orjson ms':>10} {'speedup':>8}")
+    for name, payload in build_payloads().items():
+        stdlib_ms = timeit.timeit(lambda p=payload: stdlib_dumps(p), number=ITERATIONS)
+        orjson_ms = timeit.timeit(lambda p=payload: dumps_bytes(p), number=ITERATIONS)
+        stdlib_ms = stdlib_ms * 1000 / ITERATIONS
+        orjson_ms = orjson_ms * 1000 / ITERATIONS
+        print(f"{name:<30} {stdlib_ms:>10.3f} {orjson_ms:>10.3f} {stdlib_ms / orjson_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
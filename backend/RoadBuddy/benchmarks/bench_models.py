@@ -0,0 +1,111 @@
+"""
+Compare a notification list held as dicts against Notification models, the
+list get_all_notifications_for_user keeps whole when responses are not
+streamed: memory held by the list, time to build it from snapshot data and
+time to encode it with json_provider, buffered and one notification at a time.
+"""
+import argparse
+import time
+import tracemalloc
+import json
+from fakes import make_notification
+from json_provider import dumps_bytes
+from models import Notification
+
+def snapshot_data(count):
+    """
+    Build (notification id, to_dict() result) pairs like the notifications query.
+    """
+    snapshots = []
+    for index in range(count):
+        notification = make_notification(index)
+        snapshots.append((notification.pop("id"), notification))
+    return snapshots
+
+def as_dicts(snapshots):
+    """
+    Build the list as dicts with the response keys.
+    """
+    return [
+        {
+            "id": notification_id,
+            "message": data.get("message"),
+            "read": data.get("read"),
+            "rideId": data.get("rideId"),
+            "createdAt": data.get("createdAt"),
+        }
+        for notification_id, data in snapshots
+    ]
+
+def as_models(snapshots):
+    """
+    Build the list of Notification models.
+    """
+    return [
+        Notification(
+            notification_id,
+            data.get("message"),
+            data.get("read"),
+            data.get("rideId"),
+            data.get("createdAt"),
+        )
+        for notification_id, data in snapshots
+    ]
+
+def measure(build, snapshots):
+    """
+    Return (notifications, build ms, KiB held by the list). The build is timed
+    without tracemalloc, which slows allocations down.
+    """
+    started = time.perf_counter()
+    build(snapshots)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    tracemalloc.start()
+    notifications = build(snapshots)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return notifications, build_ms, held / 1024
+
+def encode_ms(notifications):
+    """
+    Return (body, buffered encode ms, per-record encode ms) for
+    {"notifications": notifications}.
+    """
+    started = time.perf_counter()
+    body = dumps_bytes({"notifications": notifications})
+    buffered = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    for notification in notifications:
+        dumps_bytes(notification)
+    streamed = (time.perf_counter() - started) * 1000
+    return body, buffered, streamed
+
+def main():
+    """
+    Print memory and timings of both representations.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notifications", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(
+        f"{'records':>7} {'held MiB':>9} {'build ms':>9} "
+        f"{'encode ms':>10} {'per-record ms':>14}"
+    )
+    snapshots = snapshot_data(args.notifications)
+    bodies = []
+    for name, build in (("dicts", as_dicts), ("models", as_models)):
+        notifications, build_ms, held_kib = measure(build, snapshots)
+        body, buffered_ms, streamed_ms = encode_ms(notifications)
+        bodies.append(body)
+        print(
+            f"{name:>7} {held_kib / 1024:>9.1f} {build_ms:>9.0f} "
+            f"{buffered_ms:>10.0f} {streamed_ms:>14.0f}"
+        )
+        del notifications
+    assert json.loads(bodies[0]) == json.loads(bodies[1])
+
+if __name__ == "__main__":
+    main()
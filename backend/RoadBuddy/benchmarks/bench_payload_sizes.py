@@ -0,0 +1,95 @@
+"""
+Measure the response size of the list endpoints before and after field
+projection, uncompressed and with the encodings ResponseCompressor negotiates.
+The fake rides repeat the same addresses, so compressed sizes are optimistic.
+"""
+import zlib
+from fakes import make_ride
+from json_provider import dumps_bytes
+from services.inbox_manager import INBOX_LIST_FIELDS
+from services.ride_manager import AVAILABLE_RIDE_FIELDS, COMING_UP_RIDE_FIELDS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def project(document, fields):
+    """
+    Keep only the given fields and the id, like a select() field mask.
+    """
+    projected = {field: document[field] for field in fields if field in document}
+    projected["id"] = document["id"]
+    return projected
+
+def make_stored_ride(index):
+    """
+    Build a ride as stored, with the fields added at post time.
+    """
+    return dict(
+        make_ride(index),
+        fingerprint="5f1c0e7b0d8a4a9c2b6e1f3d7a9c0b2e4d6f8a1c",
+        timeZone="America/Los_Angeles",
+        departureAt="2026-11-02T16:30:00+00:00",
+        createdAt="2026-10-20T18:02:11+00:00",
+    )
+
+def make_inbox_entry(index):
+    """
+    Build a users/{uid}/inbox entry.
+    """
+    ride = make_ride(index)
+    return {
+        "id": ride["id"],
+        "rideId": ride["id"],
+        "owner": ride["ownerID"],
+        **{field: ride[field] for field in ("ownerName", "from", "to", "date", "departureTime")},
+        "lastMessage": "See you at the pickup spot!",
+        "UsernameLastMessage": "Riley Rider",
+        "lastMessageTimestamp": "2026-11-02 08:12 AM PT",
+        "unreadCount": 2,
+    }
+
+def build_payloads():
+    """
+    Build (full, projected) payloads for each list endpoint.
+    """
+    rides = [make_stored_ride(index) for index in range(200)]
+    joined = rides[:20]
+    chats = [make_inbox_entry(index) for index in range(50)]
+    return {
+        "available-rides (200)": (
+            {"rides": rides},
+            {"rides": [project(ride, AVAILABLE_RIDE_FIELDS) for ride in rides]},
+        ),
+        "coming-up-rides (20)": (
+            {"rides": joined},
+            {"rides": [project(ride, COMING_UP_RIDE_FIELDS) for ride in joined]},
+        ),
+        "ride-chats (50)": (
+            {"ride_chats": chats},
+            {"ride_chats": [project(chat, INBOX_LIST_FIELDS) for chat in chats]},
+        ),
+    }
+
+def encoded_sizes(body):
+    """
+    Size of a body uncompressed, gzipped and brotli compressed.
+    """
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31)
+    br = len(brotli.compress(body, quality=4)) if brotli is not None else None
+    return len(body), len(gzip.compress(body) + gzip.flush()), br
+
+def main():
+    """
+    Print the byte sizes of every payload.
+    """
+    print(f"{'endpoint':<24} {'fields':<10} {'identity':>9} {'gzip':>8} {'br':>8}")
+    for name, payloads in build_payloads().items():
+        for label, payload in zip(("all", "projected"), payloads):
+            identity, gzip, br = encoded_sizes(dumps_bytes(payload))
+            br = "-" if br is None else br
+            print(f"{name:<24} {label:<10} {identity:>9} {gzip:>8} {br:>8}")
+
+if __name__ == "__main__":
+    main()
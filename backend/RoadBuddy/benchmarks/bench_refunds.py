@@ -0,0 +1,109 @@
+"""
+Time refunding every passenger of a deleted ride through RefundDispatcher
+against the local Stripe stub, one refund at a time and from the thread pool,
+then resend every refund to check that idempotency keys prevent double refunds.
+Refund statuses are kept in memory instead of Firestore.
+"""
+import argparse
+from concurrent.futures import wait
+import threading
+import time
+import stripe
+from fakes import make_refund
+from refund_dispatcher import RefundDispatcher
+from services.refund_manager import RefundManager
+from stripe_stub import StripeStub
+
+class InMemoryRefundManager:
+    """
+    Records refund outcomes like RefundManager, without Firestore.
+    """
+
+    idempotency_key = staticmethod(RefundManager.idempotency_key)
+
+    def __init__(self):
+        self.statuses = {}
+        self.lock = threading.Lock()
+
+    def mark_succeeded(self, refund_id, stripe_refund_id):
+        """
+        Record a refund Stripe made.
+        """
+        with self.lock:
+            self.statuses[refund_id] = ("succeeded", stripe_refund_id)
+
+    def mark_attempt_failed(self, refund_id, error, final):
+        """
+        Record a failed attempt, which is retried unless final.
+        """
+        with self.lock:
+            self.statuses[refund_id] = ("failed" if final else "pending", error)
+
+def make_refunds(ride_id, passengers):
+    """
+    Build the pending refunds of a ride's passengers.
+    """
+    refunds = [make_refund(ride_id, index) for index in range(passengers)]
+    for refund in refunds:
+        refund["id"] = RefundManager.refund_id(ride_id, refund["userId"])
+    return refunds
+
+def run(workers, refunds):
+    """
+    Dispatch refunds and wait for them. Returns (submit ms, total ms, statuses).
+    """
+    refund_manager = InMemoryRefundManager()
+    dispatcher = RefundDispatcher(refund_manager, stripe, max_workers=workers)
+
+    started = time.perf_counter()
+    futures = dispatcher.submit(refunds)
+    submitted = time.perf_counter()
+    wait(futures)
+    finished = time.perf_counter()
+    dispatcher.shutdown()
+
+    return (
+        (submitted - started) * 1000,
+        (finished - started) * 1000,
+        refund_manager.statuses,
+    )
+
+def main():
+    """
+    Print timings per passenger count and the idempotency check.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--passengers", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    stub = StripeStub(("127.0.0.1", 0), latency_ms=args.latency_ms)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    stripe.api_key = "sk_test_stub"
+    stripe.api_base = f"http://127.0.0.1:{stub.server_address[1]}"
+
+    print(f"{'passengers':>10} {'workers':>8} {'submit ms':>10} {'all refunded ms':>16}")
+    for passengers in args.passengers:
+        for workers in (1, args.workers):
+            refunds = make_refunds(f"ride{passengers}w{workers}", passengers)
+            submit_ms, total_ms, statuses = run(workers, refunds)
+            succeeded = sum(status == "succeeded" for status, _ in statuses.values())
+            assert succeeded == passengers, statuses
+            print(f"{passengers:>10} {workers:>8} {submit_ms:>10.1f} {total_ms:>16.0f}")
+
+    refunds = make_refunds("ride-retried", 8)
+    _, _, first = run(args.workers, refunds)
+    created = len(stub.refunds)
+    _, _, second = run(args.workers, refunds)
+    same_refunds = all(
+        status[1] == second[refund_id][1] for refund_id, status in first.items()
+    )
+    print(
+        f"resent 8 refunds: stub refunds {created} -> {len(stub.refunds)}, "
+        f"same refund ids: {same_refunds}"
+    )
+    stub.shutdown()
+
+if __name__ == "__main__":
+    main()
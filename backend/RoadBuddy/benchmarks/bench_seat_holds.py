@@ -0,0 +1,147 @@
+"""
+Simulate riders racing to check out the last seats of a ride, with and without
+seat holds, and count the payment intents created for riders who then cannot
+book. The ride is an in-memory model applying the same capacity rules as the
+hold_seat, book_seat and release_holds transactions, with a lock standing in
+for the transaction. No Stripe calls are made; an intent is only counted.
+"""
+import argparse
+import random
+import threading
+import time
+from fakes import make_ride
+from services.ride_manager import held_seats, passenger_count
+
+class SimulatedRide:
+    """
+    One ride document and its seat holds.
+    """
+
+    def __init__(self, max_passengers, booked):
+        self.data = make_ride(0)
+        self.data.update(maxPassengers=max_passengers, passengerCount=booked, heldSeats=0)
+        self.holds = {}
+        self.lock = threading.Lock()
+
+    def hold(self, user_id, expires_at):
+        """
+        Hold a seat until expires_at, like hold_seat. Returns whether it is held.
+        """
+        with self.lock:
+            if user_id in self.holds:
+                self.holds[user_id] = expires_at
+                return True
+            held = held_seats(self.data)
+            if passenger_count(self.data) + held >= self.data["maxPassengers"]:
+                return False
+            self.holds[user_id] = expires_at
+            self.data["heldSeats"] = held + 1
+            return True
+
+    def book(self, user_id):
+        """
+        Book a seat, using the rider's hold, like book_seat. Returns whether it
+        is booked.
+        """
+        with self.lock:
+            held = held_seats(self.data)
+            has_hold = self.holds.pop(user_id, None) is not None
+            if has_hold:
+                held -= 1
+            if passenger_count(self.data) + held >= self.data["maxPassengers"]:
+                return False
+            self.data["passengerCount"] += 1
+            self.data["heldSeats"] = held
+            return True
+
+    def release_expired(self, now):
+        """
+        Release the holds expired by now, like release_holds.
+        """
+        with self.lock:
+            expired = [user_id for user_id, expires_at in self.holds.items() if expires_at <= now]
+            for user_id in expired:
+                del self.holds[user_id]
+            self.data["heldSeats"] = max(held_seats(self.data) - len(expired), 0)
+
+def run(use_holds, args, seed):
+    """
+    Run one simulation. Returns counters of intents and bookings.
+    """
+    rng = random.Random(seed)
+    ride = SimulatedRide(args.max_passengers, args.max_passengers - args.free_seats)
+    counters = {"intents": 0, "rejected_early": 0, "booked": 0, "wasted": 0, "abandoned": 0}
+    counters_lock = threading.Lock()
+    stop = threading.Event()
+
+    def count(name):
+        with counters_lock:
+            counters[name] += 1
+
+    def sweeper():
+        while not stop.wait(args.sweep_ms / 1000):
+            ride.release_expired(time.monotonic())
+
+    def checkout(user_id, arrive_at, checkout_time, abandons):
+        time.sleep(arrive_at)
+        if use_holds:
+            if not ride.hold(user_id, time.monotonic() + args.hold_ttl_ms / 1000):
+                count("rejected_early")
+                return
+        elif ride.data["passengerCount"] >= ride.data["maxPassengers"]:
+            count("rejected_early")
+            return
+
+        count("intents")
+        time.sleep(checkout_time)
+        if abandons:
+            count("abandoned")
+        elif ride.book(user_id):
+            count("booked")
+        else:
+            count("wasted")
+
+    threads = [threading.Thread(target=sweeper)]
+    for index in range(args.riders):
+        threads.append(threading.Thread(target=checkout, args=(
+            f"user{index:04d}",
+            rng.uniform(0, args.arrival_ms / 1000),
+            rng.uniform(0, args.checkout_ms / 1000),
+            rng.random() < args.abandon_rate,
+        )))
+
+    for thread in threads:
+        thread.start()
+    for thread in threads[1:]:
+        thread.join()
+    stop.set()
+    threads[0].join()
+    return counters
+
+def main():
+    """
+    Print the averaged counters of both checkout flows.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--riders", type=int, default=40)
+    parser.add_argument("--max-passengers", type=int, default=4)
+    parser.add_argument("--free-seats", type=int, default=2)
+    parser.add_argument("--arrival-ms", type=float, default=300)
+    parser.add_argument("--checkout-ms", type=float, default=200)
+    parser.add_argument("--abandon-rate", type=float, default=0.2)
+    parser.add_argument("--hold-ttl-ms", type=float, default=250)
+    parser.add_argument("--sweep-ms", type=float, default=25)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    names = ("intents", "wasted", "abandoned", "booked", "rejected_early")
+    print(f"{'flow':<12}" + "".join(f"{name:>16}" for name in names))
+    for label, use_holds in (("no holds", False), ("seat holds", True)):
+        totals = dict.fromkeys(names, 0)
+        for seed in range(args.runs):
+            for name, value in run(use_holds, args, seed).items():
+                totals[name] += value
+        print(f"{label:<12}" + "".join(f"{totals[name] / args.runs:>16.1f}" for name in names))
+
+if __name__ == "__main__":
+    main()
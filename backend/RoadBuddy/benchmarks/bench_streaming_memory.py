@@ -0,0 +1,50 @@
+"""
+Compare peak memory of building a full JSON list response against streaming it
+with utils.iter_json_document.
+"""
+import json
+import tracemalloc
+from functools import partial
+from fakes import iter_rides
+from utils import iter_json_document
+
+SIZES = [1_000, 10_000, 50_000]
+
+dumps = partial(json.dumps, separators=(",", ":"))
+
+def buffered(count):
+    """
+    Collect every ride into a list and encode the whole body at once, like jsonify.
+    """
+    rides = list(iter_rides(count))
+    return len(dumps({"rides": rides}))
+
+def streamed(count):
+    """
+    Encode rides one at a time and discard each chunk after "sending" it.
+    """
+    return sum(len(chunk) for chunk in iter_json_document("rides", iter_rides(count), dumps))
+
+def peak_kib(func, count):
+    """
+    Run func(count) and return (result, peak traced memory in KiB).
+    """
+    tracemalloc.start()
+    result = func(count)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak / 1024
+
+def main():
+    """
+    Print peak memory for both modes at each size.
+    """
+    print(f"{'rides':>8} {'bytes':>12} {'buffered KiB':>14} {'streamed KiB':>14}")
+    for count in SIZES:
+        size, buffered_peak = peak_kib(buffered, count)
+        streamed_size, streamed_peak = peak_kib(streamed, count)
+        assert size == streamed_size
+        print(f"{count:>8} {size:>12} {buffered_peak:>14.0f} {streamed_peak:>14.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare the per-document "is this ride in the future" check the ride listing
+used to do (zone lookup, strptime and datetime.now for every ride) with
+time_service's request snapshot and cached departure parsing.
+"""
+import timeit
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from fakes import make_ride
+from time_service import departure_at, future_mask, utc_now
+
+RIDE_COUNT = 5_000
+ITERATIONS = 20
+
+def build_rides(with_departure_at):
+    """
+    Build rides spread over the next 30 days, a few departure times per day.
+    """
+    today = datetime.now(timezone.utc).date()
+    rides = []
+    for index in range(RIDE_COUNT):
+        ride = make_ride(index)
+        ride["date"] = (today + timedelta(days=index % 30)).strftime("%Y-%m-%d")
+        ride["departureTime"] = ["07:30 AM", "08:30 AM", "05:15 PM"][index % 3]
+        if with_departure_at:
+            ride["departureAt"] = departure_at(ride["date"], ride["departureTime"])
+        rides.append(ride)
+    return rides
+
+def per_document_check(rides):
+    """
+    The previous approach: rebuild the zone, parse and read the clock per ride.
+    """
+    result = []
+    for ride in rides:
+        zone = ZoneInfo("America/Los_Angeles")
+        ride_datetime = datetime.strptime(
+            f"{ride['date']} {ride['departureTime']}", "%Y-%m-%d %I:%M %p"
+        ).replace(tzinfo=zone)
+        result.append(ride_datetime >= datetime.now(zone))
+    return result
+
+def main():
+    """
+    Print per-ride cost of each approach.
+    """
+    legacy_rides = build_rides(with_departure_at=False)
+    stored_rides = build_rides(with_departure_at=True)
+    now = utc_now()
+
+    assert per_document_check(legacy_rides) == future_mask(legacy_rides, now)
+
+    cases = {
+        "per-document parse + now()": lambda: per_document_check(legacy_rides),
+        "future_mask, cached parse": lambda: future_mask(legacy_rides, now),
+        "future_mask, departureAt": lambda: future_mask(stored_rides, now),
+    }
+
+    print(f"{'approach':<30} {'us/ride':>8}")
+    for name, func in cases.items():
+        seconds = timeit.timeit(func, number=ITERATIONS)
+        print(f"{name:<30} {seconds * 1e6 / (ITERATIONS * RIDE_COUNT):>8.2f}")
+
+if __name__ == "__main__":
+    main()
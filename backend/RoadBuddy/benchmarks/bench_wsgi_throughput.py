@@ -0,0 +1,84 @@
+"""
+Measure request throughput and latency of a running server.
+
+Start the server in one of the profiles described in README.md, then:
+
+    python3 bench_wsgi_throughput.py --url http://127.0.0.1:8090/api/health
+    python3 bench_wsgi_throughput.py --url http://127.0.0.1:8090/api/available-rides \\
+        --cookie "session=..." --concurrency 32
+"""
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+def run_client(url, cookie, deadline, latencies, errors):
+    """
+    Send requests over one keep-alive connection until the deadline.
+    """
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    headers = {"Accept-Encoding": "gzip"}
+    if cookie:
+        headers["Cookie"] = cookie
+
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            connection.close()
+            connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+
+def percentile(sorted_values, fraction):
+    """
+    Value at the given fraction of a sorted list.
+    """
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def main():
+    """
+    Run the load and print requests per second and latency percentiles.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:8090/api/health")
+    parser.add_argument("--cookie", default="")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15)
+    args = parser.parse_args()
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.duration
+    clients = [
+        threading.Thread(
+            target=run_client, args=(args.url, args.cookie, deadline, latencies, errors)
+        )
+        for _ in range(args.concurrency)
+    ]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+
+    latencies.sort()
+    print(f"requests: {len(latencies)}  errors: {len(errors)}")
+    if latencies:
+        print(f"throughput: {len(latencies) / args.duration:.0f} req/s")
+        print(
+            f"latency ms: p50 {percentile(latencies, 0.5) * 1000:.1f}"
+            f"  p95 {percentile(latencies, 0.95) * 1000:.1f}"
+            f"  p99 {percentile(latencies, 0.99) * 1000:.1f}"
+        )
+
+if __name__ == "__main__":
+    main()
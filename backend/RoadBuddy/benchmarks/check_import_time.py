@@ -0,0 +1,71 @@
+"""
+Fail when importing the app in lazy startup mode takes longer than a budget.
+
+Runs `python -X importtime -c "import app"` in fresh interpreters and compares
+the best cumulative import time of the app module with the budget:
+
+    python3 check_import_time.py [--budget-ms 700] [--runs 3] [--top 10]
+
+Exits with status 1 when over budget and prints the slowest imports.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+DEFAULT_BUDGET_MS = 700
+
+def parse_importtime(stderr):
+    """
+    Parse -X importtime output into (cumulative_us, depth, module) entries.
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        name = module.strip()
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        imports.append((int(cumulative), depth, name))
+    return imports
+
+def measure():
+    """
+    Import the app once in a fresh interpreter. Returns (app_us, imports).
+    """
+    env = dict(os.environ, LAZY_STARTUP="true")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    imports = parse_importtime(result.stderr)
+    app_us = next(cumulative for cumulative, _, module in imports if module == "app")
+    return app_us, imports
+
+def main():
+    """
+    Measure the app import and compare it with the budget.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    app_us, imports = min((measure() for _ in range(args.runs)), key=lambda run: run[0])
+    app_ms = app_us / 1000
+
+    print(f"import app: {app_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    direct = [(cumulative, module) for cumulative, depth, module in imports if depth == 1]
+    print("slowest imports made by app.py:")
+    for cumulative, module in sorted(direct, reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:>8.1f} ms  {module}")
+
+    if app_ms > args.budget_ms:
+        print("Import time is over budget.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+In-memory stand-ins for Firestore data used by the benchmarks.
+"""
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+def make_ride(index):
+    """
+    Build a ride document shaped like the ones stored in "rides".
+    """
+    return {
+        "id": f"ride{index:08d}",
+        "ownerID": f"user{index % 5000:05d}",
+        "ownerName": "Jordan Driver",
+        "from": "1156 High St, Santa Cruz, CA 95064",
+        "to": "1 Washington Sq, San Jose, CA 95192",
+        "date": "2026-11-02",
+        "departureTime": "08:30 AM",
+        "maxPassengers": 4,
+        "cost": 12.5,
+        "currentPassengers": [f"user{(index + 1) % 5000:05d}"],
+        "passengerCount": 1,
+        "car": "2019 Toyota Corolla (Blue)",
+        "licensePlate": "8ABC123",
+        "status": "open",
+    }
+
+def make_message(index):
+    """
+    Build a chat message shaped like the ones returned by get-messages.
+    """
+    return {
+        "id": f"msg{index:08d}",
+        "senderId": f"user{index % 4:05d}",
+        "senderName": "Riley Rider",
+        "text": "On my way, I'll be at the pickup spot in five minutes.",
+        "timestamp": "2026-11-02 08:12 AM PT",
+        "isOwner": index % 4 == 0,
+    }
+
+def make_notification(index):
+    """
+    Build a notification shaped like the ones returned by get-notifications.
+    """
+    return {
+        "id": f"note{index:08d}",
+        "message": "Jordan Driver has booked a ride with you\nFrom: Santa Cruz\nTo: San Jose",
+        "read": index % 3 == 0,
+        "rideId": f"ride{index % 5000:08d}",
+        "createdAt": "Nov 02, 2026 08:12 AM",
+    }
+
+def make_refund(ride_id, index):
+    """
+    Build a pending refund shaped like the ones stored in "refunds", for the
+    passenger at index of a ride.
+    """
+    return {
+        "rideId": ride_id,
+        "userId": f"user{index:04d}",
+        "paymentIntentId": f"pi_{ride_id}_{index:04d}",
+        "attempts": 0,
+    }
+
+def iter_rides(count):
+    """
+    Yield count ride documents, one at a time like Query.stream().
+    """
+    for index in range(count):
+        yield make_ride(index)
+
+class CountingClient:
+    """
+    Firestore client stand-in that counts RPCs. Each RPC waits latency_ms on
+    the network, with the GIL released, and spends cpu_ms building and parsing
+    messages, with the GIL held, plus cpu_ms_per_document for each document.
+    """
+
+    def __init__(self, latency_ms, cpu_ms=0.0, cpu_ms_per_document=0.0):
+        self.latency_ms = latency_ms
+        self.cpu_ms = cpu_ms
+        self.cpu_ms_per_document = cpu_ms_per_document
+        self.rpcs = 0
+        self.lock = threading.Lock()
+
+    def rpc(self, documents=1):
+        """
+        Count one RPC and wait out its latency and client CPU time.
+        """
+        with self.lock:
+            self.rpcs += 1
+        time.sleep(self.latency_ms / 1000)
+
+        busy_until = time.perf_counter() + (
+            self.cpu_ms + self.cpu_ms_per_document * documents
+        ) / 1000
+        while time.perf_counter() < busy_until:
+            pass
+
+    def document(self, path):
+        """
+        Reference the document at path.
+        """
+        return CountingDocumentReference(self, path)
+
+    def get_all(self, refs):
+        """
+        Get several documents in one RPC.
+        """
+        self.rpc(len(refs))
+        return [ref.snapshot() for ref in refs]
+
+class CountingDocumentReference:
+    """
+    Document reference whose get() is one RPC of its client.
+    """
+
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+
+    def snapshot(self):
+        """
+        Snapshot of the document, which always exists.
+        """
+        return SimpleNamespace(reference=self, exists=True, id=self.path.split("/")[-1])
+
+    def get(self):
+        """
+        Get the document in one RPC.
+        """
+        self.client.rpc()
+        return self.snapshot()
@@ -0,0 +1,119 @@
+"""
+Local stand-in for the Stripe refunds API, for exercising the refund pipeline
+without a Stripe account. Replays the first response for a repeated
+Idempotency-Key like Stripe does, and can add latency and random failures.
+
+Run it and point the app at it:
+    python3 stripe_stub.py --port 12111 --latency-ms 300
+    cd ../src && STRIPE_API_BASE=http://127.0.0.1:12111 python3 app.py
+
+stripe-mock (https://github.com/stripe/stripe-mock) covers the whole API if
+more than refunds is needed, but does not honour idempotency keys.
+"""
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import random
+import threading
+import time
+from urllib.parse import parse_qs
+
+class StripeStub(ThreadingHTTPServer):
+    """
+    HTTP server keeping the refunds it created, by idempotency key.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=0, failure_rate=0.0):
+        super().__init__(address, StripeStubHandler)
+        self.latency = latency_ms / 1000
+        self.failure_rate = failure_rate
+        self.refunds = {}
+        self.requests = 0
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def create_refund(self, idempotency_key, params):
+        """
+        Return (status, body) for a refund request.
+        """
+        with self.lock:
+            self.requests += 1
+            if idempotency_key in self.refunds:
+                return 200, self.refunds[idempotency_key]
+
+        time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            return 500, {"error": {"type": "api_error", "message": "Stub failure."}}
+
+        with self.lock:
+            refund = self.refunds.get(idempotency_key)
+            if refund is None:
+                refund = {
+                    "id": f"re_stub{next(self.ids):08d}",
+                    "object": "refund",
+                    "amount": 1250,
+                    "currency": "usd",
+                    "payment_intent": params.get("payment_intent"),
+                    "status": "succeeded",
+                    "metadata": {
+                        key[len("metadata["):-1]: value
+                        for key, value in params.items() if key.startswith("metadata[")
+                    },
+                }
+                if idempotency_key:
+                    self.refunds[idempotency_key] = refund
+        return 200, refund
+
+class StripeStubHandler(BaseHTTPRequestHandler):
+    """
+    Serves POST /v1/refunds.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """
+        Create a refund.
+        """
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        if self.path != "/v1/refunds":
+            error = {"type": "invalid_request_error", "message": "Not stubbed."}
+            self.respond(404, {"error": error})
+            return
+
+        params = {key: values[0] for key, values in parse_qs(body).items()}
+        self.respond(*self.server.create_refund(self.headers.get("Idempotency-Key"), params))
+
+    def respond(self, status, payload):
+        """
+        Send payload as a JSON response.
+        """
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    """
+    Serve the stub until interrupted.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StripeStub(("127.0.0.1", args.port), args.latency_ms, args.failure_rate)
+    print(f"Stripe stub listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,75 @@
-from datetime import (
-    timedelta, datetime
-)
-from functools import wraps
+import atexit
+from concurrent.futures import wait
 import os
-import pytz
-from flask import (
-    Flask, request, session, jsonify
-)
+from flask import Flask, Response, request, session, jsonify
 import google.cloud
-import firebase_admin
-from firebase_admin import credentials, firestore, auth
 from firebase_admin.auth import InvalidIdTokenError, EmailAlreadyExistsError
 from firebase_admin.exceptions import FirebaseError
 from flask_cors import CORS
-from apscheduler.schedulers.background import BackgroundScheduler
-from utils import (
-    print_json, check_required_fields,
+from utils import print_json, check_required_fields, handle_generic_error
+from app_config import load_config
+from app_services import (
+    auth, db, document_loader, job_queue, job_runner, last_message_buffer, maintenance,
+    outbox_dispatcher, refund_dispatcher, ride_chat_cache, services, stripe_client,
+    unread_count_cache,
+)
+from garage_cache import GarageCache
+from json_provider import FirestoreJSONProvider
+from maintenance_jobs import (
+    cancel_ride_expiry, compact_ride_chats, delete_past_rides, drain_outbox,
+    release_expired_seat_holds, retry_pending_refunds, schedule_ride_expiry,
 )
-from services.car_manager import CarManager
+from metrics import metrics
+from request_middleware import (
+    IdempotencyKeys, LocalResponseStore, RateLimiter, SingleFlight,
+    auth_required, get_user_id, get_user_name,
+)
+from response_compression import ResponseCompressor
+from responses import json_with_etag, not_modified, stream_json, tag_response
+from ride_deletion import DELETE_RIDE_JOB
+from service_wiring import register_services, shutdown
+from time_service import preload_zones, request_now, ride_departure_timestamp, utc_now
+from services.car_manager import CarManager, empty_garage
 from services.chat_messages_manager import ChatMessagesManager
+from services.inbox_manager import InboxManager
 from services.notification_manager import NotificationManager
 from services.payment_manager import PaymentManager
+from services.recurring_ride_manager import RecurringRideManager
+from services.refund_manager import RefundManager
 from services.ride_chat_manager import RideChatManager
-from services.ride_manager import RideManager
+from services.ride_manager import COMING_UP_RIDE_FIELDS, RideManager
 from services.user_manager import UserManager
 
 app = Flask(__name__)
+app.json = FirestoreJSONProvider(app)
 CORS(app, supports_credentials=True)
 app.secret_key = os.getenv('SECRET_KEY')
 
-app.config['SESSION_COOKIE_SECURE'] = False
-app.config['SESSION_COOKIE_HTTPONLY'] = True
-app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=1)
-app.config['SESSION_REFRESH_EACH_REQUEST'] = True
-app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+load_config(app.config)
 
-cred = credentials.Certificate("../config/firebase-config.json")
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+ResponseCompressor(app, min_size=app.config['COMPRESSION_MIN_BYTES'])
 
-def get_user_id():
-    """
-    Retrieve user's ID
-    """
-    return session.get('user', {}).get('uid')
+register_services(app.config)
+preload_zones()
 
-def get_user_name():
-    """
-    Retrieve user's name
-    """
-    return session.get('user').get('name')
+MAX_MESSAGES_PAGE_SIZE = 200
+DEFAULT_RIDE_CHATS_PAGE_SIZE = 50
+MAX_RIDE_CHATS_PAGE_SIZE = 100
 
-def auth_required(f):
-    """
-    Decorator to enforce user authentication for a route.
-    """
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user' not in session:
-            return jsonify({"error": "User is not logged in"}), 401
-        return f(*args, **kwargs)
+rate_limiter = RateLimiter(enabled=app.config['RATE_LIMIT_ENABLED'])
+single_flight = SingleFlight(enabled=app.config['COALESCE_REQUESTS'])
+idempotency_keys = IdempotencyKeys(
+    LocalResponseStore(
+        max_entries=int(os.getenv('IDEMPOTENCY_CACHE_SIZE', '10000')),
+        ttl_seconds=int(os.getenv('IDEMPOTENCY_TTL_SECONDS', '86400'))
+    ),
+    enabled=app.config['IDEMPOTENCY_KEYS_ENABLED']
+)
+poll_rate_limit = rate_limiter.limit(
+    app.config['POLL_RATE_LIMIT_PER_MINUTE'], burst=app.config['POLL_RATE_LIMIT_BURST']
+)
 
-    return decorated_function
+garage_cache = GarageCache(ttl_seconds=int(os.getenv('GARAGE_CACHE_TTL', '300')))
 
 @app.route('/auth', methods=['POST'])
 def authorize():
@@ -77,8 +85,7 @@ def authorize():
         decoded_token = auth.verify_id_token(token)
         session['user'] = decoded_token
 
-        response = jsonify({"message": "Logged in successfully", "cookie": decoded_token})
-        return response, 200
+        return jsonify({"message": "Logged in successfully"}), 200
     except InvalidIdTokenError:
         return jsonify({"error": "Unauthorized: Invalid token"}), 401
 
@@ -117,9 +124,8 @@ def api_signup():
         db.collection('users').document(user.uid).set({
             'name': name,
             'email': email,
-            'ridesPosted': [],
-            'ridesJoined': [],
-            'ridesRequested': []
+            'ridesRequested': [],
+            'garage': empty_garage()
         })
         return jsonify({"message": "Signup successful"}), 201
 
@@ -162,11 +168,12 @@ def api_add_car():
         return jsonify(missing_response[0]), missing_response[1]
 
     user_id = get_user_id()
-    car_manager = CarManager(db, user_id)
+    car_manager = CarManager(db, user_id, garage_cache)
     return car_manager.add_car(data)
 
 @app.route('/api/post-ride', methods=['POST'])
 @auth_required
+@idempotency_keys.idempotent
 def api_post_ride():
     """
     API Post a ride.
@@ -193,28 +200,72 @@ def api_post_ride():
     user_id = get_user_id()
     user_name = get_user_name()
 
-    user_manager = UserManager(db, user_id)
-    rides_posted = user_manager.get_rides_posted()
-
-    ride_manager = RideManager(db, user_id, user_name)
+    ride_manager = RideManager(db, user_id, user_name, document_loader)
     post_ride_response_data, post_ride_response_status_code = (
-        ride_manager.post_ride(rides_posted, data)
+        ride_manager.post_ride(data)
     )
 
     if post_ride_response_status_code != 201:
         return jsonify(post_ride_response_data), post_ride_response_status_code
 
     ride_id = post_ride_response_data.get("rideId")
+    schedule_ride_expiry(ride_id, post_ride_response_data.get("ride"))
 
+    user_manager = UserManager(db, user_id, document_loader)
     user_manager.add_posted_ride(ride_id)
 
     ride_chat_manager = RideChatManager(db, user_id, user_name)
-    ride_chat_manager.create_ride_chat(ride_id, data)
+    ride_chat_response_message, ride_chat_response_status_code = (
+        ride_chat_manager.create_ride_chat(ride_id, data)
+    )
+
+    if ride_chat_response_status_code == 201:
+        inbox_manager = InboxManager(db)
+        inbox_manager.add_entry(user_id, ride_id, ride_chat_response_message.get("chat"))
 
     return jsonify(post_ride_response_data), post_ride_response_status_code
 
+@app.route('/api/post-recurring-rides', methods=['POST'])
+@auth_required
+@idempotency_keys.idempotent
+def api_post_recurring_rides():
+    """
+    API Post a ride on every matching day of a date range.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "Invalid JSON payload"}), 400
+
+    required_fields = [
+      'car_select',
+      'license_plate',
+      'from',
+      'to',
+      'start_date',
+      'end_date',
+      'days_of_week',
+      'departure_time',
+      'max_passengers',
+      'cost'
+    ]
+
+    missing_response = check_required_fields(data, required_fields)
+    if missing_response:
+        return jsonify(missing_response[0]), missing_response[1]
+
+    user_id = get_user_id()
+    user_name = get_user_name()
+
+    recurring_ride_manager = RecurringRideManager(db, user_id, user_name, document_loader)
+    response_message, response_status_code = (
+        recurring_ride_manager.post_recurring_rides(data)
+    )
+
+    return jsonify(response_message), response_status_code
+
 @app.route('/api/request-ride', methods=['POST'])
 @auth_required
+@idempotency_keys.idempotent
 def api_request_ride():
     """
     API Request a ride.
@@ -235,7 +286,7 @@ def api_request_ride():
     user_name = get_user_name()
     ride_id = data.get('rideId').strip()
 
-    ride_manager = RideManager(db, user_id, user_name)
+    ride_manager = RideManager(db, user_id, user_name, document_loader)
     get_ride_response_data, get_ride_repsosne_status_code = (
         ride_manager.get_ride(ride_id)
     )
@@ -247,33 +298,26 @@ def api_request_ride():
         ride_manager.add_passenger(ride_id)
     )
 
+    refund = add_passenger_response_data.pop("refund", None)
+    if refund is not None:
+        refund_dispatcher.submit([refund])
+
     if add_passenger_response_status_code != 200:
         return jsonify(add_passenger_response_data), add_passenger_response_status_code
 
-    user_manager = UserManager(db, user_id)
-    user_manager.add_joined_ride(ride_id)
-
-    ride_chat_manager = RideChatManager(db, user_id, user_name)
-    ride_chat_manager.add_participant(ride_id)
-
-    ride_data = get_ride_response_data.get("ride")
-    ride_owner_id = ride_data['ownerID']
-    message = {
-        f"{user_name} has booked a ride with you\n"
-        f"From: {ride_data['from']}\n"
-        f"To: {ride_data['to']}"
-    }
-
-    notification_manager = NotificationManager(db)
-    notification_manager.store_notification(ride_owner_id, ride_id, message)
+    ride_chat_cache.invalidate(ride_id)
+    outbox_dispatcher.submit(add_passenger_response_data.get("eventId"))
 
     return jsonify(get_ride_response_data), get_ride_repsosne_status_code
 
 @app.route('/api/payment-sheet', methods=['POST'])
 @auth_required
+@idempotency_keys.idempotent
 def create_payment_sheet():
     """
-    Striple payment sheet.
+    Striple payment sheet. Holds a seat for the rider before creating the
+    payment intent, so riders who cannot get a seat are turned away before
+    Stripe is called. The hold is confirmed by request-ride.
     """
     data = request.get_json()
     if not data:
@@ -295,7 +339,7 @@ def create_payment_sheet():
     user_id = get_user_id()
     user_name = get_user_name()
 
-    ride_manager = RideManager(db, user_id, user_name)
+    ride_manager = RideManager(db, user_id, user_name, document_loader)
     get_ride_response_message, get_ride_response_status_code = (
         ride_manager.get_ride(ride_id)
     )
@@ -309,19 +353,9 @@ def create_payment_sheet():
     if ride_owner_id == user_id and not refund:
         return jsonify({"error": "User cannot book its own ride."}), 400
 
-    max_passengers = ride_data["maxPassengers"]
     curr_passengers = ride_data["currentPassengers"] or []
-    if len(curr_passengers) >= max_passengers and not refund:
-        return jsonify({"error": "Ride is full"}), 400
-
-    ride_date = ride_data["date"]
-    ride_time = ride_data["departureTime"]
-
-    pacific_zone = pytz.timezone("America/Los_Angeles")
-    ride_datetime = datetime.strptime(f"{ride_date} {ride_time}", "%Y-%m-%d %I:%M %p")
-    ride_datetime = pacific_zone.localize(ride_datetime)
 
-    if ride_datetime <= datetime.now(pacific_zone):
+    if ride_departure_timestamp(ride_data) <= request_now().timestamp():
         return jsonify({"error": "This ride is no longer available."}), 400
 
     amount = data.get("amount")
@@ -330,26 +364,43 @@ def create_payment_sheet():
     if user_id in curr_passengers and not refund:
         return jsonify({"error": "User already a passenger of this ride."}), 400
 
-    payment_manager = PaymentManager(user_id)
+    if not refund:
+        hold_response_message, hold_response_status_code = (
+            ride_manager.hold_seat(ride_id, app.config['SEAT_HOLD_TTL_SECONDS'])
+        )
+
+        if hold_response_status_code != 200:
+            return jsonify(hold_response_message), hold_response_status_code
+
+    payment_manager = PaymentManager(user_id, stripe_client)
     payment_sheet_response_message, payment_sheet_repsonse_status_code = (
         payment_manager.create_payment_sheet(ride_id, amount, stripe_customer_id)
     )
 
     if payment_sheet_repsonse_status_code != 200:
+        if not refund:
+            ride_manager.release_hold(ride_id, app.config['SEAT_HOLD_TTL_SECONDS'])
         return jsonify(payment_sheet_response_message), payment_sheet_repsonse_status_code
 
+    payment_intent_id = payment_sheet_response_message.pop("paymentIntentId")
+    if not refund:
+        ride_manager.seat_hold_manager.record_payment_intent(ride_id, user_id, payment_intent_id)
+        payment_sheet_response_message["holdExpiresAt"] = hold_response_message["holdExpiresAt"]
+
     session['stripe_customer_id'] = payment_sheet_response_message.get("customer")
 
     return jsonify(payment_sheet_response_message), payment_sheet_repsonse_status_code
 
 @app.route('/api/available-rides', methods=['GET'])
 @auth_required
+@poll_rate_limit
+@single_flight.coalesce
 def get_available_rides():
     """Fetch all available rides with status 'open'."""
     user_id = get_user_id()
     user_name = get_user_name()
 
-    user_manger = UserManager(db, user_id)
+    user_manger = UserManager(db, user_id, document_loader)
     user_ride_response_message, user_ride_response_status_code = (
         user_manger.get_user_ride()
     )
@@ -359,7 +410,14 @@ def get_available_rides():
 
     excluded_rides = user_ride_response_message.get("rides")
 
-    ride_manager = RideManager(db, user_id, user_name)
+    ride_manager = RideManager(db, user_id, user_name, document_loader)
+    if app.config['STREAM_JSON_RESPONSES']:
+        return stream_json(
+            "rides",
+            ride_manager.stream_available_rides(excluded_rides),
+            "Failed to fetch all available rides."
+        )
+
     avaiable_rides_response_message, avaiable_rides_response_status_code = (
         ride_manager.get_avaiable_rides(excluded_rides)
     )
@@ -376,7 +434,7 @@ def api_get_ride_details(ride_id):
     user_id = get_user_id()
     user_name = get_user_name()
 
-    ride_manager = RideManager(db, user_id, user_name)
+    ride_manager = RideManager(db, user_id, user_name, document_loader)
     get_ride_response_message, get_ride_response_status_code = (
         ride_manager.get_ride(ride_id)
     )
@@ -387,7 +445,7 @@ def api_get_ride_details(ride_id):
     ride_data = get_ride_response_message.get("ride")
     ride_data["id"] = ride_id
 
-    return jsonify({"ride": ride_data}), 200
+    return json_with_etag({"ride": ride_data}, get_ride_response_message["version"])
 
 @app.route('/api/coming-up-rides', methods=['GET'])
 @auth_required
@@ -396,7 +454,7 @@ def api_get_coming_up_rides():
     user_id = get_user_id()
     user_name = get_user_name()
 
-    user_manager = UserManager(db, user_id)
+    user_manager = UserManager(db, user_id, document_loader)
     user_ride_response_message, user_ride_response_status_code = (
         user_manager.get_user_ride()
     )
@@ -406,10 +464,10 @@ def api_get_coming_up_rides():
 
     user_rides = user_ride_response_message.get("rides")
 
-    ride_manager = RideManager(db, user_id, user_name)
+    ride_manager = RideManager(db, user_id, user_name, document_loader)
 
     rides_by_ids_response_message, rides_by_ids_response_status_code = (
-        ride_manager.get_rides_by_ids(user_rides)
+        ride_manager.get_rides_by_ids(user_rides, field_paths=COMING_UP_RIDE_FIELDS)
     )
 
     if rides_by_ids_response_status_code != 200:
@@ -451,41 +509,94 @@ def api_cancel_ride():
     user_name = get_user_name()
     ride_id = data.get("rideId")
 
-    ride_manager = RideManager(db, user_id, user_name)
+    ride_manager = RideManager(db, user_id, user_name, document_loader)
     remove_passenger_response_message, remove_passenger_response_status_code = (
-        ride_manager.remove_passenger(ride_id)
+        ride_manager.remove_passenger(ride_id, app.config['SEAT_HOLD_TTL_SECONDS'])
     )
 
     if remove_passenger_response_status_code != 200:
         return jsonify(remove_passenger_response_message), remove_passenger_response_status_code
 
-    user_manager = UserManager(db, user_id)
-    user_manager.remove_joined_ride(ride_id)
+    ride_chat_cache.invalidate(ride_id)
+    outbox_dispatcher.submit(remove_passenger_response_message.get("eventId"))
 
-    ride_chat_mamager = RideChatManager(db, user_id, user_name)
-    ride_chat_mamager.remove_participant(ride_id)
+    return jsonify({"message": "Ride successfully cancelled"}), 200
 
-    get_ride_response = ride_manager.get_ride(ride_id)
-    ride_data = get_ride_response[0].get("ride")
+@app.route('/api/refunds', methods=['GET'])
+@auth_required
+def api_get_refunds():
+    """
+    Fetch the status of the refunds owed to the user for deleted rides.
+    """
+    user_id = get_user_id()
 
-    ride_owner_id = ride_data.get("ownerID")
-    start = ride_data.get("from")
-    destination = ride_data.get("to")
+    refund_manager = RefundManager(db)
+    response_message, response_status_code = refund_manager.get_refunds_for_user(user_id)
 
-    message = (
-        f"{user_name} has cancelled a ride with you.\n"
-        f"From: {start}\n"
-        f"To: {destination}"
-    )
-    notification_manager = NotificationManager(db)
-    notification_manager.store_notification(ride_owner_id, ride_id, message)
+    return jsonify(response_message), response_status_code
 
-    return jsonify({"message": "Ride successfully cancelled"}), 200
+@app.route('/api/join-waitlist', methods=['POST'])
+@auth_required
+def api_join_waitlist():
+    """
+    Join the waitlist of a full ride. The rider is notified when a seat is
+    held for them, instead of polling for one.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "Invalid JSON payload"}), 400
+
+    required_fields = [
+      'rideId',
+    ]
+
+    missing_response = check_required_fields(data, required_fields)
+    if missing_response:
+        return jsonify(missing_response[0]), missing_response[1]
+
+    user_id = get_user_id()
+    user_name = get_user_name()
+    ride_id = data.get("rideId").strip()
+
+    ride_manager = RideManager(db, user_id, user_name, document_loader)
+    response_message, response_status_code = ride_manager.join_waitlist(ride_id)
+
+    return jsonify(response_message), response_status_code
+
+@app.route('/api/leave-waitlist', methods=['POST'])
+@auth_required
+def api_leave_waitlist():
+    """
+    Leave the waitlist of a ride.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "Invalid JSON payload"}), 400
+
+    required_fields = [
+      'rideId',
+    ]
+
+    missing_response = check_required_fields(data, required_fields)
+    if missing_response:
+        return jsonify(missing_response[0]), missing_response[1]
+
+    user_id = get_user_id()
+    user_name = get_user_name()
+    ride_id = data.get("rideId").strip()
+
+    ride_manager = RideManager(db, user_id, user_name, document_loader)
+    response_message, response_status_code = ride_manager.leave_waitlist(ride_id)
+
+    return jsonify(response_message), response_status_code
 
 @app.route('/api/delete-ride', methods=['POST'])
+@auth_required
 def api_delete_ride():
     """
-    Delete a ride
+    Delete a ride. The ride is marked as being deleted and a background job
+    removes it with its members, chat and waitlist, refunds its passengers and
+    notifies them. Returns 202 with the id of that job.
     """
     data = request.get_json()
     if not data:
@@ -503,62 +614,85 @@ def api_delete_ride():
     user_id = get_user_id()
     user_name = get_user_name()
 
-    ride_manager = RideManager(db, user_id, user_name)
-    delete_ride_response_message, delete_ride_response_status_code = (
-        ride_manager.delete_ride(ride_id)
+    ride_manager = RideManager(db, user_id, user_name, document_loader)
+    response_message, response_status_code = ride_manager.mark_deleting(
+        ride_id, job_queue.new_job_id()
     )
 
-    if delete_ride_response_status_code != 200:
-        return jsonify(delete_ride_response_message), delete_ride_response_status_code
-
-    user_manager = UserManager(db, user_id)
-    user_manager.remove_posted_ride(ride_id)
+    if response_status_code != 202:
+        return jsonify(response_message), response_status_code
 
-    deleted_ride_data = delete_ride_response_message.get("deletedRide")
-    passengers = deleted_ride_data.get("currentPassengers")
+    ride_data = response_message.pop("ride")
+    cancel_ride_expiry(ride_id)
 
-    for passenger in passengers:
-        user_manager = UserManager(db, passenger)
-        user_manager.remove_joined_ride(ride_id)
-
-    chat_messages_manager = ChatMessagesManager(db, ride_id, user_id, user_name)
-    chat_messages_manager.delete_all_messages()
+    try:
+        job_queue.enqueue(DELETE_RIDE_JOB, {
+            "rideId": ride_id,
+            "ownerId": user_id,
+            "ownerName": user_name,
+            "from": ride_data.get("from"),
+            "to": ride_data.get("to"),
+            "date": ride_data.get("date"),
+            "cost": ride_data.get("cost"),
+        }, job_id=response_message["jobId"])
+    except Exception as e:
+        # The ride stays marked as being deleted; deleting it again enqueues its job,
+        # or queues the job again if it failed.
+        return jsonify(handle_generic_error(e, "Failed to delete ride. Please try again.")[0]), 500
 
-    ride_chat_manager = RideChatManager(db, user_id, user_name)
-    response_message, response_status = ride_chat_manager.delete_ride_chat(ride_id)
-    if response_status != 200:
-        print(response_message.get("details"))
-
-    start = deleted_ride_data.get("from")
-    destination = deleted_ride_data.get("to")
-    date = deleted_ride_data.get("date")
-    cost = deleted_ride_data.get("cost") * 1.20
-
-    message = (
-        f"${cost:.2f} has been refunded to you.\n"
-        f"{user_name} (ride's owner) has delete this ride.\n"
-        f"From: {start}\n"
-        f"To: {destination}\n"
-        f"To: {date}"
-    )
+    job_runner.wake()
+    response_message["status"] = "deleting"
+    return jsonify(response_message), 202
 
-    notification_manager = NotificationManager(db)
-    notification_manager.store_notification_for_users(passengers, ride_id, message)
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@auth_required
+def api_get_job(job_id):
+    """
+    Return the status of a background job started by the user.
+    """
+    job = job_queue.get(job_id)
+    if job is None or job["payload"].get("ownerId") != get_user_id():
+        return jsonify({"error": "Job not found"}), 404
 
-    return jsonify(delete_ride_response_message), delete_ride_response_status_code
+    return jsonify({
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "error": job["error"],
+        "completedSteps": job["state"].get("done", []),
+        "createdAt": job["createdAt"],
+        "updatedAt": job["updatedAt"],
+    }), 200
 
 @app.route('/api/unread-notifications-count', methods=['GET'])
 @auth_required
+@poll_rate_limit
+@single_flight.coalesce
 def api_get_unread_notifications_count():
     """
-    Fetch the number of unread notifications.
+    Fetch the number of unread notifications with its version. Counts are
+    served from the listener-backed cache when possible. Pass the version as
+    "since" to get an empty 204 while the count is unchanged.
     """
     user_id = get_user_id()
-    user_manager = UserManager(db, user_id)
+    cached = unread_count_cache.get(user_id)
 
-    response_message, response_status_code = (
-        user_manager.get_unread_notification_count()
-    )
+    if cached is None:
+        user_manager = UserManager(db, user_id, document_loader)
+        response_message, response_status_code = (
+            user_manager.get_unread_notification_count()
+        )
+    elif not cached[0]:
+        response_message, response_status_code = {"error": "User not found"}, 404
+    else:
+        response_message, response_status_code = {
+            "unread_count": cached[1],
+            "version": cached[2]
+        }, 200
+
+    if response_status_code == 200 and request.args.get("since") == response_message["version"]:
+        return Response(status=204)
 
     return jsonify(response_message), response_status_code
 
@@ -570,6 +704,13 @@ def api_get_all_notifications():
     user_id = get_user_id()
     notification_manager = NotificationManager(db)
 
+    if app.config['STREAM_JSON_RESPONSES']:
+        return stream_json(
+            "notifications",
+            notification_manager.stream_notifications_for_user(user_id),
+            "Failed to fetch user notifications."
+        )
+
     response_message, response_status_code = (
         notification_manager.get_all_notifications_for_user(user_id)
     )
@@ -584,12 +725,15 @@ def api_get_cars():
     """
     user_id = get_user_id()
 
-    car_manager = CarManager(db, user_id)
+    car_manager = CarManager(db, user_id, garage_cache)
     response_message, response_status_code = (
         car_manager.get_cars_for_user()
     )
 
-    return jsonify(response_message), response_status_code
+    if response_status_code != 200:
+        return jsonify(response_message), response_status_code
+
+    return json_with_etag(response_message, response_message.pop("version"))
 
 @app.route('/api/home', methods=['GET'])
 @auth_required
@@ -605,6 +749,7 @@ def api_home():
 
 @app.route('/api/send-message', methods=['POST'])
 @auth_required
+@idempotency_keys.idempotent
 def api_send_message():
     """
     Send a message.
@@ -631,7 +776,7 @@ def api_send_message():
 
     ride_chat_manager = RideChatManager(db, user_id, user_name)
     ride_chat_response_message, ride_chat_response_status_code = (
-        ride_chat_manager.update_last_message(ride_id, text, timestamp)
+        ride_chat_manager.authorize_sender(ride_chat_cache, ride_id, text)
     )
 
     if ride_chat_response_status_code != 200:
@@ -641,37 +786,40 @@ def api_send_message():
     owner_id = ride_chat_details.get("owner")
     is_owner = user_id == owner_id
 
+    event_data = {
+        "userId": user_id,
+        "userName": user_name,
+        "recipients": [p for p in ride_chat_details.get("participants") if p != user_id],
+        "from": ride_chat_details.get("from"),
+        "to": ride_chat_details.get("to")
+    }
+
     chat_message_manager = ChatMessagesManager(db, ride_id, user_id, user_name)
     chat_message_response_message, chat_message_status_code = (
-        chat_message_manager.send_message(text, timestamp, is_owner)
+        chat_message_manager.send_message(text, timestamp, is_owner, event_data)
     )
 
     if chat_message_status_code != 201:
         print(chat_message_response_message)
         return jsonify(chat_message_response_message), chat_message_status_code
 
-    participants = ride_chat_details.get("participants", [])
-    participants = [p for p in participants if p != user_id]
-
-    start = ride_chat_details.get('from')
-    destination = ride_chat_details.get('to')
-    notification_message = (
-        f"{user_name} has sent a message.\n"
-        f"From: {start}\n"
-        f"To: {destination}"
-    )
-
-    print(participants)
-    notification_manager = NotificationManager(db)
-    notification_manager.store_notification_for_users(participants, ride_id, notification_message)
+    last_message_buffer.record(ride_id, {
+        "lastMessage": text,
+        "lastMessageTimestamp": utc_now(),
+        "UsernameLastMessage": user_name
+    }, user_id, ride_chat_details.get("participants"))
+    outbox_dispatcher.submit(chat_message_response_message.pop("eventId"))
 
     return jsonify(chat_message_response_message), chat_message_status_code
 
 @app.route('/api/get-messages/<ride_chat_id>', methods=['GET'])
 @auth_required
+@poll_rate_limit
+@single_flight.coalesce
 def api_get_messages(ride_chat_id):
     """
-    Fetch all messages from a rideChat.
+    Fetch all messages from a rideChat, or one page of them when "limit" is given.
+    Pages are oldest first; pass the returned "nextCursor" as "before" for older ones.
     """
     user_id = get_user_id()
     user_name = get_user_name()
@@ -684,12 +832,48 @@ def api_get_messages(ride_chat_id):
     if ride_chat_response_status_code != 200:
         return jsonify(ride_chat_response_message), ride_chat_response_status_code
 
+    inbox_manager = InboxManager(db)
+    inbox_manager.mark_read(user_id, ride_chat_id)
+
     chat_message_manager = ChatMessagesManager(db, ride_chat_id, user_id, user_name)
-    chat_message_response_message, chat_message_response_status_code = (
-        chat_message_manager.get_messages_sorted_by_timestamp_asc()
+
+    limit = request.args.get('limit', type=int)
+    before = request.args.get('before')
+
+    version_response_message, version_response_status_code = (
+        chat_message_manager.get_version(limit, before)
     )
+    if version_response_status_code != 200:
+        return jsonify(version_response_message), version_response_status_code
+
+    etag = version_response_message["version"]
+    unchanged_response = not_modified(etag)
+    if unchanged_response is not None:
+        return unchanged_response
+
+    if limit:
+        chat_message_response_message, chat_message_response_status_code = (
+            chat_message_manager.get_messages_page(min(limit, MAX_MESSAGES_PAGE_SIZE), before)
+        )
+    elif app.config['STREAM_JSON_RESPONSES']:
+        response = stream_json(
+            "messages",
+            chat_message_manager.stream_messages_sorted_by_timestamp_asc(),
+            "Failed to fetch messages.",
+            keyed=True
+        )
+        if isinstance(response, Response):
+            tag_response(response, etag)
+        return response
+    else:
+        chat_message_response_message, chat_message_response_status_code = (
+            chat_message_manager.get_messages_sorted_by_timestamp_asc()
+        )
+
+    if chat_message_response_status_code != 200:
+        return jsonify(chat_message_response_message), chat_message_response_status_code
 
-    return jsonify(chat_message_response_message), chat_message_response_status_code
+    return json_with_etag(chat_message_response_message, etag)
 
 @app.route('/api/check-ride-chat/<ride_chat_id>', methods=['GET'])
 @auth_required
@@ -713,57 +897,88 @@ def api_check_ride_chat(ride_chat_id):
 @auth_required
 def api_get_all_user_ride_chats():
     """
-    Fetch all the ride chats for the user.
+    Fetch a page of the user's ride chats, most recent message first, with
+    per-chat unread counts. Pass the returned "nextCursor" as "after" for the next page.
     """
     user_id = get_user_id()
-    user_name = get_user_name()
-
-    user_manager = UserManager(db, user_id)
-    response = user_manager.get_user_ride()
-    ride_ids = response[0].get("rides")
+    limit = request.args.get('limit', default=DEFAULT_RIDE_CHATS_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_RIDE_CHATS_PAGE_SIZE))
 
-    ride_chat_manager = RideChatManager(db,  user_id, user_name)
-    ride_chat_response_message, ride_chat_response_status_code = (
-        ride_chat_manager.get_all_user_ride_chats(ride_ids)
+    inbox_manager = InboxManager(db)
+    response_message, response_status_code = (
+        inbox_manager.get_inbox_page(user_id, limit, request.args.get('after'))
     )
 
-    return jsonify(ride_chat_response_message), ride_chat_response_status_code
+    if response_status_code != 200:
+        return jsonify(response_message), response_status_code
+
+    return json_with_etag(response_message, response_message.pop("version"))
 
-def delete_past_rides():
+@app.route('/api/health', methods=['GET'])
+def api_health():
     """
-    Deletes past rides from Firestore.
+    Liveness check that does not touch Firestore.
     """
-    print("Checking for past rides...")
-
-    ride_manager = RideManager(db, None, None)
-    response = ride_manager.delete_past_rides()
-
-    deleted_rides = response[0].get("deletedRides")
+    return jsonify({"status": "ok"}), 200
 
-    for ride in deleted_rides:
-        ride_id = ride.get("id")
-        owner_id = ride.get("ownerID")
-        owner_name = ride.get("ownerName")
-        passenger_ids = ride.get("currentPassengers")
-
-        print("Deleting ", ride_id)
+@app.route('/api/metrics', methods=['GET'])
+@auth_required
+def api_metrics():
+    """
+    Return the in-process request counters, such as coalesced and throttled requests.
+    Only users listed in METRICS_USER_IDS may read them.
+    """
+    if get_user_id() not in app.config['METRICS_USER_IDS']:
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify({"metrics": metrics.snapshot()}), 200
 
-        owner_user_manager = UserManager(db, owner_id)
-        owner_user_manager.remove_posted_ride(ride_id)
+def start_scheduler(lock_path=None):
+    """
+    Start the scheduler and ride expiry, unless the app runs in lazy startup
+    mode, where the maintenance jobs are left to an external scheduler. With
+    lock_path, only the process holding a lock on that file starts them.
+    """
+    if app.config['LAZY_STARTUP']:
+        return False
+    return maintenance.start(lock_path)
 
-        for passenger_id in passenger_ids:
-            passenger_user_manager = UserManager(db, passenger_id)
-            passenger_user_manager.remove_joined_ride(ride_id)
+def run_scheduled_jobs():
+    """
+    Run every maintenance job once, for external schedulers in lazy startup mode.
+    Ride delete jobs run first, so departed rides being deleted are refunded
+    by their job before the expiry sweep.
+    """
+    job_runner.run_pending()
+    delete_past_rides()
+    compact_ride_chats()
+    release_expired_seat_holds(app.config['SEAT_HOLD_TTL_SECONDS'])
+    wait(retry_pending_refunds())
+    drain_outbox()
 
-        chat_message_manager = ChatMessagesManager(db, ride_id, owner_id, owner_name)
-        chat_message_manager.delete_all_messages()
+def warm_up():
+    """
+    Prepare a freshly started process before it serves requests: fetch the
+    service account token, open the Firestore channel and start the last
+    message buffer and the background job runner. Runs after forking, since
+    gRPC channels cannot be shared across a fork. A failed warm-up is reported
+    but does not stop the process; the first requests then pay for the
+    connection instead. Skipped in lazy startup mode, where each client is
+    created by its first request.
+    """
+    if app.config['LAZY_STARTUP']:
+        return
 
-        ride_chat_manager = RideChatManager(db, owner_id, owner_name)
-        ride_chat_manager.delete_ride_chat(ride_id)
+    last_message_buffer.start()
+    job_runner.start()
+    try:
+        services.get("credential").get_access_token()
+        db.collection("rides").limit(1).select([]).get(timeout=10)
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
 
-scheduler = BackgroundScheduler()
-scheduler.add_job(delete_past_rides, "interval", minutes=10)
-scheduler.start()
+atexit.register(shutdown)
 
 if __name__ == "__main__":
+    warm_up()
+    start_scheduler()
     app.run(host='0.0.0.0', port=8090, debug=True, threaded=True)
@@ -0,0 +1,42 @@
+from datetime import timedelta
+import os
+
+def load_config(config):
+    """
+    Set the Flask config of the app, mostly from environment variables.
+    """
+    config['SESSION_COOKIE_SECURE'] = False
+    config['SESSION_COOKIE_HTTPONLY'] = True
+    config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=1)
+    config['SESSION_REFRESH_EACH_REQUEST'] = True
+    config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+    config['STREAM_JSON_RESPONSES'] = (
+        os.getenv('STREAM_JSON_RESPONSES', 'true').strip().lower() == 'true'
+    )
+    config['COMPRESSION_MIN_BYTES'] = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+    config['RATE_LIMIT_ENABLED'] = (
+        os.getenv('RATE_LIMIT_ENABLED', 'true').strip().lower() == 'true'
+    )
+    config['COALESCE_REQUESTS'] = (
+        os.getenv('COALESCE_REQUESTS', 'true').strip().lower() == 'true'
+    )
+    config['LAZY_STARTUP'] = (
+        os.getenv('LAZY_STARTUP', 'false').strip().lower() == 'true'
+    )
+    config['IDEMPOTENCY_KEYS_ENABLED'] = (
+        os.getenv('IDEMPOTENCY_KEYS_ENABLED', 'true').strip().lower() == 'true'
+    )
+    config['POLL_RATE_LIMIT_PER_MINUTE'] = int(os.getenv('POLL_RATE_LIMIT_PER_MINUTE', '120'))
+    config['POLL_RATE_LIMIT_BURST'] = int(os.getenv('POLL_RATE_LIMIT_BURST', '20'))
+    config['RIDE_EXPIRY_LOOKAHEAD_SECONDS'] = int(
+        os.getenv('RIDE_EXPIRY_LOOKAHEAD_SECONDS', '900')
+    )
+    config['RIDE_EXPIRY_REFILL_SECONDS'] = int(os.getenv('RIDE_EXPIRY_REFILL_SECONDS', '60'))
+    config['SEAT_HOLD_TTL_SECONDS'] = int(os.getenv('SEAT_HOLD_TTL_SECONDS', '600'))
+    config['JOB_QUEUE_PATH'] = os.getenv('JOB_QUEUE_PATH', '/tmp/roadbuddy-jobs.sqlite3')
+    config['DELETE_WRITE_WORKERS'] = int(os.getenv('DELETE_WRITE_WORKERS', '4'))
+    config['METRICS_USER_IDS'] = frozenset(
+        user_id.strip()
+        for user_id in os.getenv('METRICS_USER_IDS', '').split(',')
+        if user_id.strip()
+    )
@@ -0,0 +1,18 @@
+from service_container import create_services
+
+# External clients are created on first use, so importing the app stays cheap.
+# The background services are registered by service_wiring.register_services.
+services = create_services("../config/firebase-config.json")
+db = services.proxy("db")
+auth = services.proxy("auth")
+stripe_client = services.proxy("stripe")
+
+ride_chat_cache = services.proxy("ride_chat_cache")
+document_loader = services.proxy("document_loader")
+last_message_buffer = services.proxy("last_message_buffer")
+refund_dispatcher = services.proxy("refund_dispatcher")
+job_queue = services.proxy("job_queue")
+job_runner = services.proxy("job_runner")
+outbox_dispatcher = services.proxy("outbox_dispatcher")
+unread_count_cache = services.proxy("unread_count_cache")
+maintenance = services.proxy("maintenance")
@@ -0,0 +1,101 @@
+from concurrent.futures import Future
+import threading
+from metrics import metrics
+
+class PendingBatch:
+    """
+    Document gets collected during one batching window.
+    """
+
+    def __init__(self):
+        """
+        Initialize the PendingBatch.
+        """
+        self.refs = {}
+        self.futures = {}
+        self.full = threading.Event()
+
+class DocumentLoader:
+    """
+    Batches single-document gets issued by concurrent requests.
+
+    The first get() of a window waits up to window_ms for more gets from other
+    threads, then fetches them all with one db.get_all() and hands every waiter
+    its snapshot. A window closes early once it holds max_batch_size documents.
+    Gets of the same document within a window share one read. Every batch is
+    sent after all its gets were issued, so a get sees every write that
+    finished before it was called.
+    """
+
+    def __init__(self, db, window_ms=2, max_batch_size=100, enabled=True):
+        """
+        Initialize the DocumentLoader.
+        """
+        self.db = db
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.enabled = enabled
+        self.pending = None
+        self.lock = threading.Lock()
+
+    def get(self, doc_ref):
+        """
+        Fetch a document snapshot, batched with concurrent gets.
+        """
+        if not self.enabled:
+            return doc_ref.get()
+
+        path = doc_ref.path
+        with self.lock:
+            batch = self.pending
+            leader = batch is None
+            if leader:
+                batch = self.pending = PendingBatch()
+
+            future = batch.futures.get(path)
+            if future is None:
+                future = batch.futures[path] = Future()
+                batch.refs[path] = doc_ref
+                if len(batch.refs) >= self.max_batch_size:
+                    self.pending = None
+                    batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self.lock:
+                if self.pending is batch:
+                    self.pending = None
+            self.dispatch(batch)
+
+        return future.result()
+
+    def dispatch(self, batch):
+        """
+        Fetch every document of a batch with one get_all and resolve its futures.
+        """
+        metrics.increment("document_loader_batches")
+        metrics.increment("document_loader_documents", value=len(batch.refs))
+        try:
+            snapshots = {
+                snapshot.reference.path: snapshot
+                for snapshot in self.db.get_all(list(batch.refs.values()))
+            }
+        except Exception as e:
+            for future in batch.futures.values():
+                future.set_exception(e)
+            return
+
+        for path, future in batch.futures.items():
+            snapshot = snapshots.get(path)
+            if snapshot is None:
+                future.set_exception(LookupError(f"get_all returned no snapshot for {path}"))
+            else:
+                future.set_result(snapshot)
+
+def get_document(doc_ref, document_loader=None):
+    """
+    Fetch a document snapshot through the loader when one is given.
+    """
+    if document_loader is None:
+        return doc_ref.get()
+    return document_loader.get(doc_ref)
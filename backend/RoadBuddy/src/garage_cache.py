@@ -0,0 +1,47 @@
+import copy
+import threading
+from cachetools import TTLCache
+
+class GarageCache:
+    """
+    In-process cache of users' garage summaries.
+
+    Every worker process keeps its own entries, so a cached garage is only
+    served after checking that its revision is still the stored one. That
+    check reads a single field instead of the whole garage. Adding a car
+    through this process replaces the user's entry with the garage written
+    by the transaction. Entries expire after ttl_seconds.
+    """
+
+    def __init__(self, ttl_seconds=300, maxsize=10000):
+        """
+        Initialize the GarageCache.
+        """
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self.lock = threading.Lock()
+
+    def get(self, user_id, loader, revision_loader):
+        """
+        Fetch a user's garage, calling loader() on a miss or when
+        revision_loader() returns a different revision than the cached one.
+        """
+        with self.lock:
+            garage = self.cache.get(user_id)
+        if garage is None or revision_loader() != garage.get("revision"):
+            garage = loader()
+            self.put(user_id, garage)
+        return copy.deepcopy(garage)
+
+    def put(self, user_id, garage):
+        """
+        Store a user's garage.
+        """
+        with self.lock:
+            self.cache[user_id] = copy.deepcopy(garage)
+
+    def invalidate(self, user_id):
+        """
+        Drop a user's garage from the cache.
+        """
+        with self.lock:
+            self.cache.pop(user_id, None)
@@ -0,0 +1,62 @@
+"""
+Gunicorn production profile, run from backend/RoadBuddy/src:
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+GUNICORN_WORKER_CLASS picks the worker model:
+- "gthread" (default): WORKERS processes with THREADS threads each.
+- "gevent": WORKERS processes with up to WORKER_CONNECTIONS greenlets each.
+  Requires the gevent package.
+"""
+# Settings and hook arguments use gunicorn's names, and hooks import the app
+# in the worker rather than when gunicorn reads this file.
+# pylint: disable=invalid-name,import-outside-toplevel,unused-argument
+import multiprocessing
+import os
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+
+bind = os.getenv("BIND", "0.0.0.0:8090")
+workers = int(os.getenv("WORKERS", str(multiprocessing.cpu_count())))
+threads = int(os.getenv("THREADS", "8"))
+worker_connections = int(os.getenv("WORKER_CONNECTIONS", "500"))
+
+# Import the app once in the master; workers share its memory copy-on-write.
+# gevent workers monkey patch only after the fork, so locks and clients the
+# app created in the master would not be cooperative; they import it themselves.
+preload_app = worker_class != "gevent"
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then so slow leaks cannot accumulate.
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = "-"
+
+SCHEDULER_LOCK_PATH = os.getenv("SCHEDULER_LOCK_PATH", "/tmp/roadbuddy-scheduler.lock")
+
+def post_worker_init(worker):
+    """
+    Warm the worker up and let one worker run the scheduled jobs.
+    """
+    import app
+
+    if worker_class == "gevent":
+        # Make gRPC cooperative before warm_up opens the Firestore connection.
+        from grpc.experimental import gevent as grpc_gevent
+        grpc_gevent.init_gevent()
+
+    app.warm_up()
+    if os.getenv("RUN_SCHEDULER", "true").strip().lower() == "true":
+        app.start_scheduler(SCHEDULER_LOCK_PATH)
+
+def worker_exit(server, worker):
+    """
+    Flush buffered writes before the worker goes away.
+    """
+    import app
+
+    app.shutdown()
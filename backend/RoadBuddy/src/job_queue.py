@@ -0,0 +1,270 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from worker_thread import WorkerThread
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+@dataclass
+class Job:
+    """
+    A claimed job. Handlers keep their progress in state and call checkpoint()
+    after each step, so a retried job skips the steps that already ran.
+    """
+
+    queue: "SQLiteJobQueue"
+    id: str
+    kind: str
+    payload: dict
+    state: dict
+    attempts: int
+
+    def checkpoint(self):
+        """
+        Save the job's state and extend its lease.
+        """
+        self.queue.checkpoint(self.id, self.state)
+
+class SQLiteJobQueue:
+    """
+    Durable job queue in a local SQLite file, shared by the worker processes of
+    one host.
+
+    A claimed job is leased for lease_seconds, and checkpoints extend the
+    lease. If its process dies, another process claims the job again once the
+    lease runs out. Failed jobs are retried with exponential backoff up to
+    max_attempts. Deployments spread over several hosts can swap in any queue
+    with the same enqueue, claim, checkpoint, complete, fail and get methods.
+    """
+
+    def __init__(self, path, lease_seconds=300, max_attempts=5, retry_delay_seconds=5):
+        """
+        Initialize the SQLiteJobQueue. The file is created on first use.
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay_seconds
+        self.created = False
+        self.lock = threading.Lock()
+
+    def connect(self):
+        """
+        Open a connection, creating the jobs table on first use.
+        """
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        if not self.created:
+            with self.lock:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS jobs ("
+                    " id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL,"
+                    " state TEXT NOT NULL DEFAULT '{}', status TEXT NOT NULL,"
+                    " attempts INTEGER NOT NULL DEFAULT 0, error TEXT,"
+                    " run_after REAL NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+                )
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, run_after)"
+                )
+                self.created = True
+        return connection
+
+    @staticmethod
+    def new_job_id():
+        """
+        Generate a job id.
+        """
+        return uuid.uuid4().hex
+
+    def enqueue(self, kind, payload, job_id=None):
+        """
+        Add a job and return its id. Enqueuing an existing job id does nothing,
+        unless the job failed: it is queued again with fresh attempts and keeps
+        its state, so it resumes after its last checkpoint.
+        """
+        job_id = job_id or self.new_job_id()
+        now = time.time()
+        connection = self.connect()
+        try:
+            connection.execute(
+                "INSERT INTO jobs (id, kind, payload, status, run_after, created_at,"
+                " updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (id) DO UPDATE SET status = excluded.status, attempts = 0,"
+                " error = NULL, run_after = excluded.run_after, updated_at = excluded.updated_at"
+                " WHERE jobs.status = ?",
+                (job_id, kind, json.dumps(payload), QUEUED, now, now, now, FAILED)
+            )
+        finally:
+            connection.close()
+        return job_id
+
+    def claim(self):
+        """
+        Lease the oldest job that is due, or a running job whose lease ran out.
+        Returns None when there is none.
+        """
+        now = time.time()
+        connection = self.connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) AND run_after <= ?"
+                " ORDER BY run_after LIMIT 1",
+                (QUEUED, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+
+            connection.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, run_after = ?,"
+                " updated_at = ? WHERE id = ?",
+                (RUNNING, now + self.lease_seconds, now, row["id"])
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+        return Job(
+            self, row["id"], row["kind"], json.loads(row["payload"]),
+            json.loads(row["state"]), row["attempts"] + 1
+        )
+
+    def update(self, job_id, **fields):
+        """
+        Update columns of a job.
+        """
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        connection = self.connect()
+        try:
+            connection.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id)
+            )
+        finally:
+            connection.close()
+
+    def checkpoint(self, job_id, state):
+        """
+        Save a running job's state and extend its lease.
+        """
+        self.update(job_id, state=json.dumps(state), run_after=time.time() + self.lease_seconds)
+
+    def complete(self, job_id, state):
+        """
+        Mark a job as succeeded.
+        """
+        self.update(job_id, state=json.dumps(state), status=SUCCEEDED, error=None)
+
+    def fail(self, job, error):
+        """
+        Record a failed attempt, retrying the job later unless it ran out of attempts.
+        """
+        if job.attempts >= self.max_attempts:
+            self.update(job.id, state=json.dumps(job.state), status=FAILED, error=error)
+        else:
+            self.update(
+                job.id,
+                state=json.dumps(job.state),
+                status=QUEUED,
+                error=error,
+                run_after=time.time() + self.retry_delay * 2 ** (job.attempts - 1)
+            )
+
+    def get(self, job_id):
+        """
+        Fetch a job as a dict, or None if it does not exist.
+        """
+        connection = self.connect()
+        try:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            connection.close()
+
+        if row is None:
+            return None
+
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "payload": json.loads(row["payload"]),
+            "state": json.loads(row["state"]),
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "error": row["error"],
+            "createdAt": row["created_at"],
+            "updatedAt": row["updated_at"],
+        }
+
+class JobRunner:
+    """
+    Background thread running queued jobs with the handler registered for their kind.
+    """
+
+    def __init__(self, queue, handlers, poll_interval_seconds=5):
+        """
+        Initialize the JobRunner. handlers maps a job kind to a function taking the Job.
+        """
+        self.queue = queue
+        self.handlers = handlers
+        self.worker = WorkerThread("job-runner", self.run_due, poll_interval_seconds)
+
+    def start(self):
+        """
+        Start the runner thread.
+        """
+        self.worker.start()
+
+    def wake(self):
+        """
+        Start the runner if needed and make it look for jobs now.
+        """
+        self.worker.start()
+        self.worker.wake()
+
+    def stop(self):
+        """
+        Stop the runner thread after its current job.
+        """
+        self.worker.stop()
+
+    def run_due(self):
+        """
+        Run due jobs until none is left or the runner is stopped.
+        """
+        while not self.worker.stopped() and self.run_next():
+            pass
+
+    def run_pending(self):
+        """
+        Run every job that is due, for external schedulers in lazy startup mode.
+        """
+        while self.run_next():
+            pass
+
+    def run_next(self):
+        """
+        Claim and run one job. Returns False when no job was due.
+        """
+        job = self.queue.claim()
+        if job is None:
+            return False
+
+        try:
+            self.handlers[job.kind](job)
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            self.queue.fail(job, str(e))
+        else:
+            self.queue.complete(job.id, job.state)
+        return True
@@ -0,0 +1,63 @@
+from datetime import date
+from decimal import Decimal
+import orjson
+from flask.json.provider import JSONProvider
+from google.cloud.firestore import DocumentReference, GeoPoint
+from werkzeug.http import http_date
+from models import Model
+
+# Models are passed to firestore_default, since orjson's own dataclass encoding
+# uses attribute names instead of response keys. Dates are passed too, since
+# orjson writes them as ISO 8601.
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME
+)
+
+def firestore_default(obj):
+    """
+    Encode the Firestore and Python types orjson does not serialize natively.
+    """
+    if isinstance(obj, Model):
+        return obj.to_json()
+    # Same RFC 822 strings as Flask's default provider, which the app parses.
+    if isinstance(obj, date):
+        return http_date(obj)
+    if isinstance(obj, DocumentReference):
+        return obj.path
+    if isinstance(obj, GeoPoint):
+        return {"latitude": obj.latitude, "longitude": obj.longitude}
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps_bytes(obj):
+    """
+    Serialize obj to JSON bytes.
+    """
+    return orjson.dumps(obj, default=firestore_default, option=ORJSON_OPTIONS)
+
+class FirestoreJSONProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson with support for Firestore types.
+    """
+
+    def dumps(self, obj, **kwargs):
+        """
+        Serialize obj to a JSON string.
+        """
+        return dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        """
+        Deserialize a JSON string or bytes.
+        """
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """
+        Build a JSON response without the intermediate str encoding step.
+        """
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype="application/json")
@@ -0,0 +1,71 @@
+import fcntl
+import threading
+
+class Maintenance:
+    """
+    Runs the periodic maintenance jobs and the ride expiry scheduler of a process.
+
+    With a lock path, only the process that gets an exclusive lock on that
+    file starts them, so exactly one of several workers runs the jobs. A
+    replacement worker takes the lock over when its holder exits.
+    """
+
+    def __init__(self, create_scheduler, create_ride_expiry):
+        """
+        Initialize the Maintenance. Both factories are called by start().
+        """
+        self.create_scheduler = create_scheduler
+        self.create_ride_expiry = create_ride_expiry
+        self.scheduler = None
+        self.ride_expiry = None
+        self.lock_file = None
+        self.lock = threading.Lock()
+
+    def start(self, lock_path=None):
+        """
+        Start the scheduler and ride expiry, unless they already run or another
+        process holds the lock. Returns whether they were started.
+        """
+        with self.lock:
+            if self.scheduler is not None:
+                return False
+
+            if lock_path:
+                # Kept open for the life of the process, since closing it releases the lock.
+                # pylint: disable-next=consider-using-with
+                lock_file = open(lock_path, "a", encoding="utf-8")
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    lock_file.close()
+                    return False
+                self.lock_file = lock_file
+
+            self.scheduler = self.create_scheduler()
+            self.scheduler.start()
+            self.ride_expiry = self.create_ride_expiry()
+            self.ride_expiry.start()
+            return True
+
+    def schedule_ride(self, ride_id, departure_timestamp):
+        """
+        Expire a ride at its departure, when this process runs the ride expiry.
+        """
+        if self.ride_expiry is not None:
+            self.ride_expiry.schedule(ride_id, departure_timestamp)
+
+    def cancel_ride(self, ride_id):
+        """
+        Forget a ride deleted by its owner.
+        """
+        if self.ride_expiry is not None:
+            self.ride_expiry.cancel(ride_id)
+
+    def stop(self):
+        """
+        Stop the scheduler and ride expiry.
+        """
+        if self.scheduler is not None and self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+        if self.ride_expiry is not None:
+            self.ride_expiry.stop()
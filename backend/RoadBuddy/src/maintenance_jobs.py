@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta, timezone
+from app_services import db, maintenance, outbox_dispatcher, refund_dispatcher
+from ride_deletion import clean_up_deleted_rides
+from ride_expiry import RideExpiryScheduler
+from time_service import utc_now
+from services.chat_messages_manager import ChatMessagesManager
+from services.message_archive_manager import COMPACTION_THRESHOLD
+from services.refund_manager import RefundManager
+from services.ride_chat_manager import RideChatManager
+from services.ride_manager import RideManager
+
+REFUND_RETRY_IDLE_MINUTES = 2
+OUTBOX_RETRY_IDLE_SECONDS = 30
+
+def drain_outbox():
+    """
+    Delivers outbox events left behind, such as ones recorded by a worker
+    that exited before delivering them.
+    """
+    outbox_dispatcher.drain(utc_now() - timedelta(seconds=OUTBOX_RETRY_IDLE_SECONDS))
+
+def delete_past_rides():
+    """
+    Deletes past rides from Firestore.
+    """
+    print("Checking for past rides...")
+
+    ride_manager = RideManager(db, None, None)
+    response = ride_manager.delete_past_rides()
+    clean_up_deleted_rides(response[0].get("deletedRides", []))
+
+def expire_rides(ride_ids):
+    """
+    Deletes the rides the expiry scheduler found due.
+    """
+    ride_manager = RideManager(db, None, None)
+    response_message, response_status = ride_manager.delete_departed_rides(ride_ids)
+    if response_status != 200:
+        raise RuntimeError(response_message.get("details"))
+    clean_up_deleted_rides(response_message.get("deletedRides"))
+
+def load_departures(until):
+    """
+    Ride ids and departure timestamps of every ride departing by until.
+    """
+    ride_manager = RideManager(db, None, None)
+    return ride_manager.get_departures(datetime.fromtimestamp(until, tz=timezone.utc))
+
+def schedule_ride_expiry(ride_id, ride_data):
+    """
+    Expire a ride posted by this process at its departure, when this process
+    runs the expiry scheduler. Other processes pick it up on their next refill.
+    """
+    if ride_data.get("departureAt") is not None:
+        maintenance.schedule_ride(ride_id, ride_data["departureAt"].timestamp())
+
+def cancel_ride_expiry(ride_id):
+    """
+    Forget a ride deleted by its owner.
+    """
+    maintenance.cancel_ride(ride_id)
+
+def release_expired_seat_holds(hold_ttl_seconds):
+    """
+    Frees the seats of checkouts that were not completed in time, holding them
+    for waiting riders for hold_ttl_seconds.
+    """
+    ride_manager = RideManager(db, None, None)
+    response_message, response_status = ride_manager.release_expired_holds(
+        hold_ttl_seconds=hold_ttl_seconds
+    )
+    if response_status != 200:
+        print(response_message.get("details"))
+
+def retry_pending_refunds():
+    """
+    Resends refunds that are still pending a few minutes after their last
+    attempt, such as ones queued by a worker that exited. Returns their futures.
+    """
+    refund_manager = RefundManager(db)
+    idle_since = utc_now() - timedelta(minutes=REFUND_RETRY_IDLE_MINUTES)
+    return refund_dispatcher.submit(list(refund_manager.stream_pending_refunds(idle_since)))
+
+def compact_ride_chats():
+    """
+    Archives old messages of busy ride chats.
+    """
+    ride_chat_manager = RideChatManager(db, None, None)
+    for ride_id in ride_chat_manager.get_chats_to_compact(COMPACTION_THRESHOLD):
+        chat_message_manager = ChatMessagesManager(db, ride_id, None, None)
+        response_message, response_status = chat_message_manager.compact_messages()
+        if response_status != 200:
+            print(response_message.get("details"))
+
+def create_scheduler(hold_ttl_seconds):
+    """
+    Create the scheduler running the periodic maintenance jobs.
+    """
+    # Imported here so processes that never run the jobs do not pay for it.
+    # pylint: disable-next=import-outside-toplevel
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    background_scheduler = BackgroundScheduler()
+    background_scheduler.add_job(compact_ride_chats, "interval", minutes=5)
+    background_scheduler.add_job(
+        release_expired_seat_holds, "interval", minutes=1, args=[hold_ttl_seconds]
+    )
+    background_scheduler.add_job(retry_pending_refunds, "interval", minutes=5)
+    background_scheduler.add_job(drain_outbox, "interval", minutes=1)
+    return background_scheduler
+
+def create_ride_expiry(lookahead_seconds, refill_seconds):
+    """
+    Create the scheduler expiring rides at their departure, replacing a
+    periodic scan of past rides.
+    """
+    return RideExpiryScheduler(
+        load_departures,
+        expire_rides,
+        lookahead_seconds=lookahead_seconds,
+        refill_seconds=refill_seconds,
+    )
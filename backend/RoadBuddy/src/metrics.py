@@ -0,0 +1,44 @@
+from collections import defaultdict
+import threading
+
+class Metrics:
+    """
+    Thread-safe in-process counters, keyed by name and an optional label such
+    as the endpoint.
+    """
+
+    def __init__(self):
+        """
+        Initialize the Metrics.
+        """
+        self.counters = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def increment(self, name, label=None, value=1):
+        """
+        Add value to the counter for name and label.
+        """
+        with self.lock:
+            self.counters[(name, label)] += value
+
+    def get(self, name, label=None):
+        """
+        Current value of a counter.
+        """
+        with self.lock:
+            return self.counters.get((name, label), 0)
+
+    def snapshot(self):
+        """
+        Copy of every counter as {name: {label: value}}. Unlabelled counters use
+        the label "total".
+        """
+        with self.lock:
+            counters = list(self.counters.items())
+
+        snapshot = {}
+        for (name, label), value in counters:
+            snapshot.setdefault(name, {})[label or "total"] = value
+        return snapshot
+
+metrics = Metrics()
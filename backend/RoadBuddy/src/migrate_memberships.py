@@ -0,0 +1,215 @@
+"""
+Convert the legacy membership arrays into "ride_members" documents.
+
+Reads users and rides page by page and writes one membership document per
+(ride, user) pair in batched commits. Membership ids are deterministic, so the
+migration can be re-run safely after an interruption.
+
+Usage (from backend/RoadBuddy/src):
+    python migrate_memberships.py [--page-size 300] [--drop-arrays] [--backfill-inbox]
+                                  [--backfill-garages] [--dry-run]
+"""
+import argparse
+import firebase_admin
+from firebase_admin import credentials, firestore
+from google.cloud.firestore import DELETE_FIELD
+from utils import MAX_BATCH_SIZE
+from services.car_manager import build_garage
+from services.inbox_manager import InboxManager
+from services.membership_manager import MembershipManager, OWNER_ROLE, PASSENGER_ROLE
+from services.ride_manager import ride_fingerprint
+from time_service import DEFAULT_TIME_ZONE, departure_at
+
+class BatchWriter:
+    """
+    Accumulates writes and commits them every MAX_BATCH_SIZE operations.
+    """
+
+    def __init__(self, db, dry_run=False):
+        self.db = db
+        self.dry_run = dry_run
+        self.batch = db.batch()
+        self.pending = 0
+        self.written = 0
+
+    def set(self, ref, data, merge=False):
+        """
+        Queue a set operation.
+        """
+        self.batch.set(ref, data, merge=merge)
+        self._count()
+
+    def update(self, ref, data):
+        """
+        Queue an update operation.
+        """
+        self.batch.update(ref, data)
+        self._count()
+
+    def _count(self):
+        self.pending += 1
+        if self.pending == MAX_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Commit the queued operations.
+        """
+        if self.pending and not self.dry_run:
+            self.batch.commit()
+        self.written += self.pending
+        self.batch = self.db.batch()
+        self.pending = 0
+
+def stream_pages(collection_ref, page_size):
+    """
+    Yield documents of a collection one page at a time, ordered by document id.
+    """
+    last_doc = None
+    while True:
+        query = collection_ref.order_by("__name__").limit(page_size)
+        if last_doc is not None:
+            query = query.start_after(last_doc)
+
+        docs = list(query.stream())
+        yield from docs
+
+        if len(docs) < page_size:
+            return
+        last_doc = docs[-1]
+
+def migrate_users(db, writer, membership_manager, page_size, drop_arrays):
+    """
+    Convert users.ridesPosted and users.ridesJoined into membership documents.
+    """
+    for user_doc in stream_pages(db.collection("users"), page_size):
+        user_data = user_doc.to_dict() or {}
+        memberships = (
+            [(ride_id, OWNER_ROLE) for ride_id in user_data.get("ridesPosted") or []]
+            + [(ride_id, PASSENGER_ROLE) for ride_id in user_data.get("ridesJoined") or []]
+        )
+
+        for ride_id, role in memberships:
+            writer.set(
+                membership_manager.member_ref(ride_id, user_doc.id),
+                membership_manager.member_data(ride_id, user_doc.id, role)
+            )
+
+        if drop_arrays and ("ridesPosted" in user_data or "ridesJoined" in user_data):
+            writer.update(user_doc.reference, {
+                "ridesPosted": DELETE_FIELD,
+                "ridesJoined": DELETE_FIELD
+            })
+
+def migrate_rides(db, writer, membership_manager, page_size):
+    """
+    Convert rides.ownerID and rides.currentPassengers into membership documents
+    and backfill the passenger counter, duplicate-detection fingerprint and the
+    departureAt timestamp rides are expired by.
+    """
+    for ride_doc in stream_pages(db.collection("rides"), page_size):
+        ride_data = ride_doc.to_dict() or {}
+        passengers = ride_data.get("currentPassengers") or []
+
+        owner_id = ride_data.get("ownerID")
+        if owner_id:
+            writer.set(
+                membership_manager.member_ref(ride_doc.id, owner_id),
+                membership_manager.member_data(ride_doc.id, owner_id, OWNER_ROLE)
+            )
+
+        for passenger_id in passengers:
+            writer.set(
+                membership_manager.member_ref(ride_doc.id, passenger_id),
+                membership_manager.member_data(ride_doc.id, passenger_id, PASSENGER_ROLE)
+            )
+
+        ride_update = {
+            "passengerCount": len(passengers),
+            "fingerprint": ride_fingerprint(
+                owner_id,
+                ride_data.get("from"),
+                ride_data.get("to"),
+                ride_data.get("date"),
+                ride_data.get("departureTime")
+            )
+        }
+        if "departureAt" not in ride_data:
+            try:
+                ride_update["departureAt"] = departure_at(
+                    ride_data.get("date"),
+                    ride_data.get("departureTime"),
+                    ride_data.get("timeZone") or DEFAULT_TIME_ZONE
+                )
+            except (TypeError, ValueError):
+                print(f"Skipping departureAt of ride {ride_doc.id}: invalid date or time")
+
+        writer.set(ride_doc.reference, ride_update, merge=True)
+
+def backfill_inboxes(db, writer, membership_manager, inbox_manager, page_size):
+    """
+    Create an inbox entry for every member of every ride chat.
+    """
+    for chat_doc in stream_pages(db.collection("ride_chats"), page_size):
+        chat_data = chat_doc.to_dict() or {}
+        for user_id in membership_manager.get_member_ids(chat_doc.id):
+            writer.set(
+                inbox_manager.entry_ref(user_id, chat_doc.id),
+                inbox_manager.build_entry(chat_doc.id, chat_data)
+            )
+
+def backfill_garages(db, writer, page_size):
+    """
+    Write the garage summary of every user that does not have one yet.
+    """
+    for user_doc in stream_pages(db.collection("users"), page_size):
+        if "garage" in (user_doc.to_dict() or {}):
+            continue
+        garage = build_garage(user_doc.reference.collection("cars").stream())
+        writer.set(user_doc.reference, {"garage": garage}, merge=["garage"])
+
+def drop_chat_participants(db, writer, page_size):
+    """
+    Remove the legacy ride_chats.participants arrays.
+    """
+    for chat_doc in stream_pages(db.collection("ride_chats"), page_size):
+        if "participants" in (chat_doc.to_dict() or {}):
+            writer.update(chat_doc.reference, {"participants": DELETE_FIELD})
+
+def main():
+    """
+    Run the membership migration.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--page-size", type=int, default=300)
+    parser.add_argument("--drop-arrays", action="store_true",
+                        help="Delete the legacy user and chat arrays after copying them.")
+    parser.add_argument("--backfill-inbox", action="store_true",
+                        help="Create users/{uid}/inbox entries for every ride chat member.")
+    parser.add_argument("--backfill-garages", action="store_true",
+                        help="Build the users.garage car summary from the cars subcollections.")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    cred = credentials.Certificate("../config/firebase-config.json")
+    firebase_admin.initialize_app(cred)
+    db = firestore.client()
+
+    writer = BatchWriter(db, dry_run=args.dry_run)
+    membership_manager = MembershipManager(db)
+
+    migrate_users(db, writer, membership_manager, args.page_size, args.drop_arrays)
+    migrate_rides(db, writer, membership_manager, args.page_size)
+    writer.flush()
+    if args.backfill_inbox:
+        backfill_inboxes(db, writer, membership_manager, InboxManager(db), args.page_size)
+    if args.backfill_garages:
+        backfill_garages(db, writer, args.page_size)
+    if args.drop_arrays:
+        drop_chat_participants(db, writer, args.page_size)
+    writer.flush()
+
+    print(f"Migration finished, {writer.written} writes.")
+
+if __name__ == "__main__":
+    main()
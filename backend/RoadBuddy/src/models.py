@@ -0,0 +1,148 @@
+from dataclasses import dataclass, field, fields
+from operator import attrgetter
+from typing import Optional
+
+def camel_case(name):
+    """
+    Convert a snake_case attribute name to the camelCase key used in documents.
+    """
+    first, *rest = name.split("_")
+    return first + "".join(word.title() for word in rest)
+
+def key(name):
+    """
+    Declare a field stored under a key that is not its camelCase name.
+    """
+    # Called in the body of a class that the model decorator makes a dataclass.
+    # pylint: disable-next=invalid-field-call
+    return field(default=None, metadata={"key": name})
+
+def as_int(value):
+    """
+    Coerce a stored count to int, keeping missing values as None.
+    """
+    return None if value is None else int(value)
+
+class Model:
+    """
+    Base of the compact list models.
+
+    A model holds one record of a list response in slots instead of a dict.
+    JSON encoders call to_json() while writing the response, so the dict
+    with the response keys only lives while its record is encoded. Models
+    with omit_none leave out fields the document does not have, like the
+    field masks of the queries they are read with.
+
+    Building and encoding a model costs a few times as much as a dict, so the
+    lists clients poll, available rides and message pages, stay dicts. Models
+    are kept for lists that are held whole and read less often.
+    """
+
+    __slots__ = ()
+    omit_none = False
+    json_keys = ()
+
+    @staticmethod
+    def json_values(_record):
+        """
+        The field values of a record in json_keys order. Set on each model by
+        the model decorator.
+        """
+        return ()
+
+    def to_json(self):
+        """
+        The record as a dict with its response keys.
+        """
+        items = zip(self.json_keys, self.json_values(self))
+        if self.omit_none:
+            return {name: value for name, value in items if value is not None}
+        return dict(items)
+
+def model(cls):
+    """
+    Make cls a slots dataclass and record the response key of each field.
+    """
+    cls = dataclass(slots=True)(cls)
+    model_fields = fields(cls)
+    cls.json_keys = tuple(
+        model_field.metadata.get("key", camel_case(model_field.name))
+        for model_field in model_fields
+    )
+    cls.json_values = attrgetter(*(model_field.name for model_field in model_fields))
+    return cls
+
+@model
+class RideChat(Model):
+    """
+    A ride chat in a user's chat list, read from "users/{uid}/inbox/{rideId}".
+    """
+
+    omit_none = True
+
+    id: str
+    origin: Optional[str] = key("from")
+    to: Optional[str] = None
+    date: Optional[str] = None
+    departure_time: Optional[str] = None
+    owner_name: Optional[str] = None
+    last_message: Optional[str] = None
+    username_last_message: Optional[str] = key("UsernameLastMessage")
+    last_message_timestamp: Optional[object] = None
+    unread_count: Optional[int] = None
+
+    @classmethod
+    def from_snapshot(cls, entry_doc):
+        """
+        Build a ride chat from an inbox entry snapshot.
+        """
+        chat_data = entry_doc.to_dict()
+        return cls(
+            entry_doc.id,
+            chat_data.get("from"),
+            chat_data.get("to"),
+            chat_data.get("date"),
+            chat_data.get("departureTime"),
+            chat_data.get("ownerName"),
+            chat_data.get("lastMessage"),
+            chat_data.get("UsernameLastMessage"),
+            chat_data.get("lastMessageTimestamp"),
+            as_int(chat_data.get("unreadCount")),
+        )
+
+@model
+class Notification(Model):
+    """
+    A notification in a user's notification list.
+    """
+
+    id: str
+    message: Optional[str] = None
+    read: Optional[bool] = None
+    ride_id: Optional[str] = None
+    created_at: Optional[object] = None
+
+@model
+class Car(Model):
+    """
+    A car in a user's car list, read from the garage summary.
+    """
+
+    year: Optional[object] = None
+    make: Optional[str] = None
+    model: Optional[str] = None
+    color: Optional[str] = None
+    license_plate: Optional[str] = None
+
+    @classmethod
+    def from_data(cls, car_data):
+        """
+        Build a car from its garage summary entry.
+        """
+        return cls(
+            car_data.get("year"),
+            car_data.get("make"),
+            car_data.get("model"),
+            car_data.get("color"),
+            car_data.get("licensePlate"),
+        )
@@ -0,0 +1,123 @@
+import threading
+from google.api_core.exceptions import FailedPrecondition
+from metrics import metrics
+from worker_thread import WorkerThread
+
+# Events applied per batch. A message event writes two documents per chat
+# participant, so 20 events stay well under the 500 writes of a batch.
+EVENTS_PER_BATCH = 20
+
+class OutboxDispatcher:
+    """
+    Delivers outbox events to their handlers from a background thread.
+
+    Requests submit the ids of the events they recorded and return. The
+    thread wakes up, reads the submitted events in one call and applies them
+    in batches of EVENTS_PER_BATCH. Each handler adds its writes to the batch,
+    which also deletes the delivered events, so an event's effects and its
+    removal commit together. If a batch fails, its events are retried one by
+    one. Events not delivered here, such as ones submitted by a worker that
+    exited, are left to drain(), so every event is delivered at least once.
+    """
+
+    def __init__(self, db, outbox_manager, handlers, flush_interval_ms=50):
+        """
+        Initialize the OutboxDispatcher. handlers maps an event type to the
+        functions called with the batch and the event.
+        """
+        self.db = db
+        self.outbox_manager = outbox_manager
+        self.handlers = handlers
+        self.flush_interval = flush_interval_ms / 1000
+        self.pending = []
+        self.lock = threading.Lock()
+        self.worker = WorkerThread("outbox-dispatcher", self.flush_submitted)
+
+    def start(self):
+        """
+        Start the delivery thread.
+        """
+        self.worker.start()
+
+    def submit(self, event_id):
+        """
+        Queue an event recorded by this process for delivery.
+        """
+        if event_id is None:
+            return
+
+        self.worker.start()
+        with self.lock:
+            self.pending.append(event_id)
+        self.worker.wake()
+
+    def flush_submitted(self):
+        """
+        Deliver submitted events, gathering the events submitted within
+        flush_interval into one read.
+        """
+        self.worker.sleep(self.flush_interval)
+        self.flush()
+
+    def stop(self):
+        """
+        Stop the delivery thread and deliver the events still queued.
+        """
+        self.worker.stop()
+        self.flush()
+
+    def flush(self):
+        """
+        Deliver every queued event.
+        """
+        with self.lock:
+            event_ids, self.pending = self.pending, []
+
+        if not event_ids:
+            return
+
+        try:
+            self.deliver(self.outbox_manager.get_events(event_ids))
+        except Exception as e:
+            metrics.increment("outbox_failed", value=len(event_ids))
+            print(f"Failed to read outbox events: {e}")
+
+    def drain(self, created_before, limit=500):
+        """
+        Deliver events recorded before created_before that are still waiting.
+        """
+        self.deliver(list(self.outbox_manager.stream_stale_events(created_before, limit)))
+
+    def deliver(self, event_docs):
+        """
+        Apply events in batches, retrying the events of a failed batch one by one.
+        """
+        event_docs = sorted(event_docs, key=lambda event_doc: event_doc.create_time)
+        for start in range(0, len(event_docs), EVENTS_PER_BATCH):
+            chunk = event_docs[start:start + EVENTS_PER_BATCH]
+            try:
+                self.apply(chunk)
+            except Exception:
+                for event_doc in chunk:
+                    try:
+                        self.apply([event_doc])
+                    except FailedPrecondition:
+                        # Another worker delivered the event since it was read.
+                        metrics.increment("outbox_duplicates")
+                    except Exception as e:
+                        metrics.increment("outbox_failed")
+                        print(f"Failed to deliver outbox event {event_doc.id}: {e}")
+
+    def apply(self, event_docs):
+        """
+        Run the handlers of events and commit their writes with the events' deletion.
+        """
+        batch = self.db.batch()
+        for event_doc in event_docs:
+            event = event_doc.to_dict()
+            event["id"] = event_doc.id
+            for handler in self.handlers.get(event["type"], []):
+                handler(batch, event)
+            self.outbox_manager.complete(batch, event_doc)
+        batch.commit()
+        metrics.increment("outbox_delivered", value=len(event_docs))
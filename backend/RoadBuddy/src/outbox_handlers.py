@@ -0,0 +1,66 @@
+from app_services import db
+from services.inbox_manager import InboxManager
+from services.notification_manager import NotificationManager
+from services.outbox_manager import MESSAGE_SENT, RIDE_BOOKED, RIDE_CANCELLED
+from utils import check_response
+
+def add_passenger_inbox_entry(batch, event):
+    """
+    Adds a booked ride's chat to the new passenger's inbox.
+    """
+    inbox_manager = InboxManager(db)
+    response_message, response_status = inbox_manager.add_entry_from_chat(
+        event["data"]["userId"], event["rideId"], batch
+    )
+    if response_status != 404:
+        check_response((response_message, response_status), "inbox")
+
+def remove_passenger_inbox_entry(batch, event):
+    """
+    Removes a cancelled ride's chat from the passenger's inbox.
+    """
+    batch.delete(InboxManager(db).entry_ref(event["data"]["userId"], event["rideId"]))
+
+def notify_owner_of_booking(batch, event):
+    """
+    Notifies a ride's owner of a new passenger.
+    """
+    data = event["data"]
+    message = (
+        f"{data['userName']} has booked a ride with you\n"
+        f"From: {data['from']}\n"
+        f"To: {data['to']}"
+    )
+    NotificationManager(db).queue_notification(batch, data["ownerId"], event["rideId"], message)
+
+def notify_owner_of_cancellation(batch, event):
+    """
+    Notifies a ride's owner of a passenger who cancelled.
+    """
+    data = event["data"]
+    message = (
+        f"{data['userName']} has cancelled a ride with you.\n"
+        f"From: {data['from']}\n"
+        f"To: {data['to']}"
+    )
+    NotificationManager(db).queue_notification(batch, data["ownerId"], event["rideId"], message)
+
+def notify_message_recipients(batch, event):
+    """
+    Notifies the other participants of a ride chat of a new message.
+    """
+    data = event["data"]
+    message = (
+        f"{data['userName']} has sent a message.\n"
+        f"From: {data['from']}\n"
+        f"To: {data['to']}"
+    )
+    notification_manager = NotificationManager(db)
+    for user_id in data["recipients"]:
+        notification_manager.queue_notification(batch, user_id, event["rideId"], message)
+
+OUTBOX_HANDLERS = {
+    RIDE_BOOKED: [add_passenger_inbox_entry, notify_owner_of_booking],
+    RIDE_CANCELLED: [remove_passenger_inbox_entry, notify_owner_of_cancellation],
+    MESSAGE_SENT: [notify_message_recipients],
+}
@@ -0,0 +1,84 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from metrics import metrics
+from services.payment_manager import PaymentManager
+
+class RefundDispatcher:
+    """
+    Issues Stripe refunds from a bounded thread pool, outside the request path.
+
+    submit() returns at once; up to max_workers refunds are sent to Stripe at a
+    time, so deleting a ride takes the same time whatever its passenger count.
+    Every refund is sent with its idempotency key and its outcome is written
+    to its refund document. A refund that fails stays "pending" for the retry
+    job until max_attempts is reached. Refunds still queued at shutdown are
+    dropped and left to that job as well.
+    """
+
+    def __init__(self, refund_manager, stripe_client, max_workers=8, max_attempts=5):
+        """
+        Initialize the RefundDispatcher.
+        """
+        self.refund_manager = refund_manager
+        self.stripe = stripe_client
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.executor = None
+        self.in_flight = set()
+        self.lock = threading.Lock()
+
+    def submit(self, refunds):
+        """
+        Queue refunds, skipping ones this process is already sending.
+        """
+        futures = []
+        for refund in refunds:
+            with self.lock:
+                if refund["id"] in self.in_flight:
+                    continue
+                self.in_flight.add(refund["id"])
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="refund"
+                    )
+            futures.append(self.executor.submit(self.process, refund))
+        return futures
+
+    def process(self, refund):
+        """
+        Send one refund to Stripe and record the outcome.
+        """
+        try:
+            payment_manager = PaymentManager(refund["userId"], self.stripe)
+            response_message, response_status = payment_manager.refund_payment(
+                refund["paymentIntentId"],
+                self.refund_manager.idempotency_key(refund["id"]),
+                metadata={"rideId": refund["rideId"], "userId": refund["userId"]}
+            )
+
+            if response_status == 200:
+                self.refund_manager.mark_succeeded(refund["id"], response_message["refundId"])
+                metrics.increment("refunds_succeeded")
+            else:
+                final = refund.get("attempts", 0) + 1 >= self.max_attempts
+                self.refund_manager.mark_attempt_failed(
+                    refund["id"], response_message.get("details"), final
+                )
+                metrics.increment("refunds_failed")
+
+        except Exception as e:
+            metrics.increment("refunds_failed")
+            print(f"Failed to process refund {refund['id']}: {e}")
+
+        finally:
+            with self.lock:
+                self.in_flight.discard(refund["id"])
+
+    def shutdown(self):
+        """
+        Wait for the refunds being sent and drop the queued ones.
+        """
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,347 @@
+from functools import wraps
+import hashlib
+import math
+import threading
+import time
+from cachetools import TTLCache
+from flask import Response, jsonify, make_response, request, session
+from metrics import metrics
+
+# Outcomes of LocalResponseStore.begin().
+NEW = "new"
+REPLAY = "replay"
+IN_PROGRESS = "in_progress"
+MISMATCH = "mismatch"
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+def get_user_id():
+    """
+    Retrieve user's ID
+    """
+    return session.get('user', {}).get('uid')
+
+def get_user_name():
+    """
+    Retrieve user's name
+    """
+    return session.get('user').get('name')
+
+def auth_required(f):
+    """
+    Decorator to enforce user authentication for a route.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user' not in session:
+            return jsonify({"error": "User is not logged in"}), 401
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+def freeze_response(response):
+    """
+    Reduce a response to (body, status, headers) so it can be replayed.
+    """
+    return response.get_data(), response.status_code, list(response.headers.items())
+
+class LocalTokenBucketStore:
+    """
+    In-process token bucket store.
+
+    A shared store (for example one backed by Redis) can replace it by
+    providing the same take() method; the limiter only calls take(). A bucket
+    that has been idle long enough to refill is dropped, which loses nothing.
+    """
+
+    def __init__(self, max_buckets=100000, idle_seconds=3600):
+        """
+        Initialize the LocalTokenBucketStore.
+        """
+        self.buckets = TTLCache(maxsize=max_buckets, ttl=idle_seconds)
+        self.lock = threading.Lock()
+
+    def take(self, key, rate, capacity, now=None):
+        """
+        Take one token from the bucket for key, refilled at rate tokens per second
+        up to capacity. Returns (allowed, retry_after_seconds).
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+
+            if tokens >= 1:
+                self.buckets[key] = (tokens - 1, now)
+                return True, 0
+
+            self.buckets[key] = (tokens, now)
+            return False, (1 - tokens) / rate
+
+class RateLimiter:
+    """
+    Per-user token bucket rate limiter for Flask routes.
+    """
+
+    def __init__(self, store=None, enabled=True):
+        """
+        Initialize the RateLimiter.
+        """
+        self.store = store or LocalTokenBucketStore()
+        self.enabled = enabled
+
+    def limit(self, per_minute, burst=None):
+        """
+        Decorator allowing each user per_minute requests to the route, with bursts
+        of up to burst requests. Throttled requests get a 429 with Retry-After.
+        Requests without a logged in user are limited per client address.
+        """
+        rate = per_minute / 60
+        capacity = burst or per_minute
+
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if not self.enabled:
+                    return f(*args, **kwargs)
+
+                client = get_user_id() or request.remote_addr
+                allowed, retry_after = self.store.take(
+                    (request.endpoint, client), rate, capacity
+                )
+                if not allowed:
+                    metrics.increment("requests_throttled", request.endpoint)
+                    response = make_response(
+                        jsonify({"error": "Too many requests. Please slow down."}), 429
+                    )
+                    response.headers['Retry-After'] = str(math.ceil(retry_after))
+                    return response
+
+                return f(*args, **kwargs)
+
+            return decorated_function
+
+        return decorator
+
+class Flight:
+    """
+    One in-progress call shared by concurrent identical requests.
+    """
+
+    def __init__(self):
+        """
+        Initialize the Flight.
+        """
+        self.done = threading.Event()
+        self.followers = 0
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical GET requests into one call of the route.
+
+    The first request for a key runs the route; requests for the same key that
+    arrive while it runs wait for it and get a copy of its response. Keys
+    include the user, so users never see each other's responses.
+    """
+
+    def __init__(self, enabled=True, wait_timeout=30):
+        """
+        Initialize the SingleFlight.
+        """
+        self.enabled = enabled
+        self.wait_timeout = wait_timeout
+        self.flights = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def request_key():
+        """
+        Key of the current request: user, endpoint, full path with query string and
+        If-None-Match, since a 304 can only be shared with clients holding that version.
+        """
+        return (
+            get_user_id(),
+            request.endpoint,
+            request.full_path,
+            request.headers.get('If-None-Match')
+        )
+
+    def lead(self, key, flight, f, args, kwargs):
+        """
+        Run the route for a flight and hand its response to the followers.
+        """
+        try:
+            response = make_response(f(*args, **kwargs))
+            with self.lock:
+                self.flights.pop(key, None)
+                followers = flight.followers
+            # A streamed body is only buffered when someone is waiting for it.
+            if followers:
+                flight.result = freeze_response(response)
+            return response
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                if self.flights.get(key) is flight:
+                    self.flights.pop(key)
+            flight.done.set()
+
+    def follow(self, flight):
+        """
+        Wait for a flight and replay its response.
+        """
+        if not flight.done.wait(self.wait_timeout) or flight.error is not None:
+            metrics.increment("requests_coalesce_failed", request.endpoint)
+            return jsonify({"error": "An unexpected error occurred"}), 503
+
+        body, status, headers = flight.result
+        return Response(body, status=status, headers=headers)
+
+    def coalesce(self, f):
+        """
+        Decorator coalescing concurrent identical GET requests to the route.
+        """
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not self.enabled or request.method != 'GET':
+                return f(*args, **kwargs)
+
+            key = self.request_key()
+            with self.lock:
+                flight = self.flights.get(key)
+                if flight is None:
+                    flight = self.flights[key] = Flight()
+                    leader = True
+                else:
+                    flight.followers += 1
+                    leader = False
+
+            if leader:
+                return self.lead(key, flight, f, args, kwargs)
+
+            metrics.increment("requests_coalesced", request.endpoint)
+            return self.follow(flight)
+
+        return decorated_function
+
+class LocalResponseStore:
+    """
+    In-process store of the responses to requests sent with an Idempotency-Key.
+
+    Keeps up to max_entries responses for ttl_seconds, evicting the least
+    recently used first. A shared store (for example one backed by Redis) can
+    replace it by providing the same begin(), finish() and abandon() methods,
+    so a retry that reaches another worker is replayed as well.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=86400):
+        """
+        Initialize the LocalResponseStore.
+        """
+        self.entries = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self.lock = threading.Lock()
+
+    def begin(self, key, fingerprint):
+        """
+        Claim key for a request with the given body fingerprint. Returns
+        (NEW, None) when the request should run, (REPLAY, response) with the
+        stored response, (IN_PROGRESS, None) while the first request is still
+        running, or (MISMATCH, None) when the key was used for another body.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.entries[key] = (fingerprint, None)
+                return NEW, None
+
+            stored_fingerprint, response = entry
+            if stored_fingerprint != fingerprint:
+                return MISMATCH, None
+            if response is None:
+                return IN_PROGRESS, None
+            return REPLAY, response
+
+    def finish(self, key, fingerprint, response):
+        """
+        Store the response of a request claimed with begin().
+        """
+        with self.lock:
+            self.entries[key] = (fingerprint, response)
+
+    def abandon(self, key):
+        """
+        Release a claimed key without a response, so the request can be retried.
+        """
+        with self.lock:
+            self.entries.pop(key, None)
+
+class IdempotencyKeys:
+    """
+    Replays the stored response of a request retried with the same
+    Idempotency-Key header, without running the route again.
+
+    Keys are scoped to the user and the route. Server errors and exceptions
+    are not stored, so those requests can be retried.
+    """
+
+    def __init__(self, store=None, enabled=True):
+        """
+        Initialize the IdempotencyKeys.
+        """
+        self.store = store or LocalResponseStore()
+        self.enabled = enabled
+
+    def idempotent(self, f):
+        """
+        Decorator honouring the Idempotency-Key header on the route. Replayed
+        responses carry an Idempotent-Replayed header.
+        """
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            idempotency_key = request.headers.get('Idempotency-Key')
+            if not self.enabled or not idempotency_key:
+                return f(*args, **kwargs)
+
+            if len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+                return jsonify({"error": "Idempotency-Key is too long."}), 400
+
+            key = (get_user_id(), request.endpoint, idempotency_key)
+            fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+
+            outcome, stored_response = self.store.begin(key, fingerprint)
+            if outcome == REPLAY:
+                metrics.increment("idempotent_replays", request.endpoint)
+                body, status, headers = stored_response
+                response = Response(body, status=status, headers=headers)
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+
+            if outcome == IN_PROGRESS:
+                metrics.increment("idempotent_conflicts", request.endpoint)
+                return jsonify({
+                    "error": "A request with this Idempotency-Key is still in progress."
+                }), 409
+
+            if outcome == MISMATCH:
+                metrics.increment("idempotent_key_reused", request.endpoint)
+                return jsonify({
+                    "error": "This Idempotency-Key was already used for a different request."
+                }), 422
+
+            try:
+                response = make_response(f(*args, **kwargs))
+            except Exception:
+                self.store.abandon(key)
+                raise
+
+            if response.status_code >= 500:
+                self.store.abandon(key)
+            else:
+                self.store.finish(key, fingerprint, freeze_response(response))
+            return response
+
+        return decorated_function
@@ -0,0 +1,172 @@
+import zlib
+from flask import request
+from metrics import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = frozenset({
+    "application/json",
+    "text/html",
+    "text/plain",
+})
+
+class GzipCompressor:
+    """
+    Incremental gzip encoder.
+    """
+
+    def __init__(self, level):
+        """
+        Initialize the GzipCompressor.
+        """
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        """
+        Compress a chunk, returning whatever output is ready.
+        """
+        return self.compressor.compress(data)
+
+    def finish(self):
+        """
+        Return the remaining output.
+        """
+        return self.compressor.flush()
+
+class BrotliCompressor:
+    """
+    Incremental brotli encoder.
+    """
+
+    def __init__(self, quality):
+        """
+        Initialize the BrotliCompressor.
+        """
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        """
+        Compress a chunk, returning whatever output is ready.
+        """
+        return self.compressor.process(data)
+
+    def finish(self):
+        """
+        Return the remaining output.
+        """
+        return self.compressor.finish()
+
+class ResponseCompressor:
+    """
+    Compresses responses with brotli or gzip, whichever the client prefers.
+
+    Bodies smaller than min_size are sent as is. Streamed bodies are compressed
+    chunk by chunk so they keep streaming. Brotli is only offered when the
+    brotli package is installed. Raw and compressed byte counts are recorded
+    per endpoint in metrics.
+    """
+
+    def __init__(self, app=None, min_size=1024, gzip_level=6, brotli_quality=4):
+        """
+        Initialize the ResponseCompressor.
+        """
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Compress every response of app.
+        """
+        app.after_request(self.compress_response)
+
+    def make_compressor(self, encoding):
+        """
+        Create an incremental compressor for an encoding.
+        """
+        if encoding == "br":
+            return BrotliCompressor(self.brotli_quality)
+        return GzipCompressor(self.gzip_level)
+
+    def is_compressible(self, response):
+        """
+        Check whether a response body may be compressed.
+        """
+        return (
+            200 <= response.status_code < 300
+            and response.status_code != 204
+            and response.mimetype in COMPRESSIBLE_MIMETYPES
+            and "Content-Encoding" not in response.headers
+            and not response.direct_passthrough
+        )
+
+    def compress_response(self, response):
+        """
+        Compress a response body when the client accepts it and it is large enough.
+        """
+        if not self.is_compressible(response):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self.stream_compressed(
+                response.iter_encoded(), encoding, request.endpoint
+            )
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+
+            compressor = self.make_compressor(encoding)
+            compressed = compressor.compress(data) + compressor.finish()
+            response.set_data(compressed)
+            self.record(request.endpoint, len(data), len(compressed))
+
+        response.headers["Content-Encoding"] = encoding
+
+        # The encoded body differs byte for byte from the identity one.
+        etag, is_weak = response.get_etag()
+        if etag and not is_weak:
+            response.set_etag(etag, weak=True)
+
+        return response
+
+    def stream_compressed(self, chunks, encoding, endpoint):
+        """
+        Compress a streamed body chunk by chunk.
+        """
+        compressor = self.make_compressor(encoding)
+        raw_bytes = sent_bytes = 0
+
+        for chunk in chunks:
+            raw_bytes += len(chunk)
+            data = compressor.compress(chunk)
+            if data:
+                sent_bytes += len(data)
+                yield data
+
+        data = compressor.finish()
+        sent_bytes += len(data)
+        yield data
+
+        self.record(endpoint, raw_bytes, sent_bytes)
+
+    @staticmethod
+    def record(endpoint, raw_bytes, sent_bytes):
+        """
+        Record the size of a response body before and after compression.
+        """
+        metrics.increment("response_bytes_raw", endpoint, raw_bytes)
+        metrics.increment("response_bytes_sent", endpoint, sent_bytes)
+        metrics.increment("responses_compressed", endpoint)
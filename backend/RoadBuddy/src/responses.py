@@ -0,0 +1,55 @@
+from itertools import chain
+from flask import Response, current_app, jsonify, make_response, request
+from firebase_admin.exceptions import FirebaseError
+from utils import handle_firestore_error, handle_generic_error, iter_json_document
+
+def stream_json(key, items, error_message, keyed=False):
+    """
+    Stream {key: [items]} as a JSON response, encoding one item at a time.
+
+    The first item is fetched before responding so Firestore errors raised by the
+    query still produce an error response instead of a truncated body.
+    """
+    items = iter(items)
+    try:
+        first_item = next(items, None)
+    except FirebaseError as e:
+        response_message, response_status_code = handle_firestore_error(e, error_message)
+        return jsonify(response_message), response_status_code
+    except Exception as e:
+        response_message, response_status_code = (
+            handle_generic_error(e, "An unexpected error occurred")
+        )
+        return jsonify(response_message), response_status_code
+
+    if first_item is not None:
+        items = chain([first_item], items)
+
+    body = iter_json_document(key, items, dumps=current_app.json.dumps, keyed=keyed)
+    return Response(body, status=200, mimetype='application/json')
+
+def tag_response(response, etag):
+    """
+    Set a strong ETag on a response and make clients revalidate it before reuse.
+    """
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def not_modified(etag):
+    """
+    A 304 response when the request's If-None-Match matches etag, otherwise None.
+    """
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    return tag_response(Response(status=304), etag)
+
+def json_with_etag(payload, etag, status=200):
+    """
+    Respond with payload tagged with etag, or with 304 before serializing it when
+    the client already has this version.
+    """
+    unchanged_response = not_modified(etag)
+    if unchanged_response is not None:
+        return unchanged_response
+    return tag_response(make_response(jsonify(payload), status), etag)
@@ -0,0 +1,64 @@
+import threading
+from cachetools import TTLCache
+from services.membership_manager import MembershipManager
+
+class RideChatCache:
+    """
+    In-process cache of ride chat metadata and participant sets.
+
+    Lets the send-message path authorize a sender without reading the chat
+    document. Entries expire after ttl_seconds and are invalidated when this
+    process changes a ride's membership.
+    """
+
+    def __init__(self, db, ttl_seconds=30, maxsize=10000):
+        """
+        Initialize the RideChatCache.
+        """
+        self.ride_chat_ref = db.collection("ride_chats")
+        self.membership_manager = MembershipManager(db)
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self.lock = threading.Lock()
+
+    def load(self, ride_id):
+        """
+        Read a chat and its participants from Firestore. Returns None if the chat is gone.
+        """
+        chat_doc = self.ride_chat_ref.document(ride_id).get()
+        if not chat_doc.exists:
+            return None
+
+        chat_data = chat_doc.to_dict()
+        return {
+            "rideId": ride_id,
+            "owner": chat_data.get("owner"),
+            "ownerName": chat_data.get("ownerName"),
+            "from": chat_data.get("from"),
+            "to": chat_data.get("to"),
+            "participants": frozenset(self.membership_manager.get_member_ids(ride_id)),
+        }
+
+    def get(self, ride_id, refresh=False):
+        """
+        Fetch a chat's cached metadata, loading it on a miss or when refresh is set.
+        """
+        if not refresh:
+            with self.lock:
+                chat = self.cache.get(ride_id)
+            if chat is not None:
+                return chat
+
+        chat = self.load(ride_id)
+        with self.lock:
+            if chat is None:
+                self.cache.pop(ride_id, None)
+            else:
+                self.cache[ride_id] = chat
+        return chat
+
+    def invalidate(self, ride_id):
+        """
+        Drop a chat from the cache.
+        """
+        with self.lock:
+            self.cache.pop(ride_id, None)
@@ -0,0 +1,134 @@
+from app_services import db, last_message_buffer, refund_dispatcher, ride_chat_cache
+from services.chat_messages_manager import ChatMessagesManager
+from services.inbox_manager import InboxManager
+from services.membership_manager import MembershipManager
+from services.notification_manager import NotificationManager
+from services.refund_manager import RefundManager
+from services.ride_chat_manager import RideChatManager
+from services.ride_manager import RideManager
+from services.waitlist_manager import WaitlistManager
+from utils import check_response
+
+DELETE_RIDE_JOB = "delete_ride"
+
+def clean_up_deleted_rides(deleted_rides):
+    """
+    Removes the memberships, inbox entries, chat and waitlist of rides deleted
+    by the expiry jobs.
+    """
+    membership_manager = MembershipManager(db)
+    inbox_manager = InboxManager(db)
+    waitlist_manager = WaitlistManager(db)
+
+    for ride in deleted_rides:
+        ride_id = ride.get("id")
+        owner_id = ride.get("ownerID")
+        owner_name = ride.get("ownerName")
+
+        print("Deleting ", ride_id)
+
+        member_ids = membership_manager.get_member_ids(ride_id)
+        membership_manager.remove_all_members(ride_id)
+        ride_chat_cache.invalidate(ride_id)
+        last_message_buffer.discard(ride_id)
+        inbox_manager.remove_entries(member_ids, ride_id)
+
+        chat_message_manager = ChatMessagesManager(db, ride_id, owner_id, owner_name)
+        chat_message_manager.delete_all_messages()
+
+        ride_chat_manager = RideChatManager(db, owner_id, owner_name)
+        ride_chat_manager.delete_ride_chat(ride_id)
+
+        waitlist_manager.delete_waitlist(ride_id)
+
+def run_ride_deletion(job, workers=1):
+    """
+    Cascade delete job of a ride its owner deleted. Every step is checkpointed,
+    so a retried job picks up after the last step that finished. Large
+    deletes are committed in chunks of MAX_BATCH_SIZE, workers at a time.
+    """
+    ride_id = job.payload["rideId"]
+    owner_id = job.payload["ownerId"]
+    owner_name = job.payload["ownerName"]
+    membership_manager = MembershipManager(db)
+
+    # The passengers are read once, before their memberships are removed.
+    if "paymentIntents" not in job.state:
+        job.state["paymentIntents"] = membership_manager.get_payment_intents(ride_id)
+        job.state["done"] = []
+        job.checkpoint()
+
+    payment_intents = job.state["paymentIntents"]
+    passengers = list(payment_intents)
+
+    def refund_passengers():
+        refund_manager = RefundManager(db)
+        refunds = check_response(
+            refund_manager.create_refunds(ride_id, owner_id, payment_intents), "refunds"
+        )
+        refund_dispatcher.submit(refunds["refunds"])
+
+    def remove_members():
+        check_response(membership_manager.remove_all_members(ride_id, workers), "members")
+        ride_chat_cache.invalidate(ride_id)
+        last_message_buffer.discard(ride_id)
+
+    def remove_inbox_entries():
+        inbox_manager = InboxManager(db)
+        check_response(
+            inbox_manager.remove_entries(passengers + [owner_id], ride_id, workers), "inboxes"
+        )
+
+    def delete_messages():
+        chat_messages_manager = ChatMessagesManager(db, ride_id, owner_id, owner_name)
+        check_response(chat_messages_manager.delete_all_messages(workers), "messages")
+
+    def delete_chat():
+        ride_chat_manager = RideChatManager(db, owner_id, owner_name)
+        check_response(ride_chat_manager.delete_ride_chat(ride_id), "chat")
+
+    def delete_waitlist():
+        check_response(WaitlistManager(db).delete_waitlist(ride_id), "waitlist")
+
+    def delete_ride():
+        ride_manager = RideManager(db, owner_id, owner_name)
+        response_message, response_status = ride_manager.delete_ride(ride_id)
+        if response_status != 404:
+            check_response((response_message, response_status), "ride")
+
+    def notify_passengers():
+        if not passengers:
+            return
+
+        cost = job.payload["cost"] * 1.20
+        message = (
+            f"${cost:.2f} has been refunded to you.\n"
+            f"{owner_name} (ride's owner) has delete this ride.\n"
+            f"From: {job.payload['from']}\n"
+            f"To: {job.payload['to']}\n"
+            f"To: {job.payload['date']}"
+        )
+
+        notification_manager = NotificationManager(db)
+        check_response(
+            notification_manager.store_notification_for_users(passengers, ride_id, message),
+            "notifications"
+        )
+
+    steps = [
+        ("refunds", refund_passengers),
+        ("members", remove_members),
+        ("inboxes", remove_inbox_entries),
+        ("messages", delete_messages),
+        ("chat", delete_chat),
+        ("waitlist", delete_waitlist),
+        ("ride", delete_ride),
+        ("notifications", notify_passengers),
+    ]
+
+    for name, step in steps:
+        if name in job.state["done"]:
+            continue
+        step()
+        job.state["done"].append(name)
+        job.checkpoint()
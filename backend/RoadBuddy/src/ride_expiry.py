@@ -0,0 +1,177 @@
+import heapq
+import threading
+import time
+from metrics import metrics
+from worker_thread import WorkerThread
+
+# Seconds after its departure a ride expires, so it is not expired early by clock skew.
+GRACE_SECONDS = 1
+
+class DepartureHeap:
+    """
+    Min-heap of ride departure timestamps. Rescheduling or cancelling a ride
+    leaves its old heap entry behind, which pop_due drops on the way.
+    """
+
+    def __init__(self):
+        """
+        Initialize the DepartureHeap.
+        """
+        self.heap = []
+        self.deadlines = {}
+        self.lock = threading.Lock()
+
+    def push(self, ride_id, departure_timestamp):
+        """
+        Add a ride. Returns whether it is now the earliest departure.
+        """
+        with self.lock:
+            if self.deadlines.get(ride_id) == departure_timestamp:
+                return False
+
+            self.deadlines[ride_id] = departure_timestamp
+            heapq.heappush(self.heap, (departure_timestamp, ride_id))
+            return self.heap[0][1] == ride_id
+
+    def cancel(self, ride_id):
+        """
+        Forget a ride.
+        """
+        with self.lock:
+            self.deadlines.pop(ride_id, None)
+
+    def pop_due(self, until):
+        """
+        Remove and return the ids of rides departing by until.
+        """
+        due = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= until:
+                departure_timestamp, ride_id = heapq.heappop(self.heap)
+                if self.deadlines.get(ride_id) == departure_timestamp:
+                    del self.deadlines[ride_id]
+                    due.append(ride_id)
+        return due
+
+    def earliest(self):
+        """
+        The earliest departure timestamp, or None when empty.
+        """
+        with self.lock:
+            return self.heap[0][0] if self.heap else None
+
+    def __len__(self):
+        """
+        Number of rides in the heap.
+        """
+        return len(self.deadlines)
+
+class RideExpiryScheduler:
+    """
+    Expires rides within seconds of their departure.
+
+    Keeps a min-heap of the departure timestamps of rides leaving within the
+    lookahead window. A background thread sleeps until the earliest departure
+    is due and hands the due ride ids to on_expire, so a wake-up costs
+    O(log n) per expiring ride instead of a scan of every ride.
+
+    load_departures(until) yields (ride id, departure timestamp) for every ride
+    leaving by until, and is called at start and every refill interval. That
+    one range query rebuilds the heap after a restart and also picks up rides
+    posted by other processes and rides whose expiry failed. Rides posted or
+    deleted by this process are added and dropped right away with schedule()
+    and cancel().
+    """
+
+    def __init__(self, load_departures, on_expire, lookahead_seconds=900, refill_seconds=60):
+        """
+        Initialize the RideExpiryScheduler.
+        """
+        self.load_departures = load_departures
+        self.on_expire = on_expire
+        self.lookahead = lookahead_seconds
+        self.refill_interval = refill_seconds
+        self.departures = DepartureHeap()
+        self.next_refill = 0
+        self.worker = WorkerThread("ride-expiry", self.run_once)
+
+    def start(self):
+        """
+        Start the expiry thread.
+        """
+        self.worker.start()
+
+    def stop(self):
+        """
+        Stop the expiry thread.
+        """
+        self.worker.stop()
+
+    def schedule(self, ride_id, departure_timestamp):
+        """
+        Expire a ride at its departure. Rides leaving after the lookahead
+        window are left to a later refill.
+        """
+        if departure_timestamp > time.time() + self.lookahead:
+            return
+
+        if self.departures.push(ride_id, departure_timestamp):
+            self.worker.wake()
+
+    def cancel(self, ride_id):
+        """
+        Forget a ride deleted before its departure.
+        """
+        self.departures.cancel(ride_id)
+
+    def refill(self, now):
+        """
+        Schedule every ride leaving before the end of the lookahead window.
+        """
+        try:
+            departures = list(self.load_departures(now + self.lookahead))
+        except Exception as e:
+            print(f"Failed to load ride departures: {e}")
+            departures = []
+
+        for ride_id, departure_timestamp in departures:
+            self.departures.push(ride_id, departure_timestamp)
+        self.next_refill = now + self.refill_interval
+
+    def expire(self, ride_ids):
+        """
+        Hand due rides to on_expire. Rides that fail are retried by the next
+        refill, since they are still in its range.
+        """
+        try:
+            self.on_expire(ride_ids)
+            metrics.increment("rides_expired", value=len(ride_ids))
+        except Exception as e:
+            metrics.increment("ride_expiry_failed", value=len(ride_ids))
+            print(f"Failed to expire rides {ride_ids}: {e}")
+
+    def run_once(self):
+        """
+        Refill the heap when due and expire due rides. Returns the seconds
+        until the next departure or refill.
+        """
+        now = time.time()
+        if now >= self.next_refill:
+            self.refill(now)
+
+        due = self.departures.pop_due(now - GRACE_SECONDS)
+        if due:
+            self.expire(due)
+            return 0
+
+        wake_at = self.next_refill
+        earliest = self.departures.earliest()
+        if earliest is not None:
+            wake_at = min(wake_at, earliest + GRACE_SECONDS)
+        return max(wake_at - time.time(), 0)
+
+    def pending(self):
+        """
+        Number of rides waiting to expire.
+        """
+        return len(self.departures)
@@ -0,0 +1,128 @@
+import os
+import threading
+
+# The client factories import their SDKs when called, so importing the app
+# does not pay for SDKs it has not used yet.
+# pylint: disable=import-outside-toplevel
+
+class LazyService:
+    """
+    Stand-in for a container service that creates it on first attribute access.
+    """
+
+    def __init__(self, container, name):
+        """
+        Initialize the LazyService.
+        """
+        self._container = container
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._container.get(self._name), attr)
+
+    def __repr__(self):
+        return f"<LazyService {self._name}>"
+
+class ServiceContainer:
+    """
+    Registry of services created on first use.
+
+    Factories are registered by name and run at most once, the first time the
+    service is requested, so importing the app does not pay for clients a
+    process may never use.
+    """
+
+    def __init__(self):
+        """
+        Initialize the ServiceContainer.
+        """
+        self.factories = {}
+        self.instances = {}
+        self.lock = threading.RLock()
+
+    def register(self, name, factory):
+        """
+        Register a factory creating the service called name.
+        """
+        self.factories[name] = factory
+
+    def get(self, name):
+        """
+        Return the service called name, creating it on first use.
+        """
+        instance = self.instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self.lock:
+            if name not in self.instances:
+                self.instances[name] = self.factories[name]()
+            return self.instances[name]
+
+    def is_created(self, name):
+        """
+        Check whether a service has been created.
+        """
+        return name in self.instances
+
+    def proxy(self, name):
+        """
+        Return a stand-in that creates the service on first attribute access.
+        """
+        return LazyService(self, name)
+
+def create_credential(credential_path):
+    """
+    Load the Firebase service account credential.
+    """
+    from firebase_admin import credentials
+    return credentials.Certificate(credential_path)
+
+def create_firebase_app(container):
+    """
+    Initialize the default Firebase app.
+    """
+    import firebase_admin
+    return firebase_admin.initialize_app(container.get("credential"))
+
+def create_firestore_client(container):
+    """
+    Create the Firestore client of the default Firebase app.
+    """
+    from firebase_admin import firestore
+    return firestore.client(container.get("firebase_app"))
+
+def create_auth(container):
+    """
+    Return the Firebase auth module once the default Firebase app exists.
+    """
+    container.get("firebase_app")
+    from firebase_admin import auth
+    return auth
+
+def create_stripe():
+    """
+    Import and configure the Stripe SDK, which alone takes about a second to import.
+    STRIPE_API_BASE points it at a local Stripe stub instead of the live API.
+    """
+    import stripe
+    from services.payment_manager import stripe_keys
+
+    stripe.api_key = stripe_keys["secret_key"]
+    api_base = os.getenv("STRIPE_API_BASE")
+    if api_base:
+        stripe.api_base = api_base
+    return stripe
+
+def create_services(credential_path):
+    """
+    Create a container with the app's external clients: "credential",
+    "firebase_app", "db", "auth" and "stripe".
+    """
+    container = ServiceContainer()
+    container.register("credential", lambda: create_credential(credential_path))
+    container.register("firebase_app", lambda: create_firebase_app(container))
+    container.register("db", lambda: create_firestore_client(container))
+    container.register("auth", lambda: create_auth(container))
+    container.register("stripe", create_stripe)
+    return container
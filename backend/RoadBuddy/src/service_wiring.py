@@ -0,0 +1,97 @@
+from functools import partial
+import os
+from app_services import (
+    db, job_queue, job_runner, last_message_buffer, maintenance, outbox_dispatcher,
+    refund_dispatcher, services, stripe_client, unread_count_cache,
+)
+from document_loader import DocumentLoader
+from job_queue import JobRunner, SQLiteJobQueue
+from maintenance import Maintenance
+from maintenance_jobs import create_ride_expiry, create_scheduler
+from outbox_dispatcher import OutboxDispatcher
+from outbox_handlers import OUTBOX_HANDLERS
+from refund_dispatcher import RefundDispatcher
+from ride_chat_cache import RideChatCache
+from ride_deletion import DELETE_RIDE_JOB, run_ride_deletion
+from unread_count_cache import UnreadCountCache
+from write_behind import LastMessageBuffer
+from services.outbox_manager import OutboxManager
+from services.refund_manager import RefundManager
+
+def register_services(config):
+    """
+    Register the background services of the app, configured by the Flask
+    config and environment variables. Each is created on first use.
+    """
+    services.register("ride_chat_cache", lambda: RideChatCache(
+        db, ttl_seconds=int(os.getenv('RIDE_CHAT_CACHE_TTL', '30'))
+    ))
+
+    services.register("document_loader", lambda: DocumentLoader(
+        db,
+        window_ms=float(os.getenv('DOCUMENT_LOADER_WINDOW_MS', '2')),
+        max_batch_size=int(os.getenv('DOCUMENT_LOADER_BATCH_SIZE', '100')),
+        enabled=os.getenv('DOCUMENT_LOADER_ENABLED', 'true').strip().lower() == 'true'
+    ))
+
+    services.register("last_message_buffer", lambda: LastMessageBuffer(
+        db, flush_interval_ms=int(os.getenv('LAST_MESSAGE_FLUSH_MS', '500'))
+    ))
+
+    services.register("refund_dispatcher", lambda: RefundDispatcher(
+        RefundManager(db),
+        stripe_client,
+        max_workers=int(os.getenv('REFUND_WORKERS', '8')),
+        max_attempts=int(os.getenv('REFUND_MAX_ATTEMPTS', '5'))
+    ))
+
+    services.register("job_queue", lambda: SQLiteJobQueue(
+        config['JOB_QUEUE_PATH'],
+        max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+    ))
+
+    services.register("job_runner", lambda: JobRunner(
+        job_queue,
+        {DELETE_RIDE_JOB: partial(run_ride_deletion, workers=config['DELETE_WRITE_WORKERS'])}
+    ))
+
+    services.register("outbox_dispatcher", lambda: OutboxDispatcher(
+        db,
+        OutboxManager(db),
+        OUTBOX_HANDLERS,
+        flush_interval_ms=int(os.getenv('OUTBOX_FLUSH_MS', '50'))
+    ))
+
+    services.register("unread_count_cache", lambda: UnreadCountCache(
+        db,
+        max_listeners=int(os.getenv('UNREAD_MAX_LISTENERS', '500')),
+        idle_seconds=int(os.getenv('UNREAD_LISTENER_IDLE_SECONDS', '300'))
+    ))
+
+    services.register("maintenance", lambda: Maintenance(
+        partial(create_scheduler, config['SEAT_HOLD_TTL_SECONDS']),
+        partial(
+            create_ride_expiry,
+            config['RIDE_EXPIRY_LOOKAHEAD_SECONDS'],
+            config['RIDE_EXPIRY_REFILL_SECONDS']
+        )
+    ))
+
+def shutdown():
+    """
+    Stop the scheduler and ride expiry, finish the running background job and
+    the refunds being sent, deliver the queued outbox events, close the unread
+    count listeners and flush the last message buffer.
+    """
+    if services.is_created("maintenance"):
+        maintenance.stop()
+    if services.is_created("job_runner"):
+        job_runner.stop()
+    if services.is_created("outbox_dispatcher"):
+        outbox_dispatcher.stop()
+    if services.is_created("unread_count_cache"):
+        unread_count_cache.stop()
+    if services.is_created("refund_dispatcher"):
+        refund_dispatcher.shutdown()
+    if services.is_created("last_message_buffer"):
+        last_message_buffer.stop()
@@ -1,18 +1,83 @@
 from flask import jsonify
 from firebase_admin.exceptions import FirebaseError
-from utils import handle_firestore_error, handle_generic_error
+from google.cloud import firestore
+from models import Car
+from utils import handle_firestore_error, handle_generic_error, snapshot_version
+
+# Car fields copied into the garage summary on the user document.
+GARAGE_CAR_FIELDS = ("year", "make", "model", "color", "licensePlate", "vin", "isPrimary")
+
+def empty_garage():
+    """
+    Garage summary of a user without cars.
+    """
+    return {"cars": {}, "primaryCarId": None, "revision": 0}
+
+def build_garage(car_docs):
+    """
+    Build a garage summary from the documents of a user's cars subcollection.
+    """
+    garage = empty_garage()
+    for car_doc in car_docs:
+        car_data = car_doc.to_dict()
+        garage["cars"][car_doc.id] = {field: car_data.get(field) for field in GARAGE_CAR_FIELDS}
+        if car_data.get("isPrimary") and garage["primaryCarId"] is None:
+            garage["primaryCarId"] = car_doc.id
+    return garage
+
+def read_garage(user_doc, cars_ref, transaction=None):
+    """
+    Read the garage summary of a user, building it from the cars subcollection
+    for users created before it existed.
+    """
+    garage = (user_doc.to_dict() or {}).get("garage") if user_doc.exists else None
+    if garage is not None:
+        return garage
+    return build_garage(cars_ref.stream(transaction=transaction))
+
+@firestore.transactional
+def add_car_to_garage(transaction, user_ref, cars_ref, car_ref, car_details):
+    """
+    Atomically check the VIN, move the primary flag and add a car to both the
+    cars subcollection and the garage summary. Returns the new garage, or None
+    when the VIN is already registered.
+    """
+    garage = read_garage(user_ref.get(transaction=transaction), cars_ref, transaction)
+
+    if any(car.get("vin") == car_details["vin"] for car in garage["cars"].values()):
+        return None
+
+    previous_primary_id = garage.get("primaryCarId")
+    if car_details["isPrimary"]:
+        if previous_primary_id in garage["cars"]:
+            transaction.update(cars_ref.document(previous_primary_id), {"isPrimary": False})
+            garage["cars"][previous_primary_id]["isPrimary"] = False
+        garage["primaryCarId"] = car_ref.id
+
+    garage["cars"][car_ref.id] = {field: car_details.get(field) for field in GARAGE_CAR_FIELDS}
+    garage["revision"] = garage.get("revision", 0) + 1
+
+    transaction.set(car_ref, car_details)
+    transaction.set(user_ref, {"garage": garage}, merge=["garage"])
+
+    return garage
 
 class CarManager:
     """
     CarManager is responsible for handling car-related operations for a user.
+
+    The user document holds a "garage" summary of every car, with its VIN and the
+    primary car id, so listing cars and checking for duplicates is one read.
     """
-    def __init__(self, db, user_id):
+    def __init__(self, db, user_id, garage_cache=None):
         """
         Initialize the CarManager with Firestore reference and user ID.
         """
         self.db = db
         self.user_id = user_id
-        self.cars_ref = db.collection("users").document(user_id).collection("cars")
+        self.user_ref = db.collection("users").document(user_id)
+        self.cars_ref = self.user_ref.collection("cars")
+        self.garage_cache = garage_cache
 
     def add_car(self, data):
         """
@@ -30,16 +95,19 @@ class CarManager:
                 'isPrimary': is_primary
             }
 
-            if self.is_duplicate_car(car_details):
-                return jsonify({"error": "Duplicate car detected"}), 400
+            garage = add_car_to_garage(
+                self.db.transaction(), self.user_ref, self.cars_ref,
+                self.cars_ref.document(), car_details
+            )
 
-            if is_primary:
-                self.unset_existing_primary_car()
+            if garage is None:
+                return jsonify({"error": "Duplicate car detected"}), 400
 
-            self.cars_ref.document().set(car_details)
+            if self.garage_cache is not None:
+                self.garage_cache.put(self.user_id, garage)
 
             return jsonify({
-                "message": "Car added successfully", 
+                "message": "Car added successfully",
                 "car": car_details
             }), 201
 
@@ -49,35 +117,39 @@ class CarManager:
         except Exception as e:
             return handle_generic_error(e, "An unexpected error occurred")
 
-    def is_duplicate_car(self, car_details):
+    def load_garage(self):
+        """
+        Read the user's garage summary from Firestore.
+        """
+        return read_garage(self.user_ref.get(field_paths=["garage"]), self.cars_ref)
+
+    def load_garage_revision(self):
         """
-        Check if a car with the same VIN already exists.
+        Read only the revision of the user's garage summary, or None without one.
         """
-        duplicate_query = (
-            self.cars_ref
-            .where("vin", "==", car_details["vin"])
-            .limit(1)
-            .stream()
-        )
-        return any(duplicate_query)
+        user_doc = self.user_ref.get(field_paths=["garage.revision"])
+        if not user_doc.exists:
+            return None
+        return ((user_doc.to_dict() or {}).get("garage") or {}).get("revision")
+
+    def get_garage(self):
+        """
+        Fetch the user's garage summary, from the cache when one is set.
+        """
+        if self.garage_cache is not None:
+            return self.garage_cache.get(
+                self.user_id, self.load_garage, self.load_garage_revision
+            )
+        return self.load_garage()
 
     def get_cars_for_user(self):
         """
         Fetches all cars associated with the user.
         """
         try:
-            cars_docs = self.cars_ref.stream()
-
-            cars = []
-            for car in cars_docs:
-                car_data = car.to_dict()
-                cars.append({
-                "year": car_data.get("year"),
-                "make": car_data.get("make"),
-                "model": car_data.get("model"),
-                "color": car_data.get("color"),
-                "licensePlate": car_data.get("licensePlate")
-            })
+            garage = self.get_garage()
+
+            cars = [Car.from_data(car_data) for car_data in garage["cars"].values()]
 
             if not cars:
                 return {
@@ -85,7 +157,8 @@ class CarManager:
                 }, 204
 
             return {
-                "cars": cars
+                "cars": cars,
+                "version": snapshot_version([], self.user_id, garage.get("revision", 0))
             }, 200
 
         except FirebaseError as e:
@@ -100,9 +173,3 @@ class CarManager:
         if isinstance(value, str):
             return value.strip().lower() == "true"
         return bool(value)
-
-    def unset_existing_primary_car(self):
-        """Unset existing primary car if a new one is marked as primary."""
-        existing_primary_cars = self.cars_ref.where("isPrimary", "==", True).stream()
-        for car in existing_primary_cars:
-            self.cars_ref.document(car.id).update({"isPrimary": False})
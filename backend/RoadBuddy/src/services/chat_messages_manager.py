@@ -1,7 +1,34 @@
+import base64
+from datetime import datetime, timezone
+import orjson
 from google.cloud import firestore
 from firebase_admin.exceptions import FirebaseError
-import pytz
-from utils import handle_firestore_error, handle_generic_error
+from time_service import format_timestamp
+from utils import handle_firestore_error, handle_generic_error, snapshot_version
+from services.message_archive_manager import MessageArchiveManager
+from services.outbox_manager import MESSAGE_SENT, OutboxManager
+
+def encode_cursor(message_data):
+    """
+    Opaque pagination cursor of a message, from its timestamp and id.
+    """
+    position = [message_data["timestamp"].isoformat(), message_data["id"]]
+    return base64.urlsafe_b64encode(orjson.dumps(position)).decode("ascii")
+
+def decode_cursor(cursor):
+    """
+    The (timestamp, message id) of a cursor from encode_cursor. Raises
+    ValueError for anything else.
+    """
+    try:
+        timestamp, message_id = orjson.loads(base64.urlsafe_b64decode(cursor))
+        timestamp = datetime.fromisoformat(timestamp)
+    except TypeError as e:
+        raise ValueError("Malformed cursor") from e
+
+    if timestamp.tzinfo is None or not isinstance(message_id, str):
+        raise ValueError("Malformed cursor")
+    return timestamp, message_id
 
 class ChatMessagesManager:
     """
@@ -19,10 +46,13 @@ class ChatMessagesManager:
         self.messages_ref = (
             db.collection("ride_chats").document(ride_id).collection("messages")
         )
+        self.archive_manager = MessageArchiveManager(db, ride_id)
+        self.outbox_manager = OutboxManager(db)
 
-    def send_message(self, text, time, is_owner):
+    def send_message(self, text, time, is_owner, event_data=None):
         """
-        Sends a message in a ride chat.
+        Sends a message in a ride chat. With event_data, a message event is
+        recorded in the same batch and its id returned as eventId.
         """
         try:
             message_data = {
@@ -33,10 +63,19 @@ class ChatMessagesManager:
                 "isOwner": is_owner
             }
 
-            self.messages_ref.document().set(message_data)
+            batch = self.db.batch()
+            batch.set(self.messages_ref.document(), message_data)
+
+            event_id = None
+            if event_data is not None:
+                event_id = self.outbox_manager.record(
+                    batch, MESSAGE_SENT, self.ride_id, event_data
+                )
+            batch.commit()
 
             return {
-                "message": "Message has been sent"
+                "message": "Message has been sent",
+                "eventId": event_id
             }, 201
 
         except FirebaseError as e:
@@ -45,18 +84,17 @@ class ChatMessagesManager:
         except Exception as e:
             return handle_generic_error(e, "An unexpected error occurred")
 
-    def delete_all_messages(self):
+    def delete_all_messages(self, max_workers=1):
         """
-        Fetch all messages for a ride chat, sorted by timestamp.
+        Delete every hot and archived message of a ride chat, committing up to
+        max_workers batches at a time.
         """
         try:
-            messages = self.messages_ref.stream()
-            batch = self.db.batch()
-
-            for message in messages:
-                batch.delete(message.reference)
-
-            batch.commit()
+            self.archive_manager.delete_refs(
+                [message.reference for message in self.messages_ref.select([]).stream()],
+                max_workers
+            )
+            self.archive_manager.delete_all_archives(max_workers)
 
             return {
                 "message": "All messages successfully deleted."
@@ -68,33 +106,137 @@ class ChatMessagesManager:
         except Exception as e:
             return handle_generic_error(e, "An unexpected error occurred")
 
+    @staticmethod
+    def format_message(message_data):
+        """
+        Format a message's timestamp for display.
+        """
+        message_data["timestamp"] = format_timestamp(message_data["timestamp"])
+        return message_data
+
+    def stream_messages_sorted_by_timestamp_asc(self):
+        """
+        Yield every message of a chat room one at a time, oldest first, archived
+        messages before hot ones.
+        """
+        for messages in self.archive_manager.stream_archive_chunks():
+            for message_data in messages:
+                yield self.format_message(message_data)
+
+        messages_query = (
+            self.messages_ref.order_by("timestamp", direction=firestore.Query.ASCENDING)
+        )
+        hot_boundary = self.archive_manager.get_hot_boundary()
+        if hot_boundary is not None:
+            messages_query = messages_query.where("timestamp", ">", hot_boundary)
+
+        for doc in messages_query.stream():
+            message_data = doc.to_dict()
+            message_data["id"] = doc.id
+            yield self.format_message(message_data)
+
     def get_messages_sorted_by_timestamp_asc(self):
         """
         Fetches all messages in a chat room.
         """
         try:
-            pacific_tz = pytz.timezone("America/Los_Angeles")
+            sorted_messages = dict(
+                enumerate(self.stream_messages_sorted_by_timestamp_asc(), start=1)
+            )
+
+            return {"messages": sorted_messages}, 200
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to fetch messages.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
+
+    def get_messages_page(self, limit, before=None):
+        """
+        Fetch up to limit messages older than the before cursor, oldest first,
+        continuing into the archive when the hot messages run out. Messages are
+        ordered by timestamp and id, so messages sent at the same time are not
+        skipped between pages.
+        """
+        try:
+            before_position = decode_cursor(before) if before else None
 
             messages_query = (
-                self.messages_ref.order_by("timestamp", direction=firestore.Query.ASCENDING)
+                self.messages_ref
+                .order_by("timestamp", direction=firestore.Query.DESCENDING)
+                .order_by("__name__", direction=firestore.Query.DESCENDING)
             )
-            messages_docs = messages_query.stream()
-
-            sorted_messages = {}
-            for index, doc in enumerate(messages_docs, start=1):
+            if before_position is not None:
+                before_timestamp, before_id = before_position
+                messages_query = messages_query.start_after({
+                    "timestamp": before_timestamp,
+                    "__name__": before_id
+                })
+
+            hot_boundary = self.archive_manager.get_hot_boundary()
+            if hot_boundary is not None:
+                messages_query = messages_query.where("timestamp", ">", hot_boundary)
+
+            page = []
+            for doc in messages_query.limit(limit).stream():
                 message_data = doc.to_dict()
                 message_data["id"] = doc.id
+                page.append(message_data)
 
-                utc_dt = message_data["timestamp"].replace(tzinfo=pytz.utc)
-                pacific_dt = utc_dt.astimezone(pacific_tz)
+            if len(page) < limit and hot_boundary is not None:
+                archive_before = before_position or (datetime.now(timezone.utc), "")
+                for message_data in (
+                    self.archive_manager.stream_archived_messages_before(*archive_before)
+                ):
+                    page.append(message_data)
+                    if len(page) == limit:
+                        break
 
-                message_data["timestamp"] = pacific_dt.strftime("%Y-%m-%d %I:%M %p PT")
-                sorted_messages[index] = message_data
+            next_cursor = encode_cursor(page[-1]) if len(page) == limit else None
+            page.reverse()
 
-            return {"messages": sorted_messages}, 200
+            return {
+                "messages": dict(enumerate(map(self.format_message, page), start=1)),
+                "nextCursor": next_cursor
+            }, 200
+
+        except ValueError as e:
+            return {"error": "Invalid pagination cursor.", "details": str(e)}, 400
 
         except FirebaseError as e:
             return handle_firestore_error(e, "Failed to fetch messages.")
 
         except Exception as e:
             return handle_generic_error(e, "An unexpected error occurred")
+
+    def get_version(self, *extra):
+        """
+        Version of the chat's messages, from the newest hot message. Messages are
+        never edited and compaction keeps the newest ones hot, so it only changes
+        when a message is sent.
+        """
+        try:
+            newest = (
+                self.messages_ref
+                .order_by("timestamp", direction=firestore.Query.DESCENDING)
+                .limit(1)
+                .select([])
+                .stream()
+            )
+
+            return {
+                "version": snapshot_version(newest, self.ride_id, *extra)
+            }, 200
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to fetch messages.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
+
+    def compact_messages(self):
+        """
+        Archive all but the newest hot messages.
+        """
+        return self.archive_manager.compact()
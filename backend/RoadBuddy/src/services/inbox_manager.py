@@ -0,0 +1,214 @@
+from google.api_core.exceptions import NotFound
+from google.cloud import firestore
+from firebase_admin.exceptions import FirebaseError
+from models import RideChat
+from time_service import format_timestamp
+from utils import (
+    delete_documents, handle_firestore_error, handle_generic_error, snapshot_version
+)
+
+INBOX_FIELDS = (
+    "rideId",
+    "from",
+    "to",
+    "date",
+    "departureTime",
+    "owner",
+    "ownerName",
+    "lastMessage",
+    "UsernameLastMessage",
+)
+
+# Fields the chat list renders.
+INBOX_LIST_FIELDS = [
+    "from",
+    "to",
+    "date",
+    "departureTime",
+    "ownerName",
+    "lastMessage",
+    "UsernameLastMessage",
+    "lastMessageTimestamp",
+    "unreadCount",
+]
+
+class InboxManager:
+    """
+    InboxManager maintains the per-user chat list index "users/{uid}/inbox/{rideId}".
+
+    Each entry copies the chat fields the chat list renders, plus the chat's
+    lastMessageTimestamp and the user's unreadCount, so the chat list is a single
+    ordered, paginated query.
+    """
+
+    def __init__(self, db):
+        """
+        Initialize the InboxManager.
+        """
+        self.db = db
+        self.users_ref = db.collection("users")
+        self.ride_chat_ref = db.collection("ride_chats")
+
+    def inbox_ref(self, user_id):
+        """
+        Return the inbox collection of a user.
+        """
+        return self.users_ref.document(user_id).collection("inbox")
+
+    def entry_ref(self, user_id, ride_id):
+        """
+        Return the inbox entry of a user for a ride chat.
+        """
+        return self.inbox_ref(user_id).document(ride_id)
+
+    @staticmethod
+    def build_entry(ride_id, chat_data):
+        """
+        Build an inbox entry from a ride chat document.
+        """
+        entry = {field: chat_data.get(field, "") for field in INBOX_FIELDS}
+        entry["rideId"] = ride_id
+        entry["lastMessageTimestamp"] = (
+            chat_data.get("lastMessageTimestamp") or firestore.SERVER_TIMESTAMP
+        )
+        entry["unreadCount"] = 0
+        return entry
+
+    def add_entry(self, user_id, ride_id, chat_data, batch=None):
+        """
+        Add a ride chat to a user's inbox. Writes into the given batch when provided.
+        """
+        entry = self.build_entry(ride_id, chat_data)
+        if batch is not None:
+            batch.set(self.entry_ref(user_id, ride_id), entry)
+        else:
+            self.entry_ref(user_id, ride_id).set(entry)
+
+    def add_entry_from_chat(self, user_id, ride_id, batch=None):
+        """
+        Add a ride chat to a user's inbox, copying the chat's current last message.
+        Writes into the given batch when provided.
+        """
+        try:
+            chat_doc = self.ride_chat_ref.document(ride_id).get()
+            if not chat_doc.exists:
+                return {"error": "Chat ride not found."}, 404
+
+            self.add_entry(user_id, ride_id, chat_doc.to_dict(), batch)
+
+            return {"message": "Inbox entry added."}, 200
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to add inbox entry.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
+
+    def remove_entries(self, user_ids, ride_id, max_workers=1):
+        """
+        Remove a ride chat from the inbox of every given user in chunked batches,
+        committing up to max_workers at a time.
+        """
+        try:
+            delete_documents(
+                self.db, [self.entry_ref(user_id, ride_id) for user_id in user_ids], max_workers
+            )
+
+            return {"message": "Inbox entries removed."}, 200
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to remove inbox entries.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
+
+    @staticmethod
+    def last_message_update(last_message, unread_count):
+        """
+        Build the last-message update of an inbox entry.
+        """
+        return {
+            "lastMessage": last_message["lastMessage"],
+            "UsernameLastMessage": last_message["UsernameLastMessage"],
+            "lastMessageTimestamp": last_message["lastMessageTimestamp"],
+            "unreadCount": firestore.Increment(unread_count),
+        }
+
+    def fan_out_last_message(self, batch, ride_id, participants, last_message, unread_counts):
+        """
+        Queue the last-message update of every participant's inbox entry into
+        batch. The batch fails with NotFound if an entry was removed since the
+        message was sent, rather than recreating it without its ride fields.
+        """
+        for user_id in participants:
+            batch.update(
+                self.entry_ref(user_id, ride_id),
+                self.last_message_update(last_message, unread_counts.get(user_id, 0))
+            )
+
+    def update_last_message(self, user_id, ride_id, last_message, unread_count):
+        """
+        Update the last message of one inbox entry, ignoring a removed entry.
+        """
+        try:
+            self.entry_ref(user_id, ride_id).update(
+                self.last_message_update(last_message, unread_count)
+            )
+        except NotFound:
+            pass
+
+    def mark_read(self, user_id, ride_id):
+        """
+        Reset the unread count of a user's inbox entry.
+        """
+        try:
+            self.entry_ref(user_id, ride_id).set({"unreadCount": 0}, merge=True)
+            return {"message": "Chat marked as read."}, 200
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to mark chat as read.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
+
+    def get_inbox_page(self, user_id, limit, after=None):
+        """
+        Fetch a page of the user's ride chats, most recent message first.
+
+        after is the ride id of the last chat of the previous page.
+        """
+        try:
+            inbox_query = (
+                self.inbox_ref(user_id)
+                .order_by("lastMessageTimestamp", direction=firestore.Query.DESCENDING)
+            )
+
+            if after:
+                after_doc = self.entry_ref(user_id, after).get()
+                if not after_doc.exists:
+                    return {"error": "Invalid pagination cursor."}, 400
+                inbox_query = inbox_query.start_after(after_doc)
+
+            entry_docs = list(inbox_query.select(INBOX_LIST_FIELDS).limit(limit).stream())
+
+            ride_chats = []
+            for entry_doc in entry_docs:
+                ride_chat = RideChat.from_snapshot(entry_doc)
+                ride_chat.last_message_timestamp = format_timestamp(
+                    ride_chat.last_message_timestamp
+                )
+                ride_chats.append(ride_chat)
+
+            next_cursor = ride_chats[-1].id if len(ride_chats) == limit else None
+
+            return {
+                "ride_chats": ride_chats,
+                "nextCursor": next_cursor,
+                "version": snapshot_version(entry_docs, user_id, limit, after)
+            }, 200
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to fetch user ride chats.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
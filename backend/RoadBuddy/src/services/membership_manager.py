@@ -0,0 +1,153 @@
+from google.cloud import firestore
+from firebase_admin.exceptions import FirebaseError
+from utils import delete_documents, handle_firestore_error, handle_generic_error
+
+OWNER_ROLE = "owner"
+PASSENGER_ROLE = "passenger"
+
+class MembershipManager:
+    """
+    MembershipManager handles ride membership stored as one document per (ride, user).
+
+    Documents live in the top-level "ride_members" collection with the id
+    "{rideId}_{userId}", so adding, removing and checking a member is a single
+    document write or read. The "rideId" and "userId" fields are indexed to list
+    the members of a ride or the rides of a user.
+    """
+
+    def __init__(self, db):
+        """
+        Initialize the MembershipManager.
+        """
+        self.db = db
+        self.members_ref = db.collection("ride_members")
+
+    @staticmethod
+    def member_id(ride_id, user_id):
+        """
+        Build the deterministic membership document id.
+        """
+        return f"{ride_id}_{user_id}"
+
+    def member_ref(self, ride_id, user_id):
+        """
+        Return the membership document reference for a ride and user.
+        """
+        return self.members_ref.document(self.member_id(ride_id, user_id))
+
+    @staticmethod
+    def member_data(ride_id, user_id, role):
+        """
+        Build the membership document body.
+        """
+        return {
+            "rideId": ride_id,
+            "userId": user_id,
+            "role": role,
+            "joinedAt": firestore.SERVER_TIMESTAMP
+        }
+
+    def add_member(self, ride_id, user_id, role, batch=None):
+        """
+        Add a user as a member of a ride. Writes into the given batch when provided.
+        """
+        try:
+            member_ref = self.member_ref(ride_id, user_id)
+            member_data = self.member_data(ride_id, user_id, role)
+
+            if batch is not None:
+                batch.set(member_ref, member_data)
+            else:
+                member_ref.set(member_data)
+
+            return {"message": "Member successfully added."}, 200
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to add ride member.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
+
+    def remove_member(self, ride_id, user_id, batch=None):
+        """
+        Remove a user from the members of a ride. Writes into the given batch when provided.
+        """
+        try:
+            member_ref = self.member_ref(ride_id, user_id)
+
+            if batch is not None:
+                batch.delete(member_ref)
+            else:
+                member_ref.delete()
+
+            return {"message": "Member successfully removed."}, 200
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to remove ride member.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
+
+    def is_member(self, ride_id, user_id, role=None):
+        """
+        Check whether a user is a member of a ride, optionally with the given role.
+        """
+        member_doc = self.member_ref(ride_id, user_id).get()
+        if not member_doc.exists:
+            return False
+
+        return role is None or member_doc.get("role") == role
+
+    def get_member_ids(self, ride_id, role=None):
+        """
+        Fetch the user ids of every member of a ride.
+        """
+        query = self.members_ref.where("rideId", "==", ride_id)
+        if role:
+            query = query.where("role", "==", role)
+
+        return [doc.get("userId") for doc in query.select(["userId"]).stream()]
+
+    def get_payment_intents(self, ride_id):
+        """
+        Map each passenger of a ride to the PaymentIntent id recorded at booking,
+        or None for bookings made before it was recorded.
+        """
+        query = (
+            self.members_ref
+            .where("rideId", "==", ride_id)
+            .where("role", "==", PASSENGER_ROLE)
+            .select(["userId", "paymentIntentId"])
+        )
+
+        return {
+            doc.get("userId"): (doc.to_dict() or {}).get("paymentIntentId")
+            for doc in query.stream()
+        }
+
+    def get_ride_ids(self, user_id, role=None):
+        """
+        Fetch the ids of every ride the user is a member of.
+        """
+        query = self.members_ref.where("userId", "==", user_id)
+        if role:
+            query = query.where("role", "==", role)
+
+        return [doc.get("rideId") for doc in query.select(["rideId"]).stream()]
+
+    def remove_all_members(self, ride_id, max_workers=1):
+        """
+        Delete every membership document of a ride in chunked batches, committing
+        up to max_workers at a time.
+        """
+        try:
+            members = self.members_ref.where("rideId", "==", ride_id).select([]).stream()
+            delete_documents(self.db, [member.reference for member in members], max_workers)
+
+            return {"message": "All members successfully removed."}, 200
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to remove ride members.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
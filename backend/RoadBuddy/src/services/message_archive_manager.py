@@ -0,0 +1,204 @@
+from datetime import datetime, timezone
+import zlib
+import orjson
+from google.cloud import firestore
+from firebase_admin.exceptions import FirebaseError
+from utils import delete_documents, handle_firestore_error, handle_generic_error
+
+# Number of most recent messages kept as individual documents.
+HOT_MESSAGE_LIMIT = 200
+
+# Compaction runs once a chat holds this many hot messages, so it archives
+# messages in bulk instead of a few at a time.
+COMPACTION_THRESHOLD = HOT_MESSAGE_LIMIT + 300
+
+# Uncompressed size of the JSON held by one archive document. Compressed it
+# stays well below Firestore's 1 MiB document limit.
+ARCHIVE_CHUNK_BYTES = 1_000_000
+
+def archive_message(doc):
+    """
+    Convert a message snapshot into its archived form, timestamp as epoch seconds.
+    """
+    message_data = doc.to_dict()
+    message_data["id"] = doc.id
+    message_data["timestamp"] = message_data["timestamp"].timestamp()
+    return message_data
+
+def restore_message(message_data):
+    """
+    Convert an archived message back into the shape of a hot message.
+    """
+    message_data["timestamp"] = datetime.fromtimestamp(message_data["timestamp"], tz=timezone.utc)
+    return message_data
+
+class MessageArchiveManager:
+    """
+    MessageArchiveManager rolls old chat messages into compressed archive documents.
+
+    The newest HOT_MESSAGE_LIMIT messages stay in "ride_chats/{id}/messages". Older
+    ones are stored oldest first as zlib-compressed JSON lists in
+    "ride_chats/{id}/archives/{seq}", each holding about ARCHIVE_CHUNK_BYTES of JSON.
+    """
+
+    def __init__(self, db, ride_id):
+        """
+        Initialize the MessageArchiveManager.
+        """
+        self.db = db
+        self.ride_id = ride_id
+        self.ride_chat_doc_ref = db.collection("ride_chats").document(ride_id)
+        self.messages_ref = self.ride_chat_doc_ref.collection("messages")
+        self.archives_ref = self.ride_chat_doc_ref.collection("archives")
+
+    @staticmethod
+    def decode_archive(archive_doc):
+        """
+        Decompress an archive document into its list of messages, oldest first.
+        """
+        return [
+            restore_message(message_data)
+            for message_data in orjson.loads(zlib.decompress(archive_doc.get("data")))
+        ]
+
+    def get_last_archive(self, summary_only=False):
+        """
+        Fetch the most recent archive document, or None. With summary_only the
+        compressed data is not transferred.
+        """
+        query = self.archives_ref.order_by("seq", direction=firestore.Query.DESCENDING).limit(1)
+        if summary_only:
+            query = query.select(["seq", "count", "firstTimestamp", "lastTimestamp"])
+        return next(iter(query.stream()), None)
+
+    def get_hot_boundary(self):
+        """
+        Timestamp of the newest archived message, or None when nothing is archived.
+        Hot messages at or before it have already been archived.
+        """
+        last_archive = self.get_last_archive(summary_only=True)
+        return last_archive.get("lastTimestamp") if last_archive else None
+
+    def stream_archive_chunks(self):
+        """
+        Yield the message list of every archive document, oldest first.
+        """
+        for archive_doc in self.archives_ref.order_by("seq").stream():
+            yield self.decode_archive(archive_doc)
+
+    def stream_archived_messages_before(self, before, before_id=""):
+        """
+        Yield archived messages ordered before the before timestamp and message
+        id, newest first. Archives hold messages ordered by timestamp and id.
+        """
+        archives = (
+            self.archives_ref
+            .where("firstTimestamp", "<=", before)
+            .order_by("firstTimestamp", direction=firestore.Query.DESCENDING)
+            .stream()
+        )
+        for archive_doc in archives:
+            for message_data in reversed(self.decode_archive(archive_doc)):
+                if (message_data["timestamp"], message_data["id"]) < (before, before_id):
+                    yield message_data
+
+    def compact(self, keep_last=HOT_MESSAGE_LIMIT):
+        """
+        Move every hot message except the newest keep_last into archive documents.
+        """
+        try:
+            last_archive = self.get_last_archive()
+            seq = last_archive.get("seq") + 1 if last_archive else 0
+            already_archived = set()
+            if last_archive is not None:
+                already_archived = {
+                    message["id"] for message in self.decode_archive(last_archive)
+                }
+
+            newest = (
+                self.messages_ref
+                .order_by("timestamp", direction=firestore.Query.DESCENDING)
+                .limit(keep_last)
+                .select([])
+                .stream()
+            )
+            keep_ids = {doc.id for doc in newest}
+
+            old_messages = (
+                self.messages_ref
+                .order_by("timestamp", direction=firestore.Query.ASCENDING)
+                .stream()
+            )
+
+            chunk, chunk_refs, chunk_bytes = [], [], 0
+            chunk_timestamps = []
+            stale_refs = []
+            archived = 0
+            for doc in old_messages:
+                if doc.id in keep_ids:
+                    break
+
+                if doc.id in already_archived:
+                    stale_refs.append(doc.reference)
+                    continue
+
+                message_data = archive_message(doc)
+                chunk.append(message_data)
+                chunk_refs.append(doc.reference)
+                chunk_timestamps.append(doc.get("timestamp"))
+                chunk_bytes += len(orjson.dumps(message_data))
+
+                if chunk_bytes >= ARCHIVE_CHUNK_BYTES:
+                    self.write_archive(seq, chunk, chunk_refs, chunk_timestamps)
+                    archived += len(chunk)
+                    seq += 1
+                    chunk, chunk_refs, chunk_bytes = [], [], 0
+                    chunk_timestamps = []
+
+            if chunk:
+                self.write_archive(seq, chunk, chunk_refs, chunk_timestamps)
+                archived += len(chunk)
+
+            self.delete_refs(stale_refs)
+
+            removed = archived + len(stale_refs)
+            if removed:
+                self.ride_chat_doc_ref.update({"hotMessageCount": firestore.Increment(-removed)})
+
+            return {
+                "message": "Messages successfully archived.",
+                "archived": archived
+            }, 200
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to archive messages.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
+
+    def write_archive(self, seq, messages, message_refs, timestamps):
+        """
+        Write one archive document, then delete the messages it holds.
+        """
+        self.archives_ref.document(f"{seq:06d}").set({
+            "seq": seq,
+            "count": len(messages),
+            "firstTimestamp": timestamps[0],
+            "lastTimestamp": timestamps[-1],
+            "data": zlib.compress(orjson.dumps(messages)),
+        })
+        self.delete_refs(message_refs)
+
+    def delete_refs(self, refs, max_workers=1):
+        """
+        Delete documents in chunked batches, committing up to max_workers at a time.
+        """
+        delete_documents(self.db, refs, max_workers)
+
+    def delete_all_archives(self, max_workers=1):
+        """
+        Delete every archive document of the chat.
+        """
+        self.delete_refs(
+            [doc.reference for doc in self.archives_ref.select([]).stream()], max_workers
+        )
@@ -1,11 +1,10 @@
 
-from datetime import datetime
-
 import google.cloud
-import pytz
 from firebase_admin.exceptions import FirebaseError
 from google.cloud import firestore
-from utils import handle_firestore_error, handle_generic_error
+from models import Notification
+from time_service import NOTIFICATION_TIME_FORMAT, format_timestamp
+from utils import MAX_BATCH_SIZE, handle_firestore_error, handle_generic_error
 
 class NotificationManager:
     """
@@ -19,22 +18,30 @@ class NotificationManager:
         self.db = db
         self.users_ref = db.collection("users")
 
+    def queue_notification(self, writer, user_id, ride_id, message):
+        """
+        Add a notification and its unread count increment to a batch or transaction.
+        """
+        user_ref = self.users_ref.document(user_id)
+        notification_ref = user_ref.collection("notifications").document()
+
+        writer.set(notification_ref, {
+            "message": message,
+            "rideId": ride_id,
+            "read": False,
+            "createdAt": firestore.SERVER_TIMESTAMP
+        })
+
+        writer.set(user_ref, {"unread_notification_count": firestore.Increment(1)}, merge=True)
+
     def store_notification(self, ride_owner_id, ride_id, message):
         """
         Stores a notification inside the user's document and increments unread count.
         """
         try:
-            user_ref = self.users_ref.document(ride_owner_id)
-            notification_ref = user_ref.collection("notifications").document()
-
-            notification_ref.set({
-                "message": message,
-                "rideId": ride_id,
-                "read": False,
-                "createdAt": firestore.SERVER_TIMESTAMP
-            })
-
-            user_ref.set({"unread_notification_count": firestore.Increment(1)}, merge=True)
+            batch = self.db.batch()
+            self.queue_notification(batch, ride_owner_id, ride_id, message)
+            batch.commit()
 
             return {"message": "Notification stored successfully"}, 201
 
@@ -55,21 +62,7 @@ class NotificationManager:
             batch = self.db.batch()
 
             for user_id in user_ids:
-                user_ref = self.users_ref.document(user_id)
-                notification_ref = user_ref.collection("notifications").document()
-
-                batch.set(notification_ref, {
-                    "message": message,
-                    "rideId": ride_id,
-                    "read": False,
-                    "createdAt": firestore.SERVER_TIMESTAMP
-                })
-
-                batch.set(
-                    user_ref,
-                    {"unread_notification_count": firestore.Increment(1)},
-                    merge=True
-                )
+                self.queue_notification(batch, user_id, ride_id, message)
 
             batch.commit()
 
@@ -83,48 +76,66 @@ class NotificationManager:
         except Exception as e:
             return handle_generic_error(e, "An unexpected error occurred")
 
-    def get_all_notifications_for_user(self, user_id):
+    def mark_read(self, user_ref, notification_refs):
+        """
+        Mark notifications as read and take them off the unread count in one batch.
         """
-        Fetches all notifications for a user, marks them as read, and resets the unread count.
+        batch = self.db.batch()
+        for notification_ref in notification_refs:
+            batch.update(notification_ref, {"read": True})
+        batch.update(user_ref, {
+            "unread_notification_count": firestore.Increment(-len(notification_refs))
+        })
+        batch.commit()
+
+    def stream_notifications_for_user(self, user_id):
         """
+        Yield a user's notifications newest first. Unread notifications are marked
+        read in batches once yielded, and the unread count goes down by as many,
+        so notifications that were never sent stay unread.
+        """
+        user_ref = self.users_ref.document(user_id)
+        notifications_ref = user_ref.collection("notifications")
+
+        notifications = (
+            notifications_ref
+            .order_by("createdAt", direction=google.cloud.firestore.Query.DESCENDING)
+            .select(["message", "read", "rideId", "createdAt"])
+            .stream()
+        )
+
+        # One write of each batch is the unread count decrement.
+        unread_refs = []
         try:
-            user_ref = self.users_ref.document(user_id)
-            notifications_ref = user_ref.collection("notifications")
-
-            notifications = (
-                notifications_ref
-                .order_by("createdAt", direction=google.cloud.firestore.Query.DESCENDING)
-                .stream()
-            )
-
-            pacific_tz = pytz.timezone("America/Los_Angeles")
-            notifications_list = []
-            batch = self.db.batch()
-
             for notification in notifications:
                 data = notification.to_dict()
 
-                created_at = data.get("createdAt")
-                utc_dt = (
-                    datetime.utcfromtimestamp(created_at.timestamp()).replace(tzinfo=pytz.utc)
-                )
-                pacific_dt = utc_dt.astimezone(pacific_tz)
-                formatted_date = pacific_dt.strftime("%m-%d-%Y %I:%M %p PT")
+                formatted_date = format_timestamp(data.get("createdAt"), NOTIFICATION_TIME_FORMAT)
 
-                notifications_list.append({
-                    "id": notification.id,
-                    "message": data.get("message"),
-                    "read": data.get("read"),
-                    "rideId": data.get("rideId"),
-                    "createdAt": formatted_date
-                })
+                yield Notification(
+                    notification.id,
+                    data.get("message"),
+                    data.get("read"),
+                    data.get("rideId"),
+                    formatted_date
+                )
 
                 if not data.get("read", False):
-                    batch.update(notification.reference, {"read": True})
+                    unread_refs.append(notification.reference)
 
-            batch.commit()
+                    if len(unread_refs) == MAX_BATCH_SIZE - 1:
+                        self.mark_read(user_ref, unread_refs)
+                        unread_refs = []
+        finally:
+            if unread_refs:
+                self.mark_read(user_ref, unread_refs)
 
-            user_ref.update({"unread_notification_count": 0})
+    def get_all_notifications_for_user(self, user_id):
+        """
+        Fetches all notifications for a user, marks them as read, and lowers the unread count.
+        """
+        try:
+            notifications_list = list(self.stream_notifications_for_user(user_id))
 
             return {"notifications": notifications_list}, 200
 
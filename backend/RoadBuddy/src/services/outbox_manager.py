@@ -0,0 +1,66 @@
+from google.cloud import firestore
+
+RIDE_BOOKED = "ride.booked"
+RIDE_CANCELLED = "ride.cancelled"
+MESSAGE_SENT = "message.sent"
+
+class OutboxManager:
+    """
+    OutboxManager records ride lifecycle events in the top-level "outbox" collection.
+
+    An event is written in the same batch or transaction as the change it
+    describes, so it exists exactly when the change does. OutboxDispatcher
+    then delivers it to its handlers and deletes it. The delete is
+    conditioned on the event being unchanged since it was read, so an event
+    delivered twice at the same time is only applied once.
+    """
+
+    def __init__(self, db):
+        """
+        Initialize the OutboxManager.
+        """
+        self.db = db
+        self.outbox_ref = db.collection("outbox")
+
+    def record(self, writer, event_type, ride_id, data):
+        """
+        Add an event to a batch or transaction. Returns the event id.
+        """
+        event_ref = self.outbox_ref.document()
+        writer.set(event_ref, {
+            "type": event_type,
+            "rideId": ride_id,
+            "data": data,
+            "createdAt": firestore.SERVER_TIMESTAMP
+        })
+        return event_ref.id
+
+    def get_events(self, event_ids):
+        """
+        Fetch the events with the given ids that are still waiting for delivery.
+        """
+        event_refs = [self.outbox_ref.document(event_id) for event_id in event_ids]
+        return [event_doc for event_doc in self.db.get_all(event_refs) if event_doc.exists]
+
+    def stream_stale_events(self, created_before, limit):
+        """
+        Stream the oldest events recorded before created_before, such as ones
+        left behind by a worker that exited before delivering them.
+        """
+        return (
+            self.outbox_ref
+            .where("createdAt", "<=", created_before)
+            .order_by("createdAt")
+            .limit(limit)
+            .stream()
+        )
+
+    def complete(self, writer, event_doc):
+        """
+        Add the deletion of a delivered event to a batch, failing the batch if
+        the event was already delivered.
+        """
+        writer.delete(
+            event_doc.reference,
+            option=self.db.write_option(last_update_time=event_doc.update_time)
+        )
@@ -1,4 +1,3 @@
-import stripe
 from utils import handle_generic_error
 
 stripe_keys = {
@@ -9,18 +8,17 @@ stripe_keys = {
         "..."
     ),
 }
-stripe.api_key = stripe_keys["secret_key"]
-
 class PaymentManager:
     """
     PaymentManager handles Stripe payment operations.
     """
 
-    def __init__(self, user_id):
+    def __init__(self, user_id, stripe_client):
         """
-        Initialize the PaymentManager."
+        Initialize the PaymentManager with the configured stripe module.
         """
         self.user_id = user_id
+        self.stripe = stripe_client
 
     def create_payment_sheet(self, ride_id, amount, stripe_customer_id=None):
         """
@@ -33,18 +31,18 @@ class PaymentManager:
 
         try:
             if not stripe_customer_id:
-                customer = stripe.Customer.create(
+                customer = self.stripe.Customer.create(
                     description=f"Customer for user {self.user_id} (Ride: {ride_id})",
                     metadata={'user_id': self.user_id}
                 )
                 stripe_customer_id = customer.id
 
-            ephemeral_key = stripe.EphemeralKey.create(
+            ephemeral_key = self.stripe.EphemeralKey.create(
                 customer=stripe_customer_id,
                 stripe_version='2020-08-27'
             )
 
-            payment_intent = stripe.PaymentIntent.create(
+            payment_intent = self.stripe.PaymentIntent.create(
                 amount=amount_cents,
                 currency="usd",
                 customer=stripe_customer_id,
@@ -54,11 +52,12 @@ class PaymentManager:
 
             return {
                 "paymentIntent": payment_intent.client_secret,
+                "paymentIntentId": payment_intent.id,
                 "ephemeralKey": ephemeral_key.secret,
                 "customer": stripe_customer_id,
             }, 200
 
-        except stripe.error.StripeError as e:
+        except self.stripe.error.StripeError as e:
             return {
                 "error": "Stripe payment processing failed.",
                 "details": str(e)
@@ -66,3 +65,29 @@ class PaymentManager:
 
         except Exception as e:
             return handle_generic_error(e, "An unexpected error occurred")
+
+    def refund_payment(self, payment_intent_id, idempotency_key, metadata=None):
+        """
+        Refund a PaymentIntent in full. Retrying with the same idempotency key
+        returns the first refund instead of refunding twice.
+        """
+        try:
+            refund = self.stripe.Refund.create(
+                payment_intent=payment_intent_id,
+                metadata=metadata or {},
+                idempotency_key=idempotency_key
+            )
+
+            return {
+                "refundId": refund.id,
+                "status": refund.status
+            }, 200
+
+        except self.stripe.error.StripeError as e:
+            return {
+                "error": "Stripe refund failed.",
+                "details": str(e)
+            }, 500
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
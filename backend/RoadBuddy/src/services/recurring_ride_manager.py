@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta
+from firebase_admin.exceptions import FirebaseError
+from time_service import DEFAULT_TIME_ZONE, departure_at, request_now
+from utils import MAX_BATCH_SIZE, handle_firestore_error, handle_generic_error
+from services.inbox_manager import InboxManager
+from services.membership_manager import MembershipManager, OWNER_ROLE
+from services.ride_chat_manager import RideChatManager
+from services.ride_manager import RideManager
+
+MAX_RECURRING_RIDES = 60
+
+# Each posted ride writes the ride, its chat, the owner's membership and inbox entry.
+WRITES_PER_RIDE = 4
+
+WEEKDAYS = {
+    "mon": 0, "monday": 0,
+    "tue": 1, "tuesday": 1,
+    "wed": 2, "wednesday": 2,
+    "thu": 3, "thursday": 3,
+    "fri": 4, "friday": 4,
+    "sat": 5, "saturday": 5,
+    "sun": 6, "sunday": 6,
+}
+
+def parse_days_of_week(days_of_week):
+    """
+    Convert day names ("mon", "Monday") or numbers (0 = Monday) into weekday numbers.
+    """
+    weekdays = set()
+    for day in days_of_week:
+        if isinstance(day, int) and 0 <= day <= 6:
+            weekdays.add(day)
+        elif isinstance(day, str) and day.strip().lower() in WEEKDAYS:
+            weekdays.add(WEEKDAYS[day.strip().lower()])
+        else:
+            raise ValueError(f"Invalid day of week: {day}")
+    return weekdays
+
+def expand_recurring_dates(start_date, end_date, days_of_week):
+    """
+    List every "%Y-%m-%d" date between start_date and end_date falling on days_of_week.
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    weekdays = parse_days_of_week(days_of_week)
+
+    if end < start:
+        raise ValueError("end_date must not be before start_date")
+
+    dates = []
+    day = start
+    while day <= end:
+        if day.weekday() in weekdays:
+            dates.append(day.strftime("%Y-%m-%d"))
+        day += timedelta(days=1)
+    return dates
+
+def check_not_past(date, data):
+    """
+    Raise ValueError if the ride on date would already have departed.
+    """
+    time_zone = data.get('time_zone') or DEFAULT_TIME_ZONE
+    if departure_at(date, data.get('departure_time'), time_zone) < request_now():
+        raise ValueError("start_date must not be in the past")
+
+class RecurringRideManager:
+    """
+    RecurringRideManager posts a ride template as many rides in batched writes.
+    """
+
+    def __init__(self, db, user_id, user_name, document_loader=None):
+        """
+        Initialize the RecurringRideManager.
+        """
+        self.db = db
+        self.user_id = user_id
+        self.user_name = user_name
+        self.ride_manager = RideManager(db, user_id, user_name, document_loader)
+        self.ride_chat_manager = RideChatManager(db, user_id, user_name)
+        self.membership_manager = MembershipManager(db)
+        self.inbox_manager = InboxManager(db)
+
+    def post_recurring_rides(self, data):
+        """
+        Expand a ride template over a date range and post every resulting ride.
+        """
+        try:
+            dates = expand_recurring_dates(
+                data.get('start_date'), data.get('end_date'), data.get('days_of_week')
+            )
+        except (TypeError, ValueError) as e:
+            return {"error": "Invalid recurring ride template.", "details": str(e)}, 400
+
+        if not dates:
+            return {"error": "No dates match the recurring ride template."}, 400
+
+        try:
+            check_not_past(dates[0], data)
+        except (TypeError, ValueError) as e:
+            return {"error": "Invalid recurring ride template.", "details": str(e)}, 400
+
+        if len(dates) > MAX_RECURRING_RIDES:
+            return {
+                "error": f"A recurring ride can create at most {MAX_RECURRING_RIDES} rides."
+            }, 400
+
+        try:
+            existing_fingerprints = (
+                self.ride_manager.get_posted_ride_fingerprints(dates[0], dates[-1])
+            )
+
+            rides = []
+            skipped_dates = []
+            for date in dates:
+                ride_data = self.ride_manager.build_ride_data(data, date)
+
+                if ride_data["fingerprint"] in existing_fingerprints:
+                    skipped_dates.append(date)
+                else:
+                    rides.append((self.ride_manager.ride_ref.document(), ride_data))
+
+            if not rides:
+                return {"error": "Duplicate ride post detected"}, 400
+
+            self.write_rides(rides)
+
+            return {
+                "message": "Rides posted successfully",
+                "rideIds": [ride_ref.id for ride_ref, _ in rides],
+                "skippedDates": skipped_dates
+            }, 201
+
+        except ValueError as e:
+            return {"error": "Invalid ride time or time zone.", "details": str(e)}, 400
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to post rides, please try again.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
+
+    def write_rides(self, rides):
+        """
+        Write rides, their chats and the owner's memberships and inbox entries in
+        chunked batches.
+        """
+        rides_per_batch = MAX_BATCH_SIZE // WRITES_PER_RIDE
+
+        for start in range(0, len(rides), rides_per_batch):
+            batch = self.db.batch()
+
+            for ride_ref, ride_data in rides[start:start + rides_per_batch]:
+                batch.set(ride_ref, ride_data)
+                chat_data = self.ride_chat_manager.build_ride_chat_data(ride_ref.id, ride_data)
+                batch.set(self.ride_chat_manager.ride_chat_ref.document(ride_ref.id), chat_data)
+                self.membership_manager.add_member(ride_ref.id, self.user_id, OWNER_ROLE, batch)
+                self.inbox_manager.add_entry(self.user_id, ride_ref.id, chat_data, batch)
+
+            batch.commit()
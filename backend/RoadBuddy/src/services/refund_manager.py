@@ -0,0 +1,163 @@
+from firebase_admin.exceptions import FirebaseError
+from google.cloud import firestore
+from utils import MAX_BATCH_SIZE, BatchWriter, handle_firestore_error, handle_generic_error
+
+PENDING = "pending"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+class RefundManager:
+    """
+    RefundManager tracks the refunds owed to passengers of deleted rides.
+
+    Each refund is a document in the top-level "refunds" collection with the id
+    "{rideId}_{userId}", which is also the Stripe idempotency key, so a refund
+    retried after a crash or a timeout is never paid twice. A refund starts
+    "pending" and ends "succeeded", "failed" after too many attempts, or
+    "skipped" when the booking has no recorded PaymentIntent.
+    """
+
+    def __init__(self, db):
+        """
+        Initialize the RefundManager.
+        """
+        self.db = db
+        self.refunds_ref = db.collection("refunds")
+
+    @staticmethod
+    def refund_id(ride_id, user_id):
+        """
+        Build the deterministic refund document id.
+        """
+        return f"{ride_id}_{user_id}"
+
+    @staticmethod
+    def idempotency_key(refund_id):
+        """
+        Stripe idempotency key of a refund.
+        """
+        return f"ride-refund-{refund_id}"
+
+    def refund_ref(self, ride_id, user_id):
+        """
+        Reference the refund document of a passenger of a ride.
+        """
+        return self.refunds_ref.document(self.refund_id(ride_id, user_id))
+
+    def record_refund(self, writer, refund_doc, booking):
+        """
+        Add the refund of a booking, a dict with its "rideId", "ownerId", "userId"
+        and "paymentIntentId", to a batch or transaction, unless refund_doc, the
+        snapshot of its document, shows it is already recorded. A recorded refund is
+        never written again, so a settled one is not sent twice. Returns the refund
+        if it is pending, or None when it is settled or there is no PaymentIntent.
+        """
+        if refund_doc.exists:
+            refund = refund_doc.to_dict()
+            return dict(refund, id=refund_doc.id) if refund.get("status") == PENDING else None
+
+        refund = dict(
+            booking,
+            status=PENDING if booking["paymentIntentId"] else SKIPPED,
+            attempts=0,
+            createdAt=firestore.SERVER_TIMESTAMP
+        )
+        writer.create(refund_doc.reference, refund)
+        return dict(refund, id=refund_doc.id) if booking["paymentIntentId"] else None
+
+    def create_refunds(self, ride_id, owner_id, payment_intents):
+        """
+        Record a refund for every passenger of a deleted ride. payment_intents maps
+        passenger ids to their PaymentIntent id. Refunds recorded by an earlier
+        attempt are kept as they are. Returns the pending refunds.
+        """
+        try:
+            pending = []
+            batch = BatchWriter(self.db)
+
+            refund_refs = [self.refund_ref(ride_id, user_id) for user_id in payment_intents]
+            refund_docs = {
+                refund_doc.id: refund_doc for refund_doc in self.db.get_all(refund_refs)
+            }
+            for user_id, payment_intent_id in payment_intents.items():
+                refund_doc = refund_docs[self.refund_id(ride_id, user_id)]
+                refund = self.record_refund(batch, refund_doc, {
+                    "rideId": ride_id,
+                    "ownerId": owner_id,
+                    "userId": user_id,
+                    "paymentIntentId": payment_intent_id
+                })
+                if refund is not None:
+                    pending.append(refund)
+
+            batch.commit()
+
+            return {
+                "refunds": pending
+            }, 201
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to record refunds.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
+
+    def mark_succeeded(self, refund_id, stripe_refund_id):
+        """
+        Record a refund Stripe accepted.
+        """
+        self.refunds_ref.document(refund_id).update({
+            "status": SUCCEEDED,
+            "stripeRefundId": stripe_refund_id,
+            "attempts": firestore.Increment(1),
+            "error": firestore.DELETE_FIELD,
+            "updatedAt": firestore.SERVER_TIMESTAMP
+        })
+
+    def mark_attempt_failed(self, refund_id, error, final):
+        """
+        Record a failed refund attempt, as "failed" once no attempt is left.
+        """
+        self.refunds_ref.document(refund_id).update({
+            "status": FAILED if final else PENDING,
+            "error": error,
+            "attempts": firestore.Increment(1),
+            "updatedAt": firestore.SERVER_TIMESTAMP
+        })
+
+    def stream_pending_refunds(self, idle_since, limit=MAX_BATCH_SIZE):
+        """
+        Stream refunds still waiting for Stripe that have not been touched since
+        idle_since, leaving alone the ones a worker is probably still sending.
+        """
+        for refund_doc in (
+            self.refunds_ref.where("status", "==", PENDING).limit(limit).stream()
+        ):
+            refund = refund_doc.to_dict()
+            refund["id"] = refund_doc.id
+            last_touched = refund.get("updatedAt") or refund.get("createdAt")
+            if last_touched is None or last_touched <= idle_since:
+                yield refund
+
+    def get_refunds_for_user(self, user_id):
+        """
+        Fetch the refunds owed to a user.
+        """
+        try:
+            refunds = []
+            for refund_doc in self.refunds_ref.where("userId", "==", user_id).stream():
+                refund = refund_doc.to_dict()
+                refund["id"] = refund_doc.id
+                refund.pop("paymentIntentId", None)
+                refunds.append(refund)
+
+            return {
+                "refunds": refunds
+            }, 200
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to fetch refunds.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
@@ -1,46 +1,488 @@
-from datetime import datetime
-import pytz
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+import hashlib
+from typing import Optional
 from firebase_admin.exceptions import FirebaseError
-from utils import handle_firestore_error, handle_generic_error
+from google.cloud import firestore
+from time_service import (
+    DEFAULT_TIME_ZONE, departure_at, future_mask, is_future, request_now, utc_now
+)
+from document_loader import get_document
+from utils import (
+    MAX_BATCH_SIZE, BatchWriter, handle_firestore_error, handle_generic_error, snapshot_version
+)
+from services.membership_manager import MembershipManager, PASSENGER_ROLE
+from services.outbox_manager import RIDE_BOOKED, RIDE_CANCELLED, OutboxManager
+from services.refund_manager import RefundManager
+from services.seat_hold_manager import DEFAULT_HOLD_TTL_SECONDS, SeatHoldManager
+from services.waitlist_manager import WaitlistManager
+
+# Status of a ride whose owner deleted it, until its cascade delete job removes it.
+DELETING_STATUS = "deleting"
+
+# Fields the available rides list renders.
+AVAILABLE_RIDE_FIELDS = [
+    "from", "to", "date", "departureTime", "ownerName",
+    "passengerCount", "maxPassengers", "cost",
+]
+
+# Fields needed to check whether a ride is still upcoming, dropped from responses.
+DEPARTURE_FIELDS = ["departureAt", "timeZone"]
+
+# Fields the coming up rides list renders and passes on to the ride screen.
+COMING_UP_RIDE_FIELDS = [
+    "from", "to", "date", "departureTime", "ownerName", "cost",
+    "currentPassengers", "maxPassengers", "car", "licensePlate",
+]
+
+def normalize_place(place):
+    """
+    Normalize an address for comparison: trimmed, lowercase, single spaces.
+    """
+    return " ".join(str(place or "").lower().split())
+
+def normalize_departure_time(departure_time):
+    """
+    Normalize a "%I:%M %p" departure time to 24-hour "%H:%M".
+    """
+    try:
+        return datetime.strptime(departure_time.strip(), "%I:%M %p").strftime("%H:%M")
+    except (AttributeError, ValueError):
+        return normalize_place(departure_time)
+
+def ride_fingerprint(owner_id, start, destination, date, departure_time):
+    """
+    Deterministic fingerprint of a ride: owner, normalized route and departure.
+    """
+    key = "|".join([
+        str(owner_id),
+        normalize_place(start),
+        normalize_place(destination),
+        str(date).strip(),
+        normalize_departure_time(departure_time)
+    ])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def passenger_count(ride_data):
+    """
+    Number of booked seats, falling back to the passenger list for older rides.
+    """
+    count = ride_data.get("passengerCount")
+    if count is None:
+        count = len(ride_data.get("currentPassengers") or [])
+    return count
+
+def held_seats(ride_data):
+    """
+    Number of seats held for riders in checkout.
+    """
+    return ride_data.get("heldSeats") or 0
+
+@dataclass
+class SeatRefs:
+    """
+    The documents of a rider's seat on a ride: the ride, and the rider's
+    membership, seat hold and waitlist entry.
+    """
+
+    ride: firestore.DocumentReference
+    member: firestore.DocumentReference
+    hold: firestore.DocumentReference
+    entry: firestore.DocumentReference
+
+    @classmethod
+    def of_rider(cls, db, ride_id, user_id):
+        """
+        Reference the seat documents of a user on a ride.
+        """
+        return cls(
+            ride=db.collection("rides").document(ride_id),
+            member=MembershipManager(db).member_ref(ride_id, user_id),
+            hold=SeatHoldManager(db).hold_ref(ride_id, user_id),
+            entry=WaitlistManager(db).entry_ref(ride_id, user_id)
+        )
+
+@dataclass
+class SeatContext:
+    """
+    Optional collaborators of the seat transactions, whose effects are skipped
+    when missing. outbox_manager records booking and cancellation events of
+    user_name, refund_manager refunds holds on rides being deleted, and
+    waitlist_manager holds freed seats for waiting riders until hold_expires_at.
+    """
+
+    user_name: Optional[str] = None
+    outbox_manager: Optional[OutboxManager] = None
+    refund_manager: Optional[RefundManager] = None
+    waitlist_manager: Optional[WaitlistManager] = None
+    hold_expires_at: Optional[datetime] = None
+
+def holding_context(context, hold_ttl_seconds, now=None):
+    """
+    The context holding freed seats for waiting riders for hold_ttl_seconds.
+    """
+    hold_expires_at = (now or utc_now()) + timedelta(seconds=hold_ttl_seconds)
+    return replace(context, hold_expires_at=hold_expires_at)
+
+@firestore.transactional
+def hold_seat(transaction, refs, hold_data):
+    """
+    Atomically hold a free seat for a rider in checkout, or extend the rider's
+    existing hold. A new hold takes the rider off the waitlist, so they are not
+    promoted onto a second held seat later.
+    """
+    ride_doc = refs.ride.get(transaction=transaction)
+    if not ride_doc.exists:
+        return {"error": "Ride not found"}, 404
+
+    hold_doc = refs.hold.get(transaction=transaction)
+
+    ride_data = ride_doc.to_dict()
+    if ride_data.get("status") == DELETING_STATUS:
+        return {"error": "Ride is being deleted"}, 400
+
+    if not is_future(ride_data, utc_now()):
+        return {"error": "Ride has already departed"}, 400
+
+    if hold_doc.exists:
+        transaction.update(refs.hold, {"expiresAt": hold_data["expiresAt"]})
+    else:
+        held = held_seats(ride_data)
+        if passenger_count(ride_data) + held >= ride_data.get("maxPassengers", 0):
+            return {"error": "Ride is full", "canJoinWaitlist": True}, 400
+
+        transaction.set(refs.hold, hold_data)
+        transaction.update(refs.ride, {"heldSeats": held + 1})
+        transaction.delete(refs.entry)
+
+    return {
+        "message": "Seat held.",
+        "holdExpiresAt": hold_data["expiresAt"]
+    }, 200
+
+def waiting_riders(transaction, ride_id, freed_seats, context):
+    """
+    Read the riders at the head of the waitlist who get the freed seats of a ride.
+    """
+    if context.waitlist_manager is None or freed_seats <= 0:
+        return []
+    return context.waitlist_manager.head_entries(ride_id, freed_seats, transaction)
+
+def promote_waiting_riders(transaction, ride_id, ride_data, waiting, context):
+    """
+    Hold a freed seat for each waiting rider and notify them.
+    """
+    for entry_doc in waiting:
+        context.waitlist_manager.promote(
+            transaction, ride_id, ride_data, entry_doc, context.hold_expires_at
+        )
+
+@firestore.transactional
+def release_holds(transaction, ride_doc_ref, hold_refs, now=None, context=None):
+    """
+    Atomically delete holds of a ride and free their seats, promoting waiting
+    riders into them. With now, only holds that expired by then are released.
+    Returns the number released.
+    """
+    context = context or SeatContext()
+    hold_docs = list(transaction.get_all(hold_refs))
+    ride_doc = ride_doc_ref.get(transaction=transaction)
+
+    released = [
+        hold_doc for hold_doc in hold_docs
+        if hold_doc.exists and (now is None or hold_doc.get("expiresAt") <= now)
+    ]
+
+    if released and ride_doc.exists:
+        ride_data = ride_doc.to_dict()
+        waiting = waiting_riders(transaction, ride_doc_ref.id, len(released), context)
+        promote_waiting_riders(transaction, ride_doc_ref.id, ride_data, waiting, context)
+
+        ride_update = {
+            "heldSeats": max(held_seats(ride_data) - len(released), 0) + len(waiting)
+        }
+        if len(waiting) < len(released) and ride_data.get("status") == "closed":
+            ride_update["status"] = "open"
+        transaction.update(ride_doc_ref, ride_update)
+
+    for hold_doc in released:
+        transaction.delete(hold_doc.reference)
+
+    return len(released)
+
+def ride_event_data(ride_data, user_id, user_name):
+    """
+    Build the data of a booking or cancellation event.
+    """
+    return {
+        "userId": user_id,
+        "userName": user_name,
+        "ownerId": ride_data.get("ownerID"),
+        "from": ride_data.get("from"),
+        "to": ride_data.get("to")
+    }
+
+def release_hold_of_deleting_ride(transaction, refs, ride_data, hold_doc, context):
+    """
+    Release a rider's hold on a ride being deleted, whose delete job has already
+    read the passengers to refund, and record the refund of its payment with
+    context.refund_manager. Returns the pending refund or None.
+    """
+    hold_data = hold_doc.to_dict()
+    refund_doc = None
+    if context.refund_manager is not None:
+        refund_doc = context.refund_manager.refund_ref(
+            refs.ride.id, hold_data.get("userId")
+        ).get(transaction=transaction)
+
+    transaction.delete(refs.hold)
+    transaction.update(refs.ride, {"heldSeats": max(held_seats(ride_data) - 1, 0)})
+
+    if refund_doc is None:
+        return None
+    return context.refund_manager.record_refund(transaction, refund_doc, {
+        "rideId": refs.ride.id,
+        "ownerId": ride_data.get("ownerID"),
+        "userId": hold_data.get("userId"),
+        "paymentIntentId": hold_data.get("paymentIntentId")
+    })
+
+@firestore.transactional
+def book_seat(transaction, refs, member_data, context=None):
+    """
+    Atomically check capacity and record a passenger membership, confirming
+    the passenger's seat hold when there is one. The hold's PaymentIntent id is
+    kept on the membership for refunds. The rider's waitlist entry is deleted
+    with the booking, so they are not promoted onto a second seat later. With
+    context.outbox_manager, a booking event is recorded along with the
+    membership and its id returned as eventId.
+
+    A ride being deleted takes no more passengers. The rider's hold is released
+    instead, and its refund returned.
+    """
+    context = context or SeatContext()
+    ride_doc = refs.ride.get(transaction=transaction)
+    if not ride_doc.exists:
+        return {"error": "Ride not found"}, 404
+
+    if refs.member.get(transaction=transaction).exists:
+        return {"message": "User is already a passenger"}, 200
+
+    hold_doc = refs.hold.get(transaction=transaction)
+
+    ride_data = ride_doc.to_dict()
+    if ride_data.get("status") == DELETING_STATUS:
+        refund = None
+        if hold_doc.exists:
+            refund = release_hold_of_deleting_ride(
+                transaction, refs, ride_data, hold_doc, context
+            )
+        return {"error": "Ride is being deleted", "refund": refund}, 400
+
+    if not is_future(ride_data, utc_now()):
+        return {"error": "Ride has already departed"}, 400
+
+    max_passengers = ride_data.get("maxPassengers", 0)
+    count = passenger_count(ride_data)
+    held = held_seats(ride_data)
+    if hold_doc.exists:
+        held = max(held - 1, 0)
+
+    if count + held >= max_passengers:
+        return {"error": "Ride is full"}, 400
+
+    ride_update = {
+        "passengerCount": count + 1,
+        "currentPassengers": firestore.ArrayUnion([member_data["userId"]])
+    }
+    if count + 1 == max_passengers:
+        ride_update["status"] = "closed"
+
+    if hold_doc.exists:
+        transaction.delete(refs.hold)
+        ride_update["heldSeats"] = held
+        payment_intent_id = hold_doc.to_dict().get("paymentIntentId")
+        if payment_intent_id:
+            member_data = dict(member_data, paymentIntentId=payment_intent_id)
+
+    transaction.set(refs.member, member_data)
+    transaction.update(refs.ride, ride_update)
+    transaction.delete(refs.entry)
+
+    event_id = None
+    if context.outbox_manager is not None:
+        event_id = context.outbox_manager.record(
+            transaction, RIDE_BOOKED, refs.ride.id,
+            ride_event_data(ride_data, member_data["userId"], context.user_name)
+        )
+
+    return {
+        "message": "User successfully booked this ride.",
+        "eventId": event_id
+    }, 200
+
+@firestore.transactional
+def release_seat(transaction, refs, user_id, context=None):
+    """
+    Atomically remove a passenger membership and free the seat, holding it for
+    the first rider on the waitlist when there is one. With
+    context.outbox_manager, a cancellation event is recorded along with it and
+    its id returned as eventId.
+    """
+    context = context or SeatContext()
+    ride_doc = refs.ride.get(transaction=transaction)
+    if not ride_doc.exists:
+        return {"error": "Ride not found"}, 404
+
+    ride_data = ride_doc.to_dict()
+    if user_id == ride_data.get("ownerID"):
+        return {
+            "error": "User cannot remove themselves from their own ride, must delete it."
+        }, 400
+
+    if not refs.member.get(transaction=transaction).exists:
+        return {
+            "error": "User is not a passenger of the ride."
+        }, 400
+
+    waiting = waiting_riders(transaction, refs.ride.id, 1, context)
+    promote_waiting_riders(transaction, refs.ride.id, ride_data, waiting, context)
+
+    ride_update = {
+        "passengerCount": max(passenger_count(ride_data) - 1, 0),
+        "currentPassengers": firestore.ArrayRemove([user_id])
+    }
+    if waiting:
+        ride_update["heldSeats"] = held_seats(ride_data) + 1
+    elif ride_data.get("status") == "closed":
+        ride_update["status"] = "open"
+
+    transaction.delete(refs.member)
+    transaction.update(refs.ride, ride_update)
+
+    event_id = None
+    if context.outbox_manager is not None:
+        event_id = context.outbox_manager.record(
+            transaction, RIDE_CANCELLED, refs.ride.id,
+            ride_event_data(ride_data, user_id, context.user_name)
+        )
+
+    return {
+        "message": "User successfully removed from the ride.",
+        "promotedUserId": waiting[0].id if waiting else None,
+        "eventId": event_id
+    }, 200
+
+@firestore.transactional
+def join_waitlist(transaction, refs, entry_data):
+    """
+    Atomically add a rider to the waitlist of a full ride.
+    """
+    ride_doc = refs.ride.get(transaction=transaction)
+    if not ride_doc.exists:
+        return {"error": "Ride not found"}, 404
+
+    if refs.member.get(transaction=transaction).exists:
+        return {"error": "User is already a passenger of this ride."}, 400
+
+    if refs.hold.get(transaction=transaction).exists:
+        return {"error": "A seat is already held for the user, book it instead."}, 400
+
+    if refs.entry.get(transaction=transaction).exists:
+        return {"message": "User is already on the waitlist."}, 200
+
+    ride_data = ride_doc.to_dict()
+    if entry_data["userId"] == ride_data.get("ownerID"):
+        return {"error": "User cannot join the waitlist of their own ride."}, 400
+
+    if ride_data.get("status") == DELETING_STATUS:
+        return {"error": "Ride is being deleted"}, 400
+
+    if not is_future(ride_data, utc_now()):
+        return {"error": "Ride has already departed"}, 400
+
+    if passenger_count(ride_data) + held_seats(ride_data) < ride_data.get("maxPassengers", 0):
+        return {"error": "Ride still has free seats, book it instead."}, 400
+
+    transaction.set(refs.entry, entry_data)
+
+    return {
+        "message": "User added to the waitlist."
+    }, 201
+
+@firestore.transactional
+def start_deletion(transaction, ride_doc_ref, user_id, job_id):
+    """
+    Atomically mark a ride as being deleted by its owner and record the job
+    deleting it. A ride already being deleted keeps its first job, which the
+    caller enqueues again so a failed deletion resumes.
+    """
+    ride_doc = ride_doc_ref.get(transaction=transaction)
+    if not ride_doc.exists:
+        return {"error": "Ride not found"}, 404
+
+    ride_data = ride_doc.to_dict()
+    if user_id != ride_data.get("ownerID"):
+        return {
+            "error": "Only the owner of this ride can delete it."
+        }, 400
+
+    if ride_data.get("status") != DELETING_STATUS:
+        ride_data["deleteJobId"] = job_id
+        transaction.update(ride_doc_ref, {
+            "status": DELETING_STATUS,
+            "deleteJobId": job_id,
+            "deleteRequestedAt": firestore.SERVER_TIMESTAMP
+        })
+
+    return {
+        "message": "Ride is being deleted.",
+        "jobId": ride_data["deleteJobId"],
+        "ride": ride_data
+    }, 202
 
 class RideManager:
     """
     RideManager is responsible for handling ride-related operation for a user.
     """
 
-    def __init__(self, db, user_id, user_name):
+    def __init__(self, db, user_id, user_name, document_loader=None):
         """
-        Initialize the RideManager.
+        Initialize the RideManager. Single ride reads go through document_loader
+        when one is given.
         """
         self.db = db
         self.user_id = user_id
-        self.user_name = user_name
+        self.document_loader = document_loader
         self.ride_ref = db.collection("rides")
-
-    def is_duplicate_ride(self, rides_posted, ride_details):
+        self.membership_manager = MembershipManager(db)
+        self.seat_hold_manager = SeatHoldManager(db)
+        self.context = SeatContext(
+            user_name=user_name,
+            outbox_manager=OutboxManager(db),
+            refund_manager=RefundManager(db),
+            waitlist_manager=WaitlistManager(db)
+        )
+
+    def is_duplicate_ride(self, ride_data):
         """
         Check if a duplicate ride post already exists for the user.
         """
-        for ride_id in rides_posted:
-            ride_doc = self.ride_ref.document(ride_id).get()
-            if ride_doc.exists:
-                existing_ride = ride_doc.to_dict()
-                if (
-                    existing_ride["from"] == ride_details["from"]
-                    and existing_ride["to"] == ride_details["to"]
-                    and existing_ride["date"] == ride_details["date"]
-                    and existing_ride["departureTime"] == ride_details["departureTime"]
-                ):
-                    return True
-
-        return False
+        duplicate_query = (
+            self.ride_ref
+            .where("fingerprint", "==", ride_data["fingerprint"])
+            .limit(1)
+            .select([])
+            .stream()
+        )
+        return any(duplicate_query)
 
     def get_ride(self, ride_id):
         """
         Fetch a ride.
         """
         try:
-            ride_doc = self.ride_ref.document(ride_id).get()
+            ride_doc = get_document(self.ride_ref.document(ride_id), self.document_loader)
 
             if not ride_doc.exists:
                 return {"error": "Ride not found"}, 404
@@ -48,6 +490,7 @@ class RideManager:
             ride_data = ride_doc.to_dict()
             return {
                 "ride": ride_data,
+                "version": snapshot_version([ride_doc], ride_id),
             }, 200
 
         except FirebaseError as e:
@@ -56,17 +499,20 @@ class RideManager:
         except Exception as e:
             return handle_generic_error(e, "An unexpected error occurred")
 
-    def get_rides_by_ids(self, ride_ids):
+    def get_rides_by_ids(self, ride_ids, field_paths=None):
         """
-        Fetch multiple rides based on a list of ride IDs.
+        Fetch multiple rides based on a list of ride IDs, optionally only the
+        given fields.
         """
         try:
             # Convert ride IDs to document references
             ride_refs = [self.ride_ref.document(ride_id) for ride_id in ride_ids]
-            ride_docs = self.db.get_all(ride_refs)
+            ride_docs = self.db.get_all(ride_refs, field_paths=field_paths)
 
             rides = []
             for ride_doc in ride_docs:
+                if not ride_doc.exists:
+                    continue
                 ride_data = ride_doc.to_dict()
                 ride_data["id"] = ride_doc.id
                 rides.append(ride_data)
@@ -81,7 +527,59 @@ class RideManager:
         except Exception as e:
             return handle_generic_error(e, "An unexpected error occurred")
 
-    def post_ride(self, rides_posted, data):
+    def build_ride_data(self, data, date=None):
+        """
+        Build a ride document from a post-ride payload, optionally for another date.
+        """
+        date = date or data.get('date')
+        time_zone = data.get('time_zone') or DEFAULT_TIME_ZONE
+        return {
+            "ownerID": self.user_id,
+            "ownerName": self.context.user_name,
+            "from": data.get('from'),
+            "to": data.get('to'),
+            "date": date,
+            "departureTime": data.get('departure_time'),
+            "timeZone": time_zone,
+            "departureAt": departure_at(date, data.get('departure_time'), time_zone),
+            "fingerprint": ride_fingerprint(
+                self.user_id, data.get('from'), data.get('to'), date, data.get('departure_time')
+            ),
+            "maxPassengers": data.get('max_passengers'),
+            "cost": data.get('cost'),
+            "currentPassengers": [],
+            "passengerCount": 0,
+            "car": data.get('car_select'),
+            "licensePlate": data.get('license_plate'),
+            "status": "open",
+        }
+
+    def get_posted_ride_fingerprints(self, start_date, end_date):
+        """
+        Fetch the fingerprints of the user's rides in a date range.
+        """
+        rides_query = (
+            self.ride_ref
+            .where("ownerID", "==", self.user_id)
+            .where("date", ">=", start_date)
+            .where("date", "<=", end_date)
+            .select(["from", "to", "date", "departureTime"])
+            .stream()
+        )
+
+        fingerprints = set()
+        for ride_doc in rides_query:
+            ride_data = ride_doc.to_dict()
+            fingerprints.add(ride_fingerprint(
+                self.user_id,
+                ride_data.get("from"),
+                ride_data.get("to"),
+                ride_data.get("date"),
+                ride_data.get("departureTime")
+            ))
+        return fingerprints
+
+    def post_ride(self, data):
         """
         Post a new ride.
         """
@@ -89,23 +587,13 @@ class RideManager:
             ride_ref = self.ride_ref.document()
             ride_id = ride_ref.id
 
-            if self.is_duplicate_ride(rides_posted, data):
-                return {"error": "Duplicate ride post detected"}, 400
+            try:
+                ride_data = self.build_ride_data(data)
+            except ValueError as e:
+                return {"error": "Invalid ride date, time or time zone.", "details": str(e)}, 400
 
-            ride_data = {
-                "ownerID": self.user_id,
-                "ownerName": self.user_name,
-                "from": data.get('from'),
-                "to": data.get('to'),
-                "date": data.get('date'),
-                "departureTime": data.get('departure_time'),
-                "maxPassengers": data.get('max_passengers'),
-                "cost": data.get('cost'),
-                "currentPassengers": [],
-                "car": data.get('car_select'),
-                "licensePlate": data.get('license_plate'),
-                "status": "open",
-            }
+            if self.is_duplicate_ride(ride_data):
+                return {"error": "Duplicate ride post detected"}, 400
 
             ride_ref.set(ride_data)
 
@@ -152,112 +640,203 @@ class RideManager:
         except Exception as e:
             return handle_generic_error(e, "An unexpected error occurred")
 
-    def add_passenger(self, ride_id):
+    def mark_deleting(self, ride_id, job_id):
         """
-        Add a user to the ride as a passenger.
+        Mark a ride as being deleted, leaving the cascade to the job job_id.
+        Returns the id of the job deleting the ride and its data.
         """
         try:
-            ride_doc = self.ride_ref.document(ride_id).get()
+            transaction = self.db.transaction()
+            return start_deletion(
+                transaction, self.ride_ref.document(ride_id), self.user_id, job_id
+            )
 
-            if not ride_doc.exists:
-                return {"error": "Ride not found"}, 404
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to delete ride. Please try again.")
 
-            ride_data = ride_doc.to_dict()
-            current_passengers = ride_data.get("currentPassengers", [])
-            max_passengers = ride_data.get("maxPassengers", 0)
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
 
-            if self.user_id in current_passengers:
-                return {"message": "User is already a passenger"}, 200
+    def add_passenger(self, ride_id):
+        """
+        Add a user to the ride as a passenger.
+        """
+        try:
+            member_data = self.membership_manager.member_data(
+                ride_id, self.user_id, PASSENGER_ROLE
+            )
 
-            if len(current_passengers) >= max_passengers:
-                return {"error": "Ride is full"}, 400
+            transaction = self.db.transaction()
+            refs = SeatRefs.of_rider(self.db, ride_id, self.user_id)
+            return book_seat(transaction, refs, member_data, self.context)
 
-            current_passengers.append(self.user_id)
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to add user to this ride, please try again.")
 
-            if len(current_passengers) == max_passengers:
-                self.ride_ref.document(ride_id).update({"status": "closed"})
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
 
-            self.ride_ref.document(ride_id).update({"currentPassengers": current_passengers})
+    def hold_seat(self, ride_id, ttl_seconds=DEFAULT_HOLD_TTL_SECONDS):
+        """
+        Hold a seat of a ride for the user during checkout.
+        """
+        try:
+            hold_data = self.seat_hold_manager.hold_data(
+                ride_id, self.user_id, utc_now() + timedelta(seconds=ttl_seconds)
+            )
 
-            return {
-                "message": "User successfully booked this ride.",
-            }, 200
+            transaction = self.db.transaction()
+            refs = SeatRefs.of_rider(self.db, ride_id, self.user_id)
+            return hold_seat(transaction, refs, hold_data)
 
         except FirebaseError as e:
-            return handle_firestore_error(e, "Failed to add user to this ride, please try again.")
+            return handle_firestore_error(e, "Failed to hold a seat, please try again.")
 
         except Exception as e:
             return handle_generic_error(e, "An unexpected error occurred")
 
-    def remove_passenger(self, ride_id):
+    def release_hold(self, ride_id, hold_ttl_seconds=DEFAULT_HOLD_TTL_SECONDS):
         """
-        Remove a passenger from a ride.
+        Release the user's seat hold on a ride, passing the seat on to the
+        waitlist for hold_ttl_seconds.
         """
         try:
-            ride_doc = self.ride_ref.document(ride_id).get()
-
-            if not ride_doc.exists:
-                return {"error": "Ride not found"}, 404
+            transaction = self.db.transaction()
+            released = release_holds(
+                transaction,
+                self.ride_ref.document(ride_id),
+                [self.seat_hold_manager.hold_ref(ride_id, self.user_id)],
+                context=holding_context(self.context, hold_ttl_seconds)
+            )
 
-            ride_data = ride_doc.to_dict()
-            current_passengers = ride_data.get("currentPassengers", [])
-            ride_owner_id = ride_data.get("ownerID")
+            return {
+                "releasedHolds": released
+            }, 200
 
-            if self.user_id == ride_owner_id:
-                return {
-                    "error": "User cannot remove themselves from their own ride, must delete it."
-                }, 400
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to release seat hold.")
 
-            if self.user_id not in current_passengers:
-                return {
-                    "error": "User is not a passenger of the ride."
-                }, 400
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
 
-            current_passengers.remove(self.user_id)
-            self.ride_ref.document(ride_id).update({"currentPassengers": current_passengers})
+    def release_expired_holds(self, now=None, batch_size=MAX_BATCH_SIZE,
+                              hold_ttl_seconds=DEFAULT_HOLD_TTL_SECONDS):
+        """
+        Release expired seat holds, batch_size at a time, with one transaction
+        per ride. Freed seats are held for waiting riders for hold_ttl_seconds.
+        """
+        now = now or utc_now()
+        context = holding_context(self.context, hold_ttl_seconds, now)
 
-            if ride_data.get("status") == "closed":
-                self.ride_ref.document(ride_id).update({"status": "open"})
+        try:
+            released = 0
+            while True:
+                holds_by_ride = {}
+                expired_holds = self.seat_hold_manager.stream_expired_holds(now, batch_size)
+                for hold_doc in expired_holds:
+                    holds_by_ride.setdefault(hold_doc.get("rideId"), []).append(
+                        hold_doc.reference
+                    )
+
+                batch_released = 0
+                for ride_id, hold_refs in holds_by_ride.items():
+                    transaction = self.db.transaction()
+                    batch_released += release_holds(
+                        transaction, self.ride_ref.document(ride_id), hold_refs, now, context
+                    )
+
+                released += batch_released
+                found = sum(len(hold_refs) for hold_refs in holds_by_ride.values())
+                if found < batch_size or batch_released == 0:
+                    break
 
             return {
-                "message": "User successfully removed from the ride.",
+                "releasedHolds": released
             }, 200
 
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to release expired seat holds")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
+
+    def remove_passenger(self, ride_id, hold_ttl_seconds=DEFAULT_HOLD_TTL_SECONDS):
+        """
+        Remove a passenger from a ride. The freed seat is held for the first
+        rider on the waitlist for hold_ttl_seconds.
+        """
+        try:
+            transaction = self.db.transaction()
+            return release_seat(
+                transaction, SeatRefs.of_rider(self.db, ride_id, self.user_id), self.user_id,
+                holding_context(self.context, hold_ttl_seconds)
+            )
+
         except FirebaseError as e:
             return handle_firestore_error(e, "Failed to remove user from this ride.")
 
         except Exception as e:
             return handle_generic_error(e, "An unexpected error occurred")
 
-    def get_avaiable_rides(self, excluded_rides):
+    def join_waitlist(self, ride_id):
         """
-        Fetch all available rides with status 'open', excluding rides the user has joined or posted.
+        Add the user to the waitlist of a full ride.
         """
-        pacific_zone = pytz.timezone("America/Los_Angeles")
         try:
-            available_rides_query = (
-                self.ride_ref
-                .where("status", "==", "open")
-                .stream()
+            transaction = self.db.transaction()
+            return join_waitlist(
+                transaction,
+                SeatRefs.of_rider(self.db, ride_id, self.user_id),
+                self.context.waitlist_manager.entry_data(self.user_id, self.context.user_name)
             )
 
-            available_rides = []
-            for ride_doc in available_rides_query:
-                ride_data = ride_doc.to_dict()
-                ride_id = ride_doc.id
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to join the waitlist, please try again.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
 
-                ride_date = ride_data["date"]
-                ride_time = ride_data["departureTime"]
-                ride_datetime = datetime.strptime(f"{ride_date} {ride_time}", "%Y-%m-%d %I:%M %p")
-                ride_datetime = pacific_zone.localize(ride_datetime)
+    def leave_waitlist(self, ride_id):
+        """
+        Remove the user from the waitlist of a ride.
+        """
+        return self.context.waitlist_manager.leave(ride_id, self.user_id)
 
-                if ride_datetime >= datetime.now(pacific_zone):
-                    if ride_id not in excluded_rides:
-                        ride_data["id"] = ride_id
-                        available_rides.append(ride_data)
+    def stream_available_rides(self, excluded_rides, now=None):
+        """
+        Yield available rides with status 'open' one at a time, excluding rides the
+        user has joined or posted. Only AVAILABLE_RIDE_FIELDS are read and returned.
+        """
+        now = now or request_now()
+        excluded_rides = set(excluded_rides)
 
+        available_rides_query = (
+            self.ride_ref
+            .where("status", "==", "open")
+            .select(AVAILABLE_RIDE_FIELDS + DEPARTURE_FIELDS)
+            .stream()
+        )
+
+        for ride_doc in available_rides_query:
+            ride_id = ride_doc.id
+            if ride_id in excluded_rides:
+                continue
+
+            ride_data = ride_doc.to_dict()
+
+            if is_future(ride_data, now):
+                for field in DEPARTURE_FIELDS:
+                    ride_data.pop(field, None)
+                ride_data["id"] = ride_id
+                yield ride_data
+
+    def get_avaiable_rides(self, excluded_rides):
+        """
+        Fetch all available rides with status 'open', excluding rides the user has joined or posted.
+        """
+        try:
             return {
-                "rides": available_rides
+                "rides": list(self.stream_available_rides(excluded_rides))
             }, 200
 
         except FirebaseError as e:
@@ -266,38 +845,51 @@ class RideManager:
         except Exception as e:
             return handle_generic_error(e, "An unexpected error occurred")
 
-    def delete_past_rides(self):
+    def get_departures(self, until):
+        """
+        Stream (ride id, departure timestamp) for every ride departing by until,
+        leaving out rides being deleted, which their delete job removes.
+        """
+        rides_query = (
+            self.ride_ref
+            .where("departureAt", "<=", until)
+            .select(["departureAt", "status"])
+            .stream()
+        )
+
+        for ride_doc in rides_query:
+            if ride_doc.to_dict().get("status") == DELETING_STATUS:
+                continue
+            yield ride_doc.id, ride_doc.get("departureAt").timestamp()
+
+    def delete_departed_rides(self, ride_ids, now=None):
         """
-        Deletes all rides that have already passed based on the date and time.
+        Deletes the given rides that have already departed, skipping rides that
+        are gone or still upcoming. Rides being deleted are left to their delete
+        job, which refunds their passengers before removing them.
         """
-        pacific_zone = pytz.timezone("America/Los_Angeles")
-        now_pacific = datetime.now(pacific_zone)
-        today_date = now_pacific.strftime("%Y-%m-%d")
+        now = now or utc_now()
 
         try:
-            deleted_rides = []
-            batch = self.db.batch()
-
-            rides_query = (
-                self.ride_ref
-                .where("date", "<=", today_date)
-                .stream()
-            )
+            rides = []
+            ride_refs = [self.ride_ref.document(ride_id) for ride_id in ride_ids]
+            for ride_doc in self.db.get_all(ride_refs):
+                if not ride_doc.exists:
+                    continue
 
-            for ride_doc in rides_query:
                 ride_data = ride_doc.to_dict()
-                ride_id = ride_doc.id
-                ride_data["id"] = ride_id
-
-                ride_date = ride_data.get("date")
-                ride_time = ride_data.get("departureTime")
+                ride_data["id"] = ride_doc.id
 
-                ride_datetime = datetime.strptime(f"{ride_date} {ride_time}", "%Y-%m-%d %I:%M %p")
-                ride_datetime = pacific_zone.localize(ride_datetime)
+                if ride_data.get("status") != DELETING_STATUS:
+                    rides.append((ride_doc.reference, ride_data))
 
-                if ride_datetime < datetime.now(pacific_zone):
+            deleted_rides = []
+            batch = BatchWriter(self.db)
+            upcoming = future_mask([ride_data for _, ride_data in rides], now)
+            for (ride_doc_ref, ride_data), is_upcoming in zip(rides, upcoming):
+                if not is_upcoming:
                     deleted_rides.append(ride_data)
-                    batch.delete(self.ride_ref.document(ride_id))
+                    batch.delete(ride_doc_ref)
 
             batch.commit()
 
@@ -306,7 +898,21 @@ class RideManager:
             }, 200
 
         except FirebaseError as e:
-            return handle_firestore_error(e, "Failed to delete past rides")
+            return handle_firestore_error(e, "Failed to delete departed rides")
 
         except Exception as e:
             return handle_generic_error(e, "An unexpected error occurred")
+
+    def delete_past_rides(self):
+        """
+        Deletes all rides that have already departed.
+        """
+        now = utc_now()
+
+        try:
+            ride_ids = [ride_id for ride_id, _ in self.get_departures(now)]
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to delete past rides")
+
+        return self.delete_departed_rides(ride_ids, now)
@@ -0,0 +1,75 @@
+from firebase_admin.exceptions import FirebaseError
+from google.cloud import firestore
+from utils import handle_firestore_error, handle_generic_error
+
+DEFAULT_HOLD_TTL_SECONDS = 600
+
+class SeatHoldManager:
+    """
+    SeatHoldManager handles the seats held for riders while they check out.
+
+    A hold is a document in the top-level "seat_holds" collection with the id
+    "{rideId}_{userId}" and an "expiresAt" time. The ride's "heldSeats" counter
+    counts its holds, so checking capacity stays a single ride read. Holds are
+    taken and confirmed inside the ride's seat transactions, and holds that
+    expire before the rider books are released in batches by a sweeper.
+    """
+
+    def __init__(self, db):
+        """
+        Initialize the SeatHoldManager.
+        """
+        self.db = db
+        self.holds_ref = db.collection("seat_holds")
+
+    @staticmethod
+    def hold_id(ride_id, user_id):
+        """
+        Build the deterministic hold document id.
+        """
+        return f"{ride_id}_{user_id}"
+
+    def hold_ref(self, ride_id, user_id):
+        """
+        Return the hold document reference for a ride and user.
+        """
+        return self.holds_ref.document(self.hold_id(ride_id, user_id))
+
+    @staticmethod
+    def hold_data(ride_id, user_id, expires_at):
+        """
+        Build the hold document body.
+        """
+        return {
+            "rideId": ride_id,
+            "userId": user_id,
+            "expiresAt": expires_at,
+            "createdAt": firestore.SERVER_TIMESTAMP
+        }
+
+    def record_payment_intent(self, ride_id, user_id, payment_intent_id):
+        """
+        Store the PaymentIntent created for a hold, copied to the membership at booking.
+        """
+        try:
+            self.hold_ref(ride_id, user_id).update({"paymentIntentId": payment_intent_id})
+
+            return {"message": "Payment intent recorded."}, 200
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to record the payment intent.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
+
+    def stream_expired_holds(self, now, limit):
+        """
+        Stream up to limit holds that expired by now, with their ride id.
+        """
+        return (
+            self.holds_ref
+            .where("expiresAt", "<=", now)
+            .limit(limit)
+            .select(["rideId"])
+            .stream()
+        )
@@ -0,0 +1,119 @@
+from firebase_admin.exceptions import FirebaseError
+from google.cloud import firestore
+from utils import MAX_BATCH_SIZE, handle_firestore_error, handle_generic_error
+from services.notification_manager import NotificationManager
+from services.seat_hold_manager import SeatHoldManager
+
+class WaitlistManager:
+    """
+    WaitlistManager handles the first-come, first-served waitlists of full rides.
+
+    Riders wait in the "waitlist" subcollection of a ride, one document per user
+    ordered by "joinedAt". When a seat frees up, the transaction freeing it
+    promotes the head of the waitlist: it removes the entry, holds the seat for
+    the rider and queues a notification asking them to book.
+    """
+
+    def __init__(self, db):
+        """
+        Initialize the WaitlistManager.
+        """
+        self.db = db
+        self.rides_ref = db.collection("rides")
+        self.seat_hold_manager = SeatHoldManager(db)
+        self.notification_manager = NotificationManager(db)
+
+    def waitlist_ref(self, ride_id):
+        """
+        Return the waitlist collection of a ride.
+        """
+        return self.rides_ref.document(ride_id).collection("waitlist")
+
+    def entry_ref(self, ride_id, user_id):
+        """
+        Return the waitlist entry of a user.
+        """
+        return self.waitlist_ref(ride_id).document(user_id)
+
+    @staticmethod
+    def entry_data(user_id, user_name):
+        """
+        Build the waitlist entry body.
+        """
+        return {
+            "userId": user_id,
+            "userName": user_name,
+            "joinedAt": firestore.SERVER_TIMESTAMP
+        }
+
+    def head_entries(self, ride_id, count, transaction=None):
+        """
+        Fetch the first count riders waiting for a ride.
+        """
+        return list(
+            self.waitlist_ref(ride_id)
+            .order_by("joinedAt")
+            .limit(count)
+            .stream(transaction=transaction)
+        )
+
+    def promote(self, transaction, ride_id, ride_data, entry_doc, hold_expires_at):
+        """
+        Move a waiting rider off the waitlist onto a held seat and notify them.
+        Must run in the transaction that freed the seat.
+        """
+        user_id = entry_doc.id
+
+        transaction.delete(entry_doc.reference)
+        transaction.set(
+            self.seat_hold_manager.hold_ref(ride_id, user_id),
+            self.seat_hold_manager.hold_data(ride_id, user_id, hold_expires_at)
+        )
+
+        message = (
+            "A seat opened up on a ride you are waiting for.\n"
+            f"From: {ride_data.get('from')}\n"
+            f"To: {ride_data.get('to')}\n"
+            "It is held for you for a few minutes, book it before it is released."
+        )
+        self.notification_manager.queue_notification(transaction, user_id, ride_id, message)
+
+    def leave(self, ride_id, user_id):
+        """
+        Remove a user from the waitlist of a ride.
+        """
+        try:
+            self.entry_ref(ride_id, user_id).delete()
+
+            return {"message": "Removed from the waitlist."}, 200
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to leave the waitlist.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
+
+    def delete_waitlist(self, ride_id):
+        """
+        Delete every waitlist entry of a ride.
+        """
+        try:
+            while True:
+                entry_docs = list(
+                    self.waitlist_ref(ride_id).limit(MAX_BATCH_SIZE).select([]).stream()
+                )
+                if not entry_docs:
+                    break
+
+                batch = self.db.batch()
+                for entry_doc in entry_docs:
+                    batch.delete(entry_doc.reference)
+                batch.commit()
+
+            return {"message": "Waitlist deleted."}, 200
+
+        except FirebaseError as e:
+            return handle_firestore_error(e, "Failed to delete the waitlist.")
+
+        except Exception as e:
+            return handle_generic_error(e, "An unexpected error occurred")
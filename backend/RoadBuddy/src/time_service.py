@@ -0,0 +1,125 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from flask import g, has_request_context
+
+DEFAULT_TIME_ZONE = "America/Los_Angeles"
+
+# Zones loaded at startup so the first request in a region does not pay for it.
+PRELOADED_TIME_ZONES = (
+    DEFAULT_TIME_ZONE,
+    "America/Denver",
+    "America/Chicago",
+    "America/New_York",
+    "UTC",
+)
+
+RIDE_DATETIME_FORMAT = "%Y-%m-%d %I:%M %p"
+
+CHAT_TIME_FORMAT = "%Y-%m-%d %I:%M %p PT"
+NOTIFICATION_TIME_FORMAT = "%m-%d-%Y %I:%M %p PT"
+
+@lru_cache(maxsize=None)
+def get_zone(zone_name=DEFAULT_TIME_ZONE):
+    """
+    Return the cached ZoneInfo for a time zone name.
+    """
+    return ZoneInfo(zone_name)
+
+def validate_time_zone(zone_name):
+    """
+    Return the zone name if it is a known IANA time zone, else raise ValueError.
+    """
+    try:
+        get_zone(zone_name)
+    except (ZoneInfoNotFoundError, ValueError, TypeError) as e:
+        raise ValueError(f"Unknown time zone: {zone_name}") from e
+    return zone_name
+
+def preload_zones(zone_names=PRELOADED_TIME_ZONES):
+    """
+    Load and cache the given time zones.
+    """
+    for zone_name in zone_names:
+        get_zone(zone_name)
+
+def utc_now():
+    """
+    Current time in UTC.
+    """
+    return datetime.now(timezone.utc)
+
+def request_now():
+    """
+    Current time in UTC, captured once per request so every check in a request
+    compares against the same instant.
+    """
+    if not has_request_context():
+        return utc_now()
+
+    if "now" not in g:
+        g.now = utc_now()
+    return g.now
+
+@lru_cache(maxsize=8192)
+def departure_timestamp(date, departure_time, zone_name=DEFAULT_TIME_ZONE):
+    """
+    POSIX timestamp of a ride's local date and "%I:%M %p" departure time.
+    """
+    local_dt = datetime.strptime(f"{date} {departure_time}", RIDE_DATETIME_FORMAT)
+    return local_dt.replace(tzinfo=get_zone(zone_name)).timestamp()
+
+def departure_at(date, departure_time, zone_name=DEFAULT_TIME_ZONE):
+    """
+    UTC datetime of a ride's local date and departure time, stored on the ride at post time.
+    """
+    validate_time_zone(zone_name)
+    timestamp = departure_timestamp(date, departure_time, zone_name)
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+def ride_departure_timestamp(ride_data):
+    """
+    POSIX timestamp of a ride's departure, from departureAt when the ride has it.
+    """
+    departure = ride_data.get("departureAt")
+    if departure is not None:
+        return departure.timestamp()
+
+    return departure_timestamp(
+        ride_data["date"],
+        ride_data["departureTime"],
+        ride_data.get("timeZone") or DEFAULT_TIME_ZONE
+    )
+
+def is_future(ride_data, now):
+    """
+    Check whether a ride departs at or after now.
+    """
+    return ride_departure_timestamp(ride_data) >= now.timestamp()
+
+def future_mask(rides, now):
+    """
+    For each ride, whether it departs at or after now. The clock is read once
+    for the whole list and departure parsing is cached per (date, time, zone).
+    """
+    now_timestamp = now.timestamp()
+    return [ride_departure_timestamp(ride_data) >= now_timestamp for ride_data in rides]
+
+@lru_cache(maxsize=4096)
+def _format_epoch_minute(epoch_minute, time_format, zone_name):
+    """
+    Format a minute since the epoch in the given zone. Cached because every
+    displayed format has minute resolution and chat timestamps cluster.
+    """
+    utc_dt = datetime.fromtimestamp(epoch_minute * 60, tz=timezone.utc)
+    return utc_dt.astimezone(get_zone(zone_name)).strftime(time_format)
+
+def format_timestamp(timestamp, time_format=CHAT_TIME_FORMAT, zone_name=DEFAULT_TIME_ZONE):
+    """
+    Format a Firestore timestamp for display in the given time zone.
+
+    Naive datetimes are treated as UTC, which is how Firestore returns them.
+    """
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return _format_epoch_minute(int(timestamp.timestamp()) // 60, time_format, zone_name)
@@ -0,0 +1,168 @@
+import threading
+import time
+from metrics import metrics
+from worker_thread import WorkerThread
+from utils import snapshot_version
+
+class UnreadCount:
+    """
+    A user's cached unread notification count, updated by its listener.
+    """
+
+    def __init__(self, last_access):
+        """
+        Initialize the UnreadCount.
+        """
+        self.ready = threading.Event()
+        self.watch = None
+        self.exists = False
+        self.count = None
+        self.version = None
+        self.last_access = last_access
+
+    def on_snapshot(self, user_docs, _changes, _read_time):
+        """
+        Listener callback storing the latest count of the user document.
+        """
+        user_doc = user_docs[0] if user_docs else None
+        if user_doc is not None and user_doc.exists:
+            self.count = user_doc.to_dict().get("unread_notification_count")
+            self.version = snapshot_version([user_doc])
+            self.exists = True
+        else:
+            self.count = None
+            self.version = None
+            self.exists = False
+        self.ready.set()
+
+    def is_active(self):
+        """
+        Whether the listener is still receiving changes.
+        """
+        return self.watch is None or self.watch.is_active
+
+    def close(self):
+        """
+        Stop the listener.
+        """
+        if self.watch is not None:
+            try:
+                self.watch.unsubscribe()
+            except Exception as e:
+                print(f"Failed to close unread count listener: {e}")
+
+class UnreadCountCache:
+    """
+    In-process cache of unread notification counts, kept fresh by a Firestore
+    listener on each user's document.
+
+    The first request for a user opens the listener and waits for its initial
+    snapshot. Later requests are answered from memory until the user has made
+    no request for idle_seconds, when a background thread closes the listener.
+    Each listener holds a stream and a thread, so at most max_listeners are
+    kept per process. get() returns None for users beyond that, or when a
+    listener cannot be opened in time, and the caller reads the document.
+    """
+
+    def __init__(self, db, max_listeners=500, idle_seconds=300, load_timeout_seconds=5):
+        """
+        Initialize the UnreadCountCache.
+        """
+        self.users_ref = db.collection("users")
+        self.max_listeners = max_listeners
+        self.idle_seconds = idle_seconds
+        self.load_timeout = load_timeout_seconds
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.worker = WorkerThread("unread-count-cache", self.sweep, idle_seconds / 2)
+
+    def start(self):
+        """
+        Start the thread closing idle listeners.
+        """
+        self.worker.start()
+
+    def stop(self):
+        """
+        Stop the sweeping thread and close every listener.
+        """
+        self.worker.stop()
+
+        with self.lock:
+            entries, self.entries = list(self.entries.values()), {}
+        for entry in entries:
+            entry.close()
+
+    def get(self, user_id):
+        """
+        Return (exists, unread_count, version) of a user, or None if the count
+        is not cached and no listener can be opened for the user.
+        """
+        self.worker.start()
+
+        stale = None
+        opened = False
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and not entry.is_active():
+                stale = self.entries.pop(user_id)
+                entry = None
+
+            if entry is None:
+                if len(self.entries) >= self.max_listeners:
+                    metrics.increment("unread_listeners_full")
+                    return None
+                entry = self.entries[user_id] = UnreadCount(time.monotonic())
+                opened = True
+
+            entry.last_access = time.monotonic()
+
+        if stale is not None:
+            stale.close()
+
+        if opened:
+            metrics.increment("unread_cache_misses")
+            try:
+                entry.watch = self.users_ref.document(user_id).on_snapshot(entry.on_snapshot)
+            except Exception as e:
+                print(f"Failed to listen to unread count of {user_id}: {e}")
+                self.discard(user_id, entry)
+                return None
+        else:
+            metrics.increment("unread_cache_hits")
+
+        if not entry.ready.wait(self.load_timeout):
+            return None
+
+        return entry.exists, entry.count, entry.version
+
+    def discard(self, user_id, entry):
+        """
+        Drop and close a user's listener if it is still the cached one.
+        """
+        with self.lock:
+            if self.entries.get(user_id) is entry:
+                self.entries.pop(user_id)
+        entry.close()
+
+    def sweep(self):
+        """
+        Close the listeners of users idle for idle_seconds.
+        """
+        idle_since = time.monotonic() - self.idle_seconds
+        with self.lock:
+            idle = [
+                user_id for user_id, entry in self.entries.items()
+                if entry.last_access <= idle_since
+            ]
+            entries = [self.entries.pop(user_id) for user_id in idle]
+
+        for entry in entries:
+            entry.close()
+
+    def listeners(self):
+        """
+        Number of open listeners.
+        """
+        with self.lock:
+            return len(self.entries)
@@ -1,5 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import json
 
+# Firestore rejects batches and transactions with more than 500 writes.
+MAX_BATCH_SIZE = 500
+
 def handle_firestore_error(error, message="Firestore operation failed"):
     """
     Handles errors related to Firestore operations.
@@ -18,6 +23,109 @@ def handle_generic_error(error, message="An unexpected error occurred"):
         "details": str(error)
     }, 500
 
+def check_response(response, step):
+    """
+    Return the message of a successful manager call, or raise so the job running
+    it is retried.
+    """
+    response_message, response_status = response
+    if response_status >= 400:
+        raise RuntimeError(
+            f"{step}: {response_message.get('details') or response_message.get('error')}"
+        )
+    return response_message
+
+def delete_documents(db, refs, max_workers=1):
+    """
+    Delete documents in batches of MAX_BATCH_SIZE, committing up to max_workers
+    batches at a time.
+    """
+    refs = list(refs)
+    chunks = [refs[start:start + MAX_BATCH_SIZE] for start in range(0, len(refs), MAX_BATCH_SIZE)]
+
+    def commit(chunk):
+        batch = db.batch()
+        for ref in chunk:
+            batch.delete(ref)
+        batch.commit()
+
+    if max_workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            commit(chunk)
+        return
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        for _ in executor.map(commit, chunks):
+            pass
+
+class BatchWriter:
+    """
+    Write batch committed every MAX_BATCH_SIZE writes. Call commit() to write
+    the rest.
+    """
+
+    def __init__(self, db):
+        """
+        Initialize the BatchWriter.
+        """
+        self.db = db
+        self.batch = db.batch()
+        self.pending = 0
+
+    def create(self, ref, data):
+        """
+        Queue a create operation.
+        """
+        self.batch.create(ref, data)
+        self._count()
+
+    def set(self, ref, data, merge=False):
+        """
+        Queue a set operation.
+        """
+        self.batch.set(ref, data, merge=merge)
+        self._count()
+
+    def update(self, ref, data):
+        """
+        Queue an update operation.
+        """
+        self.batch.update(ref, data)
+        self._count()
+
+    def delete(self, ref):
+        """
+        Queue a delete operation.
+        """
+        self.batch.delete(ref)
+        self._count()
+
+    def _count(self):
+        self.pending += 1
+        if self.pending == MAX_BATCH_SIZE:
+            self.commit()
+
+    def commit(self):
+        """
+        Commit the queued operations.
+        """
+        if self.pending:
+            self.batch.commit()
+            self.batch = self.db.batch()
+            self.pending = 0
+
+def snapshot_version(snapshots, *extra):
+    """
+    Hash identifying the state of the given Firestore snapshots by their ids and
+    update times. Extra values, such as query parameters, are mixed in.
+    """
+    digest = hashlib.sha1()
+    for value in extra:
+        digest.update(f"{value!r}\x1f".encode())
+    for snapshot in snapshots:
+        digest.update(f"{snapshot.id}@{snapshot.update_time.isoformat()}\x1e".encode())
+    return digest.hexdigest()
+
 def print_json(data, indent=4, sort_keys=False):
     """
     Pretty prints a dictionary (JSON) to the console.
@@ -40,3 +148,20 @@ def check_required_fields(data, required_fields):
     if missing_fields:
         return {"error": f"Missing or empty required field(s): {', '.join(missing_fields)}"}, 400
     return None
+
+def iter_json_document(key, items, dumps=json.dumps, keyed=False):
+    """
+    Incrementally encode {key: [items]} as JSON text chunks, one item at a time.
+
+    When keyed is True the items are encoded as {key: {"1": item, "2": item, ...}}.
+    """
+    yield '{' + dumps(key) + (':{' if keyed else ':[')
+
+    for index, item in enumerate(items, start=1):
+        separator = ',' if index > 1 else ''
+        if keyed:
+            yield f'{separator}"{index}":{dumps(item)}'
+        else:
+            yield separator + dumps(item)
+
+    yield '}}' if keyed else ']}'
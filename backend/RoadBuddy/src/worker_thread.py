@@ -0,0 +1,82 @@
+import threading
+
+class WorkerThread:
+    """
+    Daemon thread calling run_once until stopped.
+
+    run_once runs when the thread starts, then again after interval_seconds,
+    or sooner when wake() is called. It can return the seconds to wait before
+    its next run instead. An interval of None waits for wake(). Errors are
+    printed and the thread carries on. start() does nothing when the thread
+    runs, so owners can call it on every use to start the thread lazily, which
+    also gives a process forked after import its own thread.
+    """
+
+    def __init__(self, name, run_once, interval_seconds=None):
+        """
+        Initialize the WorkerThread.
+        """
+        self.name = name
+        self.run_once = run_once
+        self.interval = interval_seconds
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """
+        Start the thread unless it runs.
+        """
+        if self.thread is not None:
+            return
+
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+            self.thread.start()
+
+    def wake(self):
+        """
+        Make the thread call run_once now.
+        """
+        self.wake_event.set()
+
+    def sleep(self, seconds):
+        """
+        Wait for seconds from run_once, returning early when the thread is stopped.
+        """
+        self.stop_event.wait(seconds)
+
+    def stopped(self):
+        """
+        Whether stop() was called.
+        """
+        return self.stop_event.is_set()
+
+    def stop(self):
+        """
+        Stop the thread after its current run and wait for it.
+        """
+        self.stop_event.set()
+        self.wake_event.set()
+        with self.lock:
+            if self.thread is not None:
+                self.thread.join()
+                self.thread = None
+
+    def run(self):
+        """
+        Call run_once until stopped.
+        """
+        while not self.stop_event.is_set():
+            try:
+                wait = self.run_once()
+            except Exception as e:
+                print(f"{self.name} failed: {e}")
+                wait = None
+
+            self.wake_event.wait(self.interval if wait is None else wait)
+            self.wake_event.clear()
@@ -0,0 +1,180 @@
+import threading
+from google.api_core.exceptions import NotFound
+from google.cloud import firestore
+from utils import MAX_BATCH_SIZE
+from worker_thread import WorkerThread
+from services.inbox_manager import InboxManager
+
+class LastMessageBuffer:
+    """
+    Write-behind buffer for the "last message" fields of ride chats.
+
+    Sending a message only records the latest text per chat in memory. A
+    background thread writes the buffered chats every flush interval, so a busy
+    chat document and its participants' inbox entries are written at most once
+    per interval however many messages are sent. stop() flushes whatever is
+    still buffered. The thread is started on the first record() if start() was
+    not called, so a process forked after import still gets one.
+    """
+
+    def __init__(self, db, flush_interval_ms=500):
+        """
+        Initialize the LastMessageBuffer.
+        """
+        self.db = db
+        self.ride_chat_ref = db.collection("ride_chats")
+        self.inbox_manager = InboxManager(db)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.worker = WorkerThread(
+            "last-message-buffer", self.flush, flush_interval_ms / 1000
+        )
+
+    def start(self):
+        """
+        Start the background flush thread.
+        """
+        self.worker.start()
+
+    def stop(self):
+        """
+        Stop the flush thread and write everything still buffered.
+        """
+        self.worker.stop()
+        self.flush()
+
+    def record(self, ride_id, last_message, sender_id, participants):
+        """
+        Buffer a chat's latest message, replacing any older buffered one, and
+        count it as unread for every participant except the sender.
+        last_message holds the chat's lastMessage, lastMessageTimestamp and
+        UsernameLastMessage fields.
+        """
+        self.worker.start()
+
+        with self.lock:
+            entry = self.pending.get(ride_id)
+            unread_counts = entry["unreadCounts"] if entry else {}
+            for user_id in participants:
+                if user_id != sender_id:
+                    unread_counts[user_id] = unread_counts.get(user_id, 0) + 1
+
+            self.pending[ride_id] = {
+                **last_message,
+                "count": entry["count"] + 1 if entry else 1,
+                "participants": frozenset(participants),
+                "unreadCounts": unread_counts,
+            }
+
+    def discard(self, ride_id):
+        """
+        Drop anything buffered for a chat that is being deleted.
+        """
+        with self.lock:
+            self.pending.pop(ride_id, None)
+
+    def requeue(self, ride_id, entry):
+        """
+        Put back an entry whose write failed, keeping any newer buffered message.
+        """
+        with self.lock:
+            newer = self.pending.get(ride_id)
+            if newer is None:
+                self.pending[ride_id] = entry
+                return
+
+            newer["count"] += entry["count"]
+            for user_id, count in entry["unreadCounts"].items():
+                newer["unreadCounts"][user_id] = newer["unreadCounts"].get(user_id, 0) + count
+
+    @staticmethod
+    def build_update(entry):
+        """
+        Build the chat document update for a buffered entry.
+        """
+        return {
+            "lastMessage": entry["lastMessage"],
+            "lastMessageTimestamp": entry["lastMessageTimestamp"],
+            "UsernameLastMessage": entry["UsernameLastMessage"],
+            "hotMessageCount": firestore.Increment(entry["count"]),
+        }
+
+    def write_entry(self, batch, ride_id, entry):
+        """
+        Queue the chat update and the inbox fan-out of a buffered entry.
+        """
+        batch.update(self.ride_chat_ref.document(ride_id), self.build_update(entry))
+        self.inbox_manager.fan_out_last_message(
+            batch, ride_id, entry["participants"], entry, entry["unreadCounts"]
+        )
+
+    def flush(self):
+        """
+        Write every buffered chat in batches of at most MAX_BATCH_SIZE writes.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, {}
+
+        chunk, writes = [], 0
+        for ride_id, entry in pending.items():
+            entry_writes = 1 + len(entry["participants"])
+            if chunk and writes + entry_writes > MAX_BATCH_SIZE:
+                self.flush_chunk(chunk)
+                chunk, writes = [], 0
+            chunk.append((ride_id, entry))
+            writes += entry_writes
+
+        if chunk:
+            self.flush_chunk(chunk)
+
+    def flush_chunk(self, chunk):
+        """
+        Write a chunk of buffered chats in one batch.
+        """
+        try:
+            batch = self.db.batch()
+            for ride_id, entry in chunk:
+                self.write_entry(batch, ride_id, entry)
+            batch.commit()
+        except Exception:
+            self.flush_individually(chunk)
+
+    def flush_individually(self, chunk):
+        """
+        Write chats one at a time after a failed batch. Chats or inbox entries
+        deleted in the meantime are written around, other failures are retried
+        on the next flush.
+        """
+        for ride_id, entry in chunk:
+            try:
+                batch = self.db.batch()
+                self.write_entry(batch, ride_id, entry)
+                batch.commit()
+            except NotFound:
+                self.write_entry_separately(ride_id, entry)
+            except Exception as e:
+                print(f"Failed to flush last message for {ride_id}: {e}")
+                self.requeue(ride_id, entry)
+
+    def write_entry_separately(self, ride_id, entry):
+        """
+        Write a chat's update and then each inbox entry on its own. A deleted
+        chat is dropped along with its entry, and removed inbox entries, such
+        as ones of passengers who cancelled, are skipped.
+        """
+        try:
+            self.ride_chat_ref.document(ride_id).update(self.build_update(entry))
+        except NotFound:
+            return
+        except Exception as e:
+            print(f"Failed to flush last message for {ride_id}: {e}")
+            self.requeue(ride_id, entry)
+            return
+
+        for user_id in entry["participants"]:
+            try:
+                self.inbox_manager.update_last_message(
+                    user_id, ride_id, entry, entry["unreadCounts"].get(user_id, 0)
+                )
+            except Exception as e:
+                print(f"Failed to update inbox of {user_id} for {ride_id}: {e}")
@@ -0,0 +1,12 @@
+"""
+WSGI entry point for production servers.
+
+Importing this module builds the app without starting any threads or opening
+Firestore connections, so it can be preloaded in a master process and forked.
+Each worker then calls app.warm_up(); see gunicorn.conf.py.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+"""
+from app import app as application
+
+__all__ = ["application"]
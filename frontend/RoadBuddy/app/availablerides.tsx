@@ -19,7 +19,12 @@ import { useSafeAreaInsets } from "react-native-safe-area-context";
 import { Ride } from "./ride/ride";
 import ModalSelector from "react-native-modal-selector";
 
-type SortFunction = (a: Ride, b: Ride) => number;
+// The list endpoint only sends the fields rendered here.
+type RideListItem = Omit<Ride, "currentPassengers" | "car" | "licensePlate"> & {
+  passengerCount: number;
+};
+
+type SortFunction = (a: RideListItem, b: RideListItem) => number;
 interface SortConfig {
   [key: string]: SortFunction;
 }
@@ -28,7 +33,7 @@ export default function AvailableRides() {
   const insets = useSafeAreaInsets();
   const navigation = useNavigation();
 
-  const [rides, setRides] = useState<Ride[]>([]);
+  const [rides, setRides] = useState<RideListItem[]>([]);
   const [loading, setLoading] = useState<boolean>(true);
   // Used in table sort
   const [refreshRides, setRefresh] = useState<boolean>(false);
@@ -64,7 +69,7 @@ export default function AvailableRides() {
     fetchRides();
   };
 
-  const renderRideItem = ({ item }: { item: Ride }) => {
+  const renderRideItem = ({ item }: { item: RideListItem }) => {
     return (
       <TouchableOpacity
         style={styles.rideCard}
@@ -78,12 +83,10 @@ export default function AvailableRides() {
         <Text style={styles.rideText}>
           date: {item.date} | departure: {item.departureTime}
         </Text>
-        <Text style={styles.rideText}>Car: {item.car}</Text>
-        <Text style={styles.rideText}>License Plate: {item.licensePlate}</Text>
         <Text style={styles.rideText}>Driver: {item.ownerName}</Text>
         <View style={styles.row}>
           <Text style={styles.seatsText}>
-            {item.currentPassengers.length}/{item.maxPassengers} seats
+            {item.passengerCount}/{item.maxPassengers} seats
           </Text>
           <Text style={styles.costText}>${item.cost}</Text>
           <Ionicons name="chatbubble-outline" size={20} color="#333" />
@@ -92,7 +95,7 @@ export default function AvailableRides() {
     );
   };
 
-  function sortRides(criterion: keyof SortConfig | "default", rides: Ride[]) {
+  function sortRides(criterion: keyof SortConfig | "default", rides: RideListItem[]) {
     const sortConfig: SortConfig = {
       id: (a, b) => a.id.localeCompare(b.id) * (sortDescent ? -1 : 1),
       from: (a, b) => a.from.localeCompare(b.from) * (sortDescent ? -1 : 1),
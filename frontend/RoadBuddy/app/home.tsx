@@ -1,7 +1,7 @@
 
 import { View, Text, Image, TouchableOpacity, ScrollView, StyleSheet, Button, ActivityIndicator } from 'react-native';
 import { Dimensions } from 'react-native';
-import React, { useEffect, useState, useCallback } from "react";
+import React, { useEffect, useState, useCallback, useRef } from "react";
 import axios from "axios";
 import { router } from "expo-router";
 import { Ionicons } from "@expo/vector-icons";
@@ -16,6 +16,7 @@ export default function Home() {
   const [loading, setLoading] = useState<boolean>(true);
   const [error, setError] = useState<string>("");
   const [unreadCount, setUnreadCount] = useState<number>(0);
+  const unreadVersion = useRef<string | null>(null);
   const [isLoggedIn, setIsLoggedIn] = useState<boolean>(false);
   const [rides, setRides] = useState<Ride[]>([]);
 
@@ -36,7 +37,13 @@ export default function Home() {
   const fetchUnreadNotifications = async () => {
     if (!isLoggedIn) return;
     try {
-      const response = await axios.get(`${BASE_URL}/api/unread-notifications-count`, { withCredentials: true });
+      const response = await axios.get(`${BASE_URL}/api/unread-notifications-count`, {
+        params: unreadVersion.current ? { since: unreadVersion.current } : {},
+        withCredentials: true,
+      });
+      // 204 means the count has not changed since the last poll.
+      if (response.status === 204) return;
+      unreadVersion.current = response.data.version || null;
       setUnreadCount(response.data.unread_count || 0);
     } catch (error) {
       console.error("Error fetching unread notifications count:", error);
@@ -174,6 +174,20 @@ function RideDetailsScreen() {
     }
   };
 
+  const handleJoinWaitlist = async () => {
+    if (!id) return;
+    try {
+      const response = await axios.post(
+        `${BASE_URL}/api/join-waitlist`,
+        { rideId: id },
+        { withCredentials: true }
+      );
+      Alert.alert("Waitlist", response.data.message);
+    } catch (err: any) {
+      setError(err.response?.data?.error || "Failed to join the waitlist.");
+    }
+  };
+
   const handleBookRide = async () => {
     if (!ride || !id) return;
     setError("");
@@ -228,6 +242,17 @@ function RideDetailsScreen() {
         }
       }
     } catch (err: any) {
+      if (err.response?.data?.canJoinWaitlist) {
+        Alert.alert(
+          "Ride is full",
+          "Join the waitlist and we will notify you when a seat is held for you.",
+          [
+            { text: "Cancel", style: "cancel" },
+            { text: "Join waitlist", onPress: handleJoinWaitlist },
+          ]
+        );
+        return;
+      }
       // Instead of logging the raw error, extract a custom message.
       const serverError =
         err.response?.data?.error || err.response?.data?.message;
@@ -323,7 +323,7 @@ function RideDetailsScreen() {
             { rideId: id },
             { withCredentials: true }
           );
-          if (response.status === 200) {
+          if (response.status === 202) {
             Alert.alert("Success", response.data.message || "Ride deleted successfully");
             router.replace("/cominguprides");
           } else {
@@ -352,7 +352,7 @@ function RideDetailsScreen() {
         { rideId: id },
         { withCredentials: true }
       );
-      if (response.status === 200) {
+      if (response.status === 202) {
         Alert.alert("Success", response.data.message || "Ride deleted successfully");
         router.replace("/cominguprides");
       } else {
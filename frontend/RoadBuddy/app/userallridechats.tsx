@@ -24,6 +24,7 @@ interface RideChat {
   lastMessage: string;
   UsernameLastMessage: string;
   lastMessageTimestamp: string | null;
+  unreadCount?: number;
 }
 
 const ComingUpRides = () => {
@@ -32,6 +33,8 @@ const ComingUpRides = () => {
   const [loading, setLoading] = useState<boolean>(true);
   const [error, setError] = useState<string>("");
   const [refreshing, setRefreshing] = useState<boolean>(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState<boolean>(false);
 
   const fetchRides = async () => {
     try {
@@ -43,10 +46,13 @@ const ComingUpRides = () => {
       if (!response.data.ride_chats || response.data.ride_chats.length === 0) {
         setError("No rides available.");
         setRides([]);
+        setNextCursor(null);
         return;
       }
   
+      setError("");
       setRides(response.data.ride_chats);
+      setNextCursor(response.data.nextCursor ?? null);
     } catch (err: any) {
       console.error("Fetch error:", err);
       setError(err.response?.data?.error || "Failed to fetch ride chat rooms.");
@@ -56,6 +62,32 @@ const ComingUpRides = () => {
     }
   };
 
+  // The chat list comes in pages; load the next one when the list is scrolled to its end.
+  const fetchMoreRides = async () => {
+    if (!nextCursor || loadingMore || refreshing) {
+      return;
+    }
+
+    setLoadingMore(true);
+    try {
+      const response = await axios.get(`${BASE_URL}/api/get-all-user-ride-chats`, {
+        withCredentials: true,
+        params: { after: nextCursor },
+      });
+
+      const page: RideChat[] = response.data.ride_chats || [];
+      setRides((current) => [
+        ...current,
+        ...page.filter((chat) => !current.some((existing) => existing.id === chat.id)),
+      ]);
+      setNextCursor(response.data.nextCursor ?? null);
+    } catch (err: any) {
+      console.error("Fetch error:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchRides();
   }, []);
@@ -79,6 +111,9 @@ const ComingUpRides = () => {
         }
       >
         <Text style={styles.lastMessage}>{item.lastMessage || "No messages yet."}</Text>
+        {item.unreadCount ? (
+          <Text style={styles.unreadText}>{item.unreadCount} unread</Text>
+        ) : null}
         <Text>Date: {item.lastMessageTimestamp || "No one has send a message yet."}</Text>
         <Text style={styles.usernameLastMessage}>Name: {item.UsernameLastMessage || "No one has send a message yet."}</Text>
         <Text style={styles.rideHeader}>
@@ -116,6 +151,11 @@ const ComingUpRides = () => {
             contentContainerStyle={styles.listContent}
             refreshing={refreshing}
             onRefresh={handleRefresh}
+            onEndReached={fetchMoreRides}
+            onEndReachedThreshold={0.5}
+            ListFooterComponent={
+              loadingMore ? <ActivityIndicator size="small" color="#F8F3E9" /> : null
+            }
           />
         )}
       </View>
@@ -124,6 +164,10 @@ const ComingUpRides = () => {
 };
 
 const styles = StyleSheet.create({
+  unreadText: {
+    color: "#B22222",
+    fontWeight: "bold",
+  },
   safeArea: {
     flex: 1,
     backgroundColor: "#A3A380",